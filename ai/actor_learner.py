@@ -0,0 +1,330 @@
+import argparse
+import multiprocessing as mp
+import time
+import numpy as np
+from config.config import *
+from game.shared_block import open_shared_memory
+
+
+# One transition per row, fixed width so actors write straight into shared memory
+TRANSITION_DTYPE = np.dtype([
+    ('state', '<i8'),
+    ('action', 'i1'),
+    ('reward', '<f4'),
+    ('next_state', '<i8'),
+    ('done', '?'),
+])
+
+
+class TransitionRing:
+    """Single-producer/single-consumer ring buffer of transitions in shared memory.
+
+    Each actor owns one ring, so the write index is only touched by the actor
+    and the read index only by the learner and no lock is needed.
+    """
+
+    def __init__(self, capacity=ACTOR_RING_CAPACITY, name=None):
+        size = 16 + capacity * TRANSITION_DTYPE.itemsize
+        self.shm, self.owner = open_shared_memory(name, size)
+        self.capacity = capacity
+        self.indices = np.ndarray((2,), dtype=np.int64, buffer=self.shm.buf)  # write, read
+        self.rows = np.ndarray((capacity,), dtype=TRANSITION_DTYPE, buffer=self.shm.buf, offset=16)
+        if self.owner:
+            self.indices[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, state, action, reward, next_state, done, stop_event=None):
+        # Wait for the learner when the ring is full rather than overwrite unread rows
+        while self.indices[0] - self.indices[1] >= self.capacity:
+            if stop_event is not None and stop_event.is_set():
+                return False
+            time.sleep(0.001)
+        write_index = int(self.indices[0])
+        self.rows[write_index % self.capacity] = (state, action, reward, next_state, done)
+        self.indices[0] = write_index + 1  # Publish only after the row is complete
+        return True
+
+    def read(self, max_rows=None):
+        """Copy out every unread row (up to max_rows) and release them to the actor"""
+        read_index = int(self.indices[1])
+        available = int(self.indices[0]) - read_index
+        if max_rows is not None:
+            available = min(available, max_rows)
+        if available <= 0:
+            return self.rows[:0].copy()
+        positions = (read_index + np.arange(available)) % self.capacity
+        batch = self.rows[positions]
+        self.indices[1] = read_index + available
+        return batch
+
+    def close(self):
+        self.indices = None
+        self.rows = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class PolicySnapshot:
+    """Q-table snapshot and exploration rate published by the learner, guarded by a sequence counter.
+
+    The counter is odd while a write is in progress; readers retry until they
+    copy a consistent snapshot. Values are float64 like the learner's table.
+    """
+
+    def __init__(self, max_states=POLICY_SNAPSHOT_MAX_STATES, name=None):
+        size = 32 + max_states * 8 + max_states * 2 * 8
+        self.shm, self.owner = open_shared_memory(name, size)
+        self.header = np.ndarray((3,), dtype=np.int64, buffer=self.shm.buf)  # sequence, count, capacity
+        if self.owner:
+            self.header[:] = (0, 0, max_states)
+        else:
+            max_states = int(self.header[2])  # Sized by the learner, readers follow
+        self.max_states = max_states
+        self.overflowed = False
+        self.epsilon = np.ndarray((1,), dtype=np.float64, buffer=self.shm.buf, offset=24)
+        self.keys = np.ndarray((max_states,), dtype=np.int64, buffer=self.shm.buf, offset=32)
+        self.values = np.ndarray((max_states, 2), dtype=np.float64, buffer=self.shm.buf,
+                                 offset=32 + max_states * 8)
+        if self.owner:
+            self.epsilon[0] = 0.0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def publish(self, q_table, epsilon):
+        count = min(len(q_table), self.max_states)
+        if count < len(q_table) and not self.overflowed:
+            self.overflowed = True
+            print(f"Warning: the Q-table has outgrown the policy snapshot ({len(q_table)} > {self.max_states} "
+                  f"states), actors only see the first {self.max_states}. Raise POLICY_SNAPSHOT_MAX_STATES "
+                  f"or set Q_TABLE_MAX_STATES.")
+        keys = np.fromiter(q_table.keys(), dtype=np.int64, count=len(q_table))[:count]
+        values = np.array(list(q_table.values())[:count], dtype=np.float64).reshape(count, 2)
+        self.header[0] += 1
+        self.keys[:count] = keys
+        self.values[:count] = values
+        self.epsilon[0] = epsilon
+        self.header[1] = count
+        self.header[0] += 1
+        return int(self.header[0])
+
+    def read(self, last_sequence=0):
+        """Return (sequence, q_table, epsilon) if a newer snapshot exists, else None"""
+        while True:
+            sequence = int(self.header[0])
+            if sequence == last_sequence:
+                return None
+            if sequence % 2:
+                time.sleep(0.0005)
+                continue
+            count = int(self.header[1])
+            keys = self.keys[:count].tolist()
+            values = self.values[:count].tolist()
+            epsilon = float(self.epsilon[0])
+            if int(self.header[0]) == sequence:
+                return sequence, dict(zip(keys, values)), epsilon
+
+    def close(self):
+        self.header = self.epsilon = self.keys = self.values = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def actor_main(actor_id, ring_name, policy_name, epsilon_scale, seed, stop_event, score_queue):
+    """Headless actor process: plays episodes with the latest policy and streams transitions.
+
+    The learner owns the epsilon schedule; the actor explores with the published epsilon times
+    `epsilon_scale`.
+    """
+    from game.environment import enable_headless
+    enable_headless()
+    import random
+    from ai.ai_agent import FlappyBirdAI
+    from game.environment import EpisodeBudget, FlappyEnv
+    from game.reward_system import RewardSystem
+
+    random.seed(seed)
+    # Scores still queued at shutdown may be dropped instead of blocking the exit
+    score_queue.cancel_join_thread()
+    ring = TransitionRing(name=ring_name)
+    policy = PolicySnapshot(name=policy_name)
+    ai = FlappyBirdAI()
+    reward_system = RewardSystem()
+    env = FlappyEnv()
+    budget = EpisodeBudget()
+    sequence = 0
+    try:
+        while not stop_event.is_set():
+            snapshot = policy.read(sequence)
+            if snapshot is not None:
+                sequence, ai.q_table, epsilon = snapshot
+                ai.epsilon = epsilon * epsilon_scale
+                if ai.neighbors is not None:
+                    ai.neighbors.rebuild(ai.q_table)
+            bird, pipes = env.reset()
+            state = ai.get_state(bird, pipes)
+            game_over = truncated = False
+            budget.start()
+            while not game_over and not truncated and not stop_event.is_set():
+                action = ai.get_smart_action(state, bird, pipes)
+                game_over = env.step(action)
+                pipes = env.pipes
+                next_state = ai.get_state(bird, pipes)
+                reward = reward_system.calculate_reward(bird, pipes, env.score, game_over, action)
+                if not ring.write(state, action, reward, next_state, game_over, stop_event):
+                    break
+                state = next_state
+                truncated = budget.tick()
+            reward_system.reset()
+            if game_over or truncated:
+                score_queue.put((actor_id, env.score))
+    finally:
+        ring.close()
+        policy.close()
+
+
+class ActorLearnerTrainer:
+    """N simulation actors feeding one learner through shared-memory rings.
+
+    The learner (this process) drains every ring, applies the Q-updates and
+    republishes the table and epsilon every `publish_every` updates. Epsilon
+    decays here, once per num_actors finished episodes (the rate each actor
+    would decay at on its own), so it is saved with the session. Actor i seeds
+    its pipes with seed + i; a new run seed is drawn when none is given.
+    """
+
+    def __init__(self, num_actors=ACTOR_COUNT, publish_every=POLICY_PUBLISH_EVERY, ai=None, seed=None):
+        import random
+        from ai.ai_agent import FlappyBirdAI
+        self.num_actors = num_actors
+        self.publish_every = publish_every
+        self.ai = ai if ai is not None else FlappyBirdAI()
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.ctx = mp.get_context('spawn')
+        self.rings = []
+        self.policy = None
+        self.processes = []
+        self.stop_event = None
+        self.score_queue = None
+        self.episodes = 0
+        self.best_score = 0
+        self.recent_scores = []
+
+    def start(self):
+        # Room for a bounded table at its cap, or twice the loaded table
+        self.policy = PolicySnapshot(self.ai.max_states or max(POLICY_SNAPSHOT_MAX_STATES, 2 * len(self.ai.q_table)))
+        self.policy.publish(self.ai.q_table, self.ai.epsilon)
+        self.stop_event = self.ctx.Event()
+        self.score_queue = self.ctx.Queue()
+        for i in range(self.num_actors):
+            ring = TransitionRing()
+            self.rings.append(ring)
+            # Same per-actor epsilon spread as MultiAITrainer
+            process = self.ctx.Process(target=actor_main, daemon=True,
+                                       args=(i, ring.name, self.policy.name, 1 + i * 0.1, self.seed + i,
+                                             self.stop_event, self.score_queue))
+            process.start()
+            self.processes.append(process)
+
+    def learn(self, max_rows_per_ring=4096):
+        """Apply every pending transition, returns the number of updates made"""
+        updates = 0
+        for ring in self.rings:
+            batch = ring.read(max_rows_per_ring)
+            for state, action, reward, next_state, done in zip(batch['state'].tolist(), batch['action'].tolist(),
+                                                               batch['reward'].tolist(), batch['next_state'].tolist(),
+                                                               batch['done'].tolist()):
+                self.ai.update_q_table(state, action, reward, next_state, done)
+                updates += 1
+                if self.ai.total_updates % self.publish_every == 0:
+                    self.policy.publish(self.ai.q_table, self.ai.epsilon)
+        return updates
+
+    def collect_scores(self):
+        while not self.score_queue.empty():
+            _, score = self.score_queue.get_nowait()
+            self.episodes += 1
+            self.ai.episode_count += 1
+            if self.ai.episode_count % self.num_actors == 0:
+                self.ai.update_epsilon()
+            self.best_score = max(self.best_score, score)
+            self.recent_scores.append(score)
+            if len(self.recent_scores) > 100:
+                self.recent_scores.pop(0)
+
+    def run(self, duration=None, report_every=10.0):
+        self.start()
+        start_time = last_report = time.time()
+        updates = 0
+        try:
+            while duration is None or time.time() - start_time < duration:
+                learned = self.learn()
+                updates += learned
+                self.collect_scores()
+                if not learned:
+                    time.sleep(0.001)
+                if time.time() - last_report >= report_every:
+                    last_report = time.time()
+                    avg_recent = sum(self.recent_scores) / len(self.recent_scores) if self.recent_scores else 0
+                    print(f"Updates: {updates} ({updates / (last_report - start_time):.0f}/s), "
+                          f"Episodes: {self.episodes}, Best: {self.best_score}, Avg: {avg_recent:.1f}, "
+                          f"Q-table size: {len(self.ai.q_table)}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+        return updates
+
+    def stop(self):
+        if self.stop_event is not None:
+            self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.learn(max_rows_per_ring=None)
+        for ring in self.rings:
+            ring.close()
+        if self.policy is not None:
+            self.policy.close()
+        self.rings = []
+        self.processes = []
+        self.policy = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train with parallel simulation actors and a single learner")
+    parser.add_argument('--actors', type=int, default=ACTOR_COUNT)
+    parser.add_argument('--duration', type=float, default=None, help="Seconds to train (default: until Ctrl+C)")
+    parser.add_argument('--resume', action='store_true', help="Continue the last saved training session")
+    parser.add_argument('--seed', type=int, default=None, help="Run seed the actors' pipe seeds derive from")
+    args = parser.parse_args()
+
+    from ai.session import save_session, load_session, session_file
+    trainer = ActorLearnerTrainer(num_actors=args.actors, seed=args.seed)
+    trainer.ai.load_q_table()
+    if args.resume:
+        trainer_state = load_session(session_file('actor_learner'), [trainer.ai])
+        if trainer_state is not None:
+            trainer.episodes = trainer_state['episodes']
+            trainer.best_score = trainer_state['best_score']
+            trainer.recent_scores = trainer_state['recent_scores']
+    print(f"Starting {args.actors} actors (run seed {trainer.seed}), publishing the policy every "
+          f"{trainer.publish_every} updates")
+    trainer.run(duration=args.duration)
+    trainer.ai.save_q_table()
+    save_session(session_file('actor_learner'), [trainer.ai], {
+        'episodes': trainer.episodes, 'best_score': trainer.best_score, 'recent_scores': trainer.recent_scores,
+    })
+    print(f"🏁 Training stopped! Episodes: {trainer.episodes}, Best score: {trainer.best_score}, "
+          f"Q-table size: {len(trainer.ai.q_table)} states")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,34 @@ import random
 import json
 import os
 from config.config import *
+from ai.state_encoder import STATE_ENCODER, PIXEL_STATE_ENCODER
+from ai.reachability import REACHABILITY
+from ai.q_table import BoundedQTable
+from ai.coverage import CoverageIndex
+from ai.neighbors import NeighborIndex
 
 class FlappyBirdAI:
-    def __init__(self, learning_rate=LEARNING_RATE, discount_factor=DISCOUNT_FACTOR, epsilon=EPSILON):
+    tabular = True  # Q-values live in q_table, a dict of state -> [q_wait, q_flap]
+    session_excluded = ('encoder', 'transition_log', 'neighbors')  # Shared, external or rebuilt objects left out of session checkpoints
+
+    def __init__(self, learning_rate=LEARNING_RATE, discount_factor=DISCOUNT_FACTOR, epsilon=EPSILON, encoder=STATE_ENCODER,
+                 epsilon_decay=EPSILON_DECAY, max_states=Q_TABLE_MAX_STATES, eviction_policy=Q_TABLE_EVICTION_POLICY,
+                 track_coverage=TRACK_COVERAGE, neighbor_backoff=NEIGHBOR_BACKOFF):
+        self.encoder = encoder
+        self.coverage = CoverageIndex(encoder) if track_coverage else None
+        # Values unseen states from nearby visited ones, kept in step with the table by new_q_table and updates
+        self.neighbors = NeighborIndex(encoder) if neighbor_backoff else None
+        self.transition_log = None  # Optional ai.transition_log.TransitionLog fed by update_q_table
+        # With max_states set the Q-table is a BoundedQTable that evicts to stay in budget
+        self.max_states = max_states
+        self.eviction_policy = eviction_policy
         self.learning_rate = learning_rate
         self.discount_factor = discount_factor
         self.epsilon = epsilon
+        self.epsilon_decay = epsilon_decay
         self.initial_epsilon = epsilon
-        self.q_table = {}
+        self.rng = np.random.default_rng(random.getrandbits(64))  # Batch exploration (get_actions)
+        self.q_table = self.new_q_table()
         self.episode_count = 0
         self.total_updates = 0
         self.avg_q_change = 0.0
@@ -19,29 +39,71 @@ class FlappyBirdAI:
         self.exploration_count = 0
         self.exploitation_count = 0
     
+    def new_q_table(self, data=None, visits=None):
+        if self.max_states:
+            q_table = BoundedQTable(self.max_states, self.eviction_policy, data=data, visits=visits)
+            if self.coverage is not None:
+                self.coverage.forget(set(self.coverage.states) - q_table.keys())
+                q_table.on_evict = self.coverage.forget
+        else:
+            q_table = dict(data) if data else {}
+        if self.neighbors is not None:
+            self.neighbors.rebuild(q_table)
+        return q_table
+    
+    def unseen_q_values(self, state):
+        """Q-values to assume for a state not in the table: [0, 0], or with neighbor_backoff an
+        interpolation of the nearest visited states (see ai/neighbors.py). Always a new list."""
+        if self.neighbors is not None:
+            q_values = self.neighbors.estimate(state, self.q_table)
+            if q_values is not None:
+                return q_values
+        return [0, 0]
+    
     def get_state(self, bird, pipes):
-        if not pipes:
-            return (0, 0, 0, 0, 0)
-        next_pipe = pipes[0]
-        gap_center_y = next_pipe.top_height + PIPE_GAP // 2
-        bird_gap_diff = bird.y - gap_center_y
-        bird_y = int(bird.y / BIRD_Y_DIVISOR)
-        bird_velocity = int(bird.velocity / BIRD_VELOCITY_DIVISOR)
-        pipe_x = int(next_pipe.x / PIPE_X_DIVISOR)
-        pipe_gap_y = int(gap_center_y / PIPE_GAP_Y_DIVISOR)
-        bird_gap_diff_discrete = int(bird_gap_diff / 20)
-        return (bird_y, bird_velocity, pipe_x, pipe_gap_y, bird_gap_diff_discrete)
-    
-    def get_action(self, state):
+        # Packed int key, see ai.state_encoder for the field layout
+        return self.encoder.encode(bird, pipes)
+    
+    def get_action(self, state, mask=None):
+        # mask is (wait_ok, flap_ok) from REACHABILITY.action_mask; when only
+        # one action can still clear the next gap there is nothing to choose
+        if mask is not None and mask[0] != mask[1]:
+            self.exploitation_count += 1
+            return 1 if mask[1] else 0
         if random.random() < self.epsilon:
             self.exploration_count += 1
             return random.randint(0, 1)
         self.exploitation_count += 1
-        q_values = self.q_table.get(state, [0, 0])
+        q_values = self.q_table.get(state)
+        if q_values is None:
+            q_values = self.unseen_q_values(state)
         if q_values[0] == q_values[1]:
             return 0
         return np.argmax(q_values)
     
+    def q_values_batch(self, states):
+        """(n, 2) Q-values for an array of states, unseen_q_values where a state is not in the table"""
+        unique, inverse = np.unique(np.asarray(states, dtype=np.int64), return_inverse=True)
+        get = self.q_table.get
+        if self.neighbors is None:
+            zero = (0.0, 0.0)
+            rows = [get(state, zero) for state in unique.tolist()]
+        else:
+            rows = [get(state) or self.unseen_q_values(state) for state in unique.tolist()]
+        q_values = np.array(rows, dtype=np.float64).reshape(-1, 2)
+        return q_values[inverse.ravel()]
+    
+    def get_actions(self, states):
+        """Epsilon-greedy actions for an array of states at once, the batch form of get_action"""
+        q_values = self.q_values_batch(states)
+        explore = self.rng.random(len(q_values)) < self.epsilon
+        # Ties go to waiting, like get_action
+        actions = np.where(explore, self.rng.integers(0, 2, len(q_values)), q_values[:, 1] > q_values[:, 0])
+        explored = int(explore.sum())
+        self.exploration_count += explored
+        self.exploitation_count += len(q_values) - explored
+        return actions.astype(np.int64)
+    
     def get_smart_action(self, state, bird, pipes):
         if not pipes:
             return 0
@@ -54,6 +116,12 @@ class FlappyBirdAI:
             return 1
         if bird.y - bird.radius < 10:
             return 0
+        # Exact physics lookahead: if only one action keeps the next gap reachable, take it
+        wait_ok, flap_ok = REACHABILITY.action_mask(bird, pipes)
+        if flap_ok and not wait_ok:
+            return 1
+        if wait_ok and not flap_ok:
+            return 0
         if bird.y - bird.radius < upper_pipe_mouth:
             return 0
         distance_to_gap = bird.y - gap_center_y
@@ -79,33 +147,113 @@ class FlappyBirdAI:
         return self.get_action(state)
     
     def update_epsilon(self):
-        self.epsilon = max(EPSILON_MIN, self.epsilon * EPSILON_DECAY)
-    
-    def update_q_table(self, state, action, reward, next_state):
-        if state not in self.q_table:
-            self.q_table[state] = [0, 0]
-        if next_state not in self.q_table:
-            self.q_table[next_state] = [0, 0]
-        old_q = self.q_table[state][action]
-        current_q = self.q_table[state][action]
-        max_next_q = max(self.q_table[next_state])
-        new_q = current_q + self.learning_rate * (reward + self.discount_factor * max_next_q - current_q)
-        self.q_table[state][action] = new_q
+        self.epsilon = max(EPSILON_MIN, self.epsilon * self.epsilon_decay)
+    
+    def update_q_table(self, state, action, reward, next_state, done=False, discount=None):
+        # done marks a real terminal state (death); an episode cut off by its
+        # step/time budget is not terminal and still bootstraps from next_state.
+        # discount weighs next_state's value, gamma**frames for a multi-frame decision
+        # (ai/decision_interval.py); None is one frame
+        if discount is None:
+            discount = self.discount_factor
+        q_values = self.q_table.get(state)
+        if q_values is None:
+            q_values = self.q_table[state] = self.unseen_q_values(state)
+            if self.neighbors is not None:
+                self.neighbors.add(state)
+        # Unseen next states are read as unseen_q_values without being stored
+        next_q_values = None if done else self.q_table.get(next_state)
+        if next_q_values is None and not done and self.neighbors is not None:
+            next_q_values = self.neighbors.estimate(next_state, self.q_table)
+        old_q = q_values[action]
+        current_q = q_values[action]
+        max_next_q = max(next_q_values) if next_q_values is not None else 0
+        td_error = reward + discount * max_next_q - current_q
+        new_q = current_q + self.learning_rate * td_error
+        q_values[action] = new_q
+        if self.max_states:
+            self.q_table.touch(state)
+        if self.coverage is not None:
+            self.coverage.record(state, td_error)
+        if self.transition_log is not None:
+            self.transition_log.append(state, action, reward, next_state, done)
         self.total_updates += 1
         q_change = abs(new_q - old_q)
         self.avg_q_change = (self.avg_q_change * (self.total_updates - 1) + q_change) / self.total_updates
-        all_q_values = [q for state_qs in self.q_table.values() for q in state_qs]
-        if all_q_values:
-            self.max_q_value = max(self.max_q_value, max(all_q_values))
-            self.min_q_value = min(self.min_q_value, min(all_q_values))
+        # Only the updated value can extend the range, no need to rescan the table
+        if new_q > self.max_q_value:
+            self.max_q_value = new_q
+        elif new_q < self.min_q_value:
+            self.min_q_value = new_q
+    
+    def update_batch(self, states, actions, rewards, next_states, dones, discount=None):
+        """update_q_table for arrays of transitions, e.g. one frame of a whole population.
+        
+        Targets come from the table as it was before the batch. The n
+        transitions of one (state, action) pair move its value towards their
+        mean target by 1 - (1 - learning_rate)**n, which is n scalar updates
+        when the targets agree, without the n-fold overshoot of adding up n
+        steps. discount is a scalar or one value per transition.
+        """
+        states, actions, rewards, next_states, dones = batch_arrays(states, actions, rewards, next_states, dones)
+        targets = self.batch_targets(rewards, next_states, dones, discount)
+        unique, inverse = np.unique(states, return_inverse=True)
+        sa = 2 * inverse.ravel() + actions
+        counts = np.bincount(sa, minlength=2 * len(unique))
+        target_sums = np.bincount(sa, weights=targets, minlength=2 * len(unique))
+        old = self.q_values_batch(unique).ravel()
+        touched = counts > 0
+        new = old.copy()
+        new[touched] += ((1 - (1 - self.learning_rate) ** counts[touched])
+                         * (target_sums[touched] / counts[touched] - old[touched]))
+        for state, (wait, flap), (wait_touched, flap_touched) in zip(unique.tolist(), new.reshape(-1, 2).tolist(),
+                                                                     touched.reshape(-1, 2).tolist()):
+            q_values = self.q_table.get(state)
+            if q_values is None:
+                # old held unseen_q_values for it, so the untouched action keeps that value
+                self.q_table[state] = [wait, flap]
+                if self.neighbors is not None:
+                    self.neighbors.add(state)
+                continue
+            if wait_touched:
+                q_values[0] = wait
+            if flap_touched:
+                q_values[1] = flap
+        td_errors = targets - old[sa]
+        if self.max_states or self.coverage is not None:
+            for state, td_error in zip(states.tolist(), td_errors.tolist()):
+                if self.max_states:
+                    self.q_table.touch(state)
+                if self.coverage is not None:
+                    self.coverage.record(state, td_error)
+        self.record_batch(states, actions, rewards, next_states, dones,
+                          self.learning_rate * float(np.abs(td_errors).sum()), new[touched])
+    
+    def batch_targets(self, rewards, next_states, dones, discount=None):
+        """reward + discount * max Q(next state) per transition, 0 after a crash"""
+        if discount is None:
+            discount = self.discount_factor
+        next_values = self.q_values_batch(next_states).max(axis=1) if len(next_states) else np.zeros(0)
+        return rewards + discount * np.where(dones, 0.0, next_values)
+    
+    def record_batch(self, states, actions, rewards, next_states, dones, q_change_sum, new_q_values=None):
+        """Counters, Q-value range and transition log after a batch update"""
+        if self.transition_log is not None:
+            self.transition_log.extend(states, actions, rewards, next_states, dones)
+        if not len(states):
+            return
+        self.total_updates += len(states)
+        self.avg_q_change += (q_change_sum - len(states) * self.avg_q_change) / self.total_updates
+        if new_q_values is not None and len(new_q_values):
+            self.max_q_value = max(self.max_q_value, float(new_q_values.max()))
+            self.min_q_value = min(self.min_q_value, float(new_q_values.min()))
     
     def get_learning_stats(self):
         total_actions = self.exploration_count + self.exploitation_count
         exploration_rate = self.exploration_count / total_actions if total_actions > 0 else 0
-        return {
+        stats = {
             'episode_count': self.episode_count,
             'epsilon': self.epsilon,
-            'q_table_size': len(self.q_table),
             'total_updates': self.total_updates,
             'avg_q_change': self.avg_q_change,
             'max_q_value': self.max_q_value,
@@ -114,6 +262,13 @@ class FlappyBirdAI:
             'exploration_count': self.exploration_count,
             'exploitation_count': self.exploitation_count
         }
+        if self.tabular:
+            stats['q_table_size'] = len(self.q_table)
+        else:
+            stats['parameter_count'] = self.parameter_usage()
+        if self.max_states:
+            stats.update(self.q_table.get_memory_stats())
+        return stats
     
     def end_episode(self):
         self.episode_count += 1
@@ -122,13 +277,29 @@ class FlappyBirdAI:
             stats = self.get_learning_stats()
             print(f"Generation {self.episode_count}:")
             print(f"  Epsilon: {stats['epsilon']:.4f}")
-            print(f"  Q-table size: {stats['q_table_size']} states")
+            print(f"  {size_description(stats)}")
             print(f"  Avg Q-change: {stats['avg_q_change']:.4f}")
             print(f"  Q-value range: [{stats['min_q_value']:.2f}, {stats['max_q_value']:.2f}]")
             print(f"  Exploration rate: {stats['exploration_rate']:.2%}")
+            if self.max_states:
+                print(f"  Memory: ~{stats['memory_bytes'] / 1e6:.1f} MB, {stats['evictions']} states evicted "
+                      f"({stats['eviction_batches']} batches, policy: {stats['eviction_policy']})")
+    
+    def session_state(self):
+        """Everything needed to continue training exactly (Q-values, epsilon, counters), see ai/session.py"""
+        return {name: value for name, value in self.__dict__.items() if name not in self.session_excluded}
+    
+    def restore_session_state(self, state):
+        self.__dict__.update(state)
+        if self.neighbors is not None:
+            self.neighbors.rebuild(self.q_table)
     
     def save_q_table(self, filename=Q_TABLE_FILE):
-        serializable_q_table = {str(k): v for k, v in self.q_table.items()}
+        if self.max_states:
+            # Bounded tables also keep the visit counts: [q_wait, q_flap, visits]
+            serializable_q_table = {str(k): [v[0], v[1], self.q_table.visits(k)] for k, v in self.q_table.items()}
+        else:
+            serializable_q_table = {str(k): v for k, v in self.q_table.items()}
         with open(filename, 'w') as f:
             json.dump(serializable_q_table, f)
     
@@ -137,14 +308,165 @@ class FlappyBirdAI:
             try:
                 with open(filename, 'r') as f:
                     loaded_q_table = json.load(f)
-                    self.q_table = {eval(k): v for k, v in loaded_q_table.items()}
+                    q_table = {}
+                    visits = {}
+                    for k, v in loaded_q_table.items():
+                        state = self.encoder.parse_key(k)
+                        q_table[state] = v[:2]
+                        if len(v) > 2:
+                            visits[state] = v[2]
+                    self.q_table = self.new_q_table(q_table, visits)
                     all_q_values = [q for state_qs in self.q_table.values() for q in state_qs]
                     if all_q_values:
                         self.max_q_value = max(all_q_values)
                         self.min_q_value = min(all_q_values)
             except (json.JSONDecodeError, ValueError, SyntaxError) as e:
                 print(f"Error loading Q-table: {e}. Starting with empty Q-table.")
-                self.q_table = {}
+                self.q_table = self.new_q_table()
         else:
             print("No existing Q-table found. Starting with empty Q-table.")
-            self.q_table = {} 
\ No newline at end of file
+            self.q_table = self.new_q_table() 
+
+def size_description(stats):
+    """'Q-table size: n states', or the parameter count of an agent without a table"""
+    if 'q_table_size' in stats:
+        return f"Q-table size: {stats['q_table_size']} states"
+    return f"Parameters in use: {stats['parameter_count']}"
+
+def batch_arrays(states, actions, rewards, next_states, dones):
+    """Transition columns as numpy arrays of the dtypes the batch updates expect"""
+    return (np.asarray(states, dtype=np.int64), np.asarray(actions, dtype=np.int64),
+            np.asarray(rewards, dtype=np.float64), np.asarray(next_states, dtype=np.int64),
+            np.asarray(dones, dtype=bool))
+
+
+class QFunctionView:
+    """Read-only stand-in for the `q_table` dict of an agent that computes its Q-values.
+
+    Lookups (get, []) evaluate the agent's function, so code that only reads
+    `ai.q_table.get(state)` works unchanged. No states are stored, so
+    iterating yields nothing, len() is 0 and table-merging code leaves it
+    alone; get_learning_stats reports the parameter count instead.
+    """
+
+    def __init__(self, ai):
+        self.ai = ai
+
+    def get(self, state, default=None):
+        return self.ai.q_values(state)
+
+    def __getitem__(self, state):
+        return self.ai.q_values(state)
+
+    def __contains__(self, state):
+        return False
+
+    def __len__(self):
+        return 0
+
+    def __iter__(self):
+        return iter(())
+
+    def keys(self):
+        return iter(())
+
+    def values(self):
+        return iter(())
+
+    def items(self):
+        return iter(())
+
+
+class ApproximateAI(FlappyBirdAI):
+    """Base for agents that replace the Q-table with a function of the state.
+
+    States are packed ints from a pixel-resolution encoder, so the rest of the
+    code (transition log, planner, renderers) handles them like table keys.
+    Subclasses implement q_values/q_values_batch, update_q_table,
+    reset_parameters and get/set_parameters; parameters are saved to an .npz
+    next to the table checkpoint name (q_table.json -> q_table<suffix>) so
+    tabular checkpoints are never overwritten.
+    """
+    tabular = False
+    checkpoint_suffix = '.npz'
+    session_excluded = FlappyBirdAI.session_excluded + ('q_table',)
+
+    def __init__(self, learning_rate=LEARNING_RATE, discount_factor=DISCOUNT_FACTOR, epsilon=EPSILON,
+                 encoder=PIXEL_STATE_ENCODER, epsilon_decay=EPSILON_DECAY):
+        super().__init__(learning_rate=learning_rate, discount_factor=discount_factor, epsilon=epsilon,
+                         encoder=encoder, epsilon_decay=epsilon_decay, max_states=None, track_coverage=False,
+                         neighbor_backoff=False)
+
+    def new_q_table(self, data=None, visits=None):
+        self.reset_parameters()
+        return QFunctionView(self)
+
+    def restore_session_state(self, state):
+        super().restore_session_state(state)
+        self.q_table = QFunctionView(self)
+
+    def decode_batch(self, states):
+        """(n, 5) float array of the state fields: bird y, velocity, pipe x, gap y, bird-gap difference"""
+        return self.encoder.decode_batch(states).astype(np.float64)
+
+    def q_values(self, state):
+        return self.q_values_batch(np.array([state], dtype=np.int64))[0].tolist()
+
+    def record_update(self, state, action, reward, next_state, done, q_change, new_q=None):
+        """Bookkeeping shared with FlappyBirdAI.update_q_table"""
+        if self.transition_log is not None:
+            self.transition_log.append(state, action, reward, next_state, done)
+        self.total_updates += 1
+        self.avg_q_change = (self.avg_q_change * (self.total_updates - 1) + q_change) / self.total_updates
+        if new_q is None:
+            return
+        if new_q > self.max_q_value:
+            self.max_q_value = new_q
+        elif new_q < self.min_q_value:
+            self.min_q_value = new_q
+
+    def blend_parameters(self, parameters, strength):
+        """Move every parameter `strength` of the way towards `parameters` (knowledge sharing)"""
+        own = self.get_parameters()
+        self.set_parameters({name: (1 - strength) * value + strength * parameters[name]
+                             for name, value in own.items()})
+
+    @staticmethod
+    def average_parameters(ais):
+        all_parameters = [ai.get_parameters() for ai in ais]
+        return {name: np.mean([parameters[name] for parameters in all_parameters], axis=0)
+                for name in all_parameters[0]}
+
+    def checkpoint_file(self, filename):
+        base, extension = os.path.splitext(filename)
+        return (base if extension == '.json' else filename) + self.checkpoint_suffix
+
+    def save_q_table(self, filename=Q_TABLE_FILE):
+        with open(self.checkpoint_file(filename), 'wb') as f:
+            np.savez(f, **self.get_parameters())
+
+    def load_q_table(self, filename=Q_TABLE_FILE):
+        filename = self.checkpoint_file(filename)
+        if os.path.exists(filename):
+            try:
+                with np.load(filename) as saved:
+                    self.set_parameters({name: saved[name] for name in saved.files})
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error loading {filename}: {e}. Starting from scratch.")
+                self.q_table = self.new_q_table()
+        else:
+            print(f"No saved parameters at {filename}. Starting from scratch.")
+            self.q_table = self.new_q_table()
+
+
+def create_agent(agent_type=AGENT_TYPE, **kwargs):
+    """Build the agent selected by AGENT_TYPE: 'table' (FlappyBirdAI), 'tiles' (ai/tile_agent.py) or 'mlp' (ai/mlp_agent.py)"""
+    if agent_type == 'table':
+        return FlappyBirdAI(**kwargs)
+    if agent_type == 'tiles':
+        from ai.tile_agent import TileCodingAI
+        return TileCodingAI(**kwargs)
+    if agent_type == 'mlp':
+        from ai.mlp_agent import MLPQAgent
+        return MLPQAgent(**kwargs)
+    raise ValueError(f"Unknown agent type: {agent_type}")
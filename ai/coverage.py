@@ -0,0 +1,162 @@
+import argparse
+import heapq
+import numpy as np
+from config.config import *
+from ai.state_encoder import STATE_ENCODER, FIELD_NAMES
+
+
+class CoverageIndex:
+    """State-space coverage statistics maintained alongside Q-learning updates.
+
+    Keeps a visit histogram per state field, a visit count and a running mean
+    of |TD error| per state, so coverage questions are answered from this index
+    instead of a scan over the Q-table. With a BoundedQTable the per-state
+    entries follow its evictions (forget), so the index stays within the
+    table's budget; the field histograms keep every visit.
+    """
+
+    def __init__(self, encoder=STATE_ENCODER, td_smoothing=COVERAGE_TD_SMOOTHING):
+        self.encoder = encoder
+        self.td_smoothing = td_smoothing
+        self.histograms = [[0] * field.radix for field in encoder.fields]
+        self.states = {}  # state -> [visits, running |TD error|]
+        self.total_visits = 0
+
+    def record(self, state, td_error):
+        entry = self.states.get(state)
+        if entry is None:
+            self.states[state] = [1, abs(td_error)]
+        else:
+            entry[0] += 1
+            entry[1] += self.td_smoothing * (abs(td_error) - entry[1])
+        self.total_visits += 1
+        key = state
+        for field, histogram in zip(self.encoder.fields, self.histograms):
+            code, key = divmod(key, field.stride)
+            histogram[code] += 1
+
+    def forget(self, states):
+        """Drop the per-state entries of `states`, e.g. the ones a BoundedQTable just evicted"""
+        pop = self.states.pop
+        for state in states:
+            pop(state, None)
+
+    def histogram(self, field_name):
+        """(discretized values, visit counts) for one field"""
+        column = FIELD_NAMES.index(field_name)
+        field = self.encoder.fields[column]
+        values = np.arange(field.radix) + field.min_value
+        return values, np.array(self.histograms[column], dtype=np.int64)
+
+    def _arrays(self):
+        keys = np.fromiter(self.states.keys(), dtype=np.int64, count=len(self.states))
+        visits = np.fromiter((entry[0] for entry in self.states.values()), dtype=np.int64, count=len(self.states))
+        td_errors = np.fromiter((entry[1] for entry in self.states.values()), dtype=np.float64, count=len(self.states))
+        return keys, visits, td_errors
+
+    def visit_grid(self, fields=('bird_y', 'velocity')):
+        """Visit counts projected onto a set of fields, as an N-d array indexed by bucket code"""
+        columns = [FIELD_NAMES.index(name) for name in fields]
+        shape = tuple(self.encoder.fields[column].radix for column in columns)
+        grid = np.zeros(shape, dtype=np.int64)
+        keys, visits, _ = self._arrays()
+        if len(keys):
+            decoded = self.encoder.decode_batch(keys)
+            codes = tuple(decoded[:, column] - self.encoder.fields[column].min_value for column in columns)
+            np.add.at(grid, codes, visits)
+        return grid
+
+    def unvisited_regions(self, fields=('bird_y', 'velocity'), within_observed=True):
+        """Discretized value combinations over `fields` that were never visited.
+
+        With within_observed, each field is limited to the range actually seen,
+        which skips regions the physics can never reach.
+        """
+        grid = self.visit_grid(fields)
+        columns = [FIELD_NAMES.index(name) for name in fields]
+        mask = grid == 0
+        if within_observed:
+            for axis, column in enumerate(columns):
+                seen = np.nonzero(self.histograms[column])[0]
+                if len(seen) == 0:
+                    return []
+                outside = np.ones(grid.shape[axis], dtype=bool)
+                outside[seen[0]:seen[-1] + 1] = False
+                index = [np.newaxis] * grid.ndim
+                index[axis] = slice(None)
+                mask &= ~outside[tuple(index)]
+        offsets = np.array([self.encoder.fields[column].min_value for column in columns])
+        return [tuple(int(v) for v in cell + offsets) for cell in np.argwhere(mask)]
+
+    def top_td_error(self, n=10):
+        """The n states with the largest running |TD error|, as (state, error, visits)"""
+        top = heapq.nlargest(n, self.states.items(), key=lambda item: item[1][1])
+        return [(state, entry[1], entry[0]) for state, entry in top]
+
+    def least_visited(self, n=10):
+        least = heapq.nsmallest(n, self.states.items(), key=lambda item: item[1][0])
+        return [(state, entry[0]) for state, entry in least]
+
+    def dimension_report(self):
+        """Per field: buckets seen vs available, plus how sparse the joint space is"""
+        report = {}
+        product = 1
+        for name, field, histogram in zip(FIELD_NAMES, self.encoder.fields, self.histograms):
+            seen = sum(1 for count in histogram if count)
+            product *= max(seen, 1)
+            report[name] = {'divisor': field.divisor, 'buckets_seen': seen, 'buckets_total': field.radix}
+        report['states_seen'] = len(self.states)
+        report['joint_occupancy'] = len(self.states) / product if product else 0.0
+        return report
+
+    def summary(self):
+        report = self.dimension_report()
+        lines = [f"Coverage: {report['states_seen']} states, {self.total_visits} visits, "
+                 f"joint occupancy {report['joint_occupancy']:.2%}"]
+        for name in FIELD_NAMES:
+            field_report = report[name]
+            lines.append(f"  {name}: {field_report['buckets_seen']}/{field_report['buckets_total']} buckets "
+                         f"(divisor {field_report['divisor']})")
+        return "\n".join(lines)
+
+    def export_snapshot(self, filename=COVERAGE_SNAPSHOT_FILE):
+        keys, visits, td_errors = self._arrays()
+        arrays = {'keys': keys, 'visits': visits, 'td_errors': td_errors,
+                  'total_visits': np.array(self.total_visits)}
+        for name, histogram in zip(FIELD_NAMES, self.histograms):
+            arrays[f'hist_{name}'] = np.array(histogram, dtype=np.int64)
+        np.savez_compressed(filename, **arrays)
+
+    @classmethod
+    def load_snapshot(cls, filename=COVERAGE_SNAPSHOT_FILE, encoder=STATE_ENCODER):
+        index = cls(encoder)
+        with np.load(filename) as data:
+            for state, visits, td_error in zip(data['keys'].tolist(), data['visits'].tolist(), data['td_errors'].tolist()):
+                index.states[state] = [visits, td_error]
+            for column, name in enumerate(FIELD_NAMES):
+                index.histograms[column] = data[f'hist_{name}'].tolist()
+            index.total_visits = int(data['total_visits'])
+        return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report on a Q-table coverage snapshot")
+    parser.add_argument('snapshot', nargs='?', default=COVERAGE_SNAPSHOT_FILE)
+    parser.add_argument('--fields', default='bird_y,velocity', help="Fields to look for unvisited regions in")
+    parser.add_argument('--top', type=int, default=10, help="How many high TD-error states to list")
+    args = parser.parse_args()
+
+    index = CoverageIndex.load_snapshot(args.snapshot)
+    print(index.summary())
+    fields = tuple(args.fields.split(','))
+    regions = index.unvisited_regions(fields)
+    print(f"Unvisited {'/'.join(fields)} cells inside the observed range: {len(regions)}")
+    for cell in regions[:args.top]:
+        print(f"  {dict(zip(fields, cell))}")
+    print("Largest running |TD error|:")
+    for state, td_error, visits in index.top_td_error(args.top):
+        print(f"  {dict(zip(FIELD_NAMES, index.encoder.decode(state)))}: {td_error:.3f} ({visits} visits)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+from config.config import *
+
+
+class DecisionInterval:
+    """Lets an agent decide every few frames instead of on every frame.
+
+    The action chosen at a decision is applied on that frame and the bird
+    waits on the frames that follow. A decision lasts `interval` frames, or
+    with `adaptive` until the discretized state changes (at most `interval`
+    frames), a crash, or flush(). Its frames become a single transition:
+    reward r0 + g*r1 + ... + g^(n-1)*r(n-1), bootstrapping from the state it
+    ended in with g^n (g = the agent's discount factor), so the agent is
+    updated once per decision. interval=1 is the usual every-frame loop.
+    """
+
+    def __init__(self, ai, interval=DECISION_INTERVAL, adaptive=ADAPTIVE_DECISIONS):
+        self.ai = ai
+        self.interval = max(1, interval)
+        self.adaptive = adaptive
+        self.start(None)
+
+    def start(self, state):
+        """Begin a decision in `state` (a new episode, or the state the last decision ended in)"""
+        self.state = state
+        self.action = None
+        self.reward = 0.0
+        self.discount = 1.0
+        self.frames = 0
+
+    def act(self, bird, pipes, policy=None):
+        """Action to apply this frame; the policy (default get_smart_action) only runs when a decision is due"""
+        if self.action is None:
+            self.action = (policy or self.ai.get_smart_action)(self.state, bird, pipes)
+            return self.action
+        return 0
+
+    def step(self, bird, pipes, reward, done):
+        """Add one played frame's reward; ends the decision (one agent update) when it is over.
+
+        Returns True when the decision ended, after which self.state is the new state.
+        """
+        self.reward += self.discount * reward
+        self.discount *= self.ai.discount_factor
+        self.frames += 1
+        if done or self.frames >= self.interval:
+            self.end(self.ai.get_state(bird, pipes), done)
+            return True
+        if self.adaptive:
+            next_state = self.ai.get_state(bird, pipes)
+            if next_state != self.state:
+                self.end(next_state, done)
+                return True
+        return False
+
+    def flush(self, bird, pipes):
+        """End a decision cut short by the episode budget (not terminal, still bootstraps)"""
+        if self.frames:
+            self.end(self.ai.get_state(bird, pipes), False)
+
+    def end(self, next_state, done):
+        self.ai.update_q_table(self.state, self.action, self.reward, next_state, done, self.discount)
+        self.start(next_state)
@@ -0,0 +1,217 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from config.config import *
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+SCORE_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def resident_memory_bytes():
+    """Current resident set size of this process, None where it can't be read"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024  # Peak, not current, off Linux
+    except ImportError:
+        return None
+
+
+class TrainingMetrics:
+    """Live training counters, published by a trainer once per generation.
+
+    The trainer calls end_generation() with the generation's scores, frame
+    count and agents, lap() after each phase of its loop and
+    checkpoint_saved() after writing to disk; nothing is recorded per frame.
+    Agent statistics are read with get_learning_stats() on the trainer's
+    thread, so the HTTP server only ever sees finished snapshots.
+    """
+
+    def __init__(self, trainer, score_window=METRICS_SCORE_WINDOW, rate_window=METRICS_RATE_WINDOW):
+        self.trainer = trainer
+        self.rate_window = rate_window
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.generations = 0
+        self.frames = 0
+        self.best_score = 0
+        self.scores = deque(maxlen=score_window)
+        self.agent_stats = []
+        self.phase_totals = {}
+        self.phase_last = {}
+        self.last_checkpoint = None
+        self.samples = deque()  # (time, generations, frames, agent updates) for the rates
+        self.lap_start = time.perf_counter()
+
+    def lap(self, phase):
+        """Charge the time since the previous lap to `phase`"""
+        now = time.perf_counter()
+        seconds = now - self.lap_start
+        self.lap_start = now
+        with self.lock:
+            self.phase_totals[phase] = self.phase_totals.get(phase, 0.0) + seconds
+            self.phase_last[phase] = seconds
+
+    def checkpoint_saved(self):
+        with self.lock:
+            self.last_checkpoint = time.time()
+
+    def end_generation(self, scores, frames, agents):
+        agent_stats = [ai.get_learning_stats() for ai in agents]
+        now = time.time()
+        with self.lock:
+            self.generations += 1
+            self.frames += frames
+            self.scores.extend(scores)
+            self.best_score = max(self.best_score, max(scores, default=0))
+            self.agent_stats = agent_stats
+            self.samples.append((now, self.generations, self.frames,
+                                 sum(stats['total_updates'] for stats in agent_stats)))
+            while len(self.samples) > 2 and now - self.samples[1][0] >= self.rate_window:
+                self.samples.popleft()
+
+    def snapshot(self):
+        """Every metric as one JSON-serializable dict"""
+        with self.lock:
+            scores = np.array(self.scores, dtype=np.float64)
+            samples = list(self.samples)
+            snapshot = {
+                'trainer': self.trainer,
+                'uptime_seconds': time.time() - self.started,
+                'generations': self.generations,
+                'frames': self.frames,
+                'best_score': self.best_score,
+                'phases': {phase: {'total_seconds': total, 'last_seconds': self.phase_last[phase]}
+                           for phase, total in self.phase_totals.items()},
+                'last_checkpoint': self.last_checkpoint,
+                'agents': [dict(stats) for stats in self.agent_stats],
+            }
+        rates = {'generations_per_second': 0.0, 'frames_per_second': 0.0, 'updates_per_second': 0.0}
+        if len(samples) >= 2 and samples[-1][0] > samples[0][0]:
+            elapsed = samples[-1][0] - samples[0][0]
+            for i, name in enumerate(rates, start=1):
+                rates[name] = (samples[-1][i] - samples[0][i]) / elapsed
+        snapshot.update(rates)
+        snapshot['scores'] = {'window': len(scores)}
+        if len(scores):
+            snapshot['scores'].update({'mean': float(scores.mean()), 'max': float(scores.max())})
+            for q, value in zip(SCORE_QUANTILES, np.quantile(scores, SCORE_QUANTILES).tolist()):
+                snapshot['scores'][f'p{round(q * 100)}'] = value
+        snapshot['last_checkpoint_age_seconds'] = (time.time() - snapshot['last_checkpoint']
+                                                   if snapshot['last_checkpoint'] else None)
+        snapshot['memory_bytes'] = resident_memory_bytes()
+        return snapshot
+
+
+def prometheus_text(snapshot):
+    """Prometheus text exposition of a TrainingMetrics.snapshot()"""
+    trainer = snapshot['trainer']
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP flappy_{name} {help_text}")
+        lines.append(f"# TYPE flappy_{name} {kind}")
+        for labels, value in samples:
+            labels = dict(trainer=trainer, **labels)
+            label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+            value = float(value)
+            # Prometheus spells the non-finite values +Inf, -Inf and NaN
+            text = repr(value) if np.isfinite(value) else ('NaN' if value != value else f"{'+' if value > 0 else '-'}Inf")
+            lines.append(f"flappy_{name}{{{label_text}}} {text}")
+
+    metric('uptime_seconds', 'gauge', "Seconds since the trainer started", [({}, snapshot['uptime_seconds'])])
+    metric('generations_total', 'counter', "Generations finished", [({}, snapshot['generations'])])
+    metric('frames_total', 'counter', "Game frames simulated", [({}, snapshot['frames'])])
+    for name in ('generations_per_second', 'frames_per_second', 'updates_per_second'):
+        metric(name, 'gauge', f"{name.replace('_', ' ').capitalize()} over the last {METRICS_RATE_WINDOW}s",
+               [({}, snapshot[name])])
+    metric('best_score', 'gauge', "Best score since the trainer started", [({}, snapshot['best_score'])])
+    scores = snapshot['scores']
+    if scores['window']:
+        metric('score', 'summary', f"Scores of the last {scores['window']} episodes",
+               [({'quantile': str(q)}, scores[f'p{round(q * 100)}']) for q in SCORE_QUANTILES])
+        metric('score_mean', 'gauge', "Mean of the recent scores", [({}, scores['mean'])])
+        metric('score_max', 'gauge', "Max of the recent scores", [({}, scores['max'])])
+    if snapshot['phases']:
+        metric('phase_seconds_total', 'counter', "Wall time spent in each phase of the training loop",
+               [({'phase': phase}, times['total_seconds']) for phase, times in snapshot['phases'].items()])
+    if snapshot['memory_bytes'] is not None:
+        metric('resident_memory_bytes', 'gauge', "Resident memory of the trainer process",
+               [({}, snapshot['memory_bytes'])])
+    if snapshot['last_checkpoint'] is not None:
+        metric('last_checkpoint_timestamp_seconds', 'gauge', "Unix time of the last save",
+               [({}, snapshot['last_checkpoint'])])
+    # Every numeric field of get_learning_stats, one sample per agent
+    agents = snapshot['agents']
+    names = [name for name, value in (agents[0].items() if agents else ())
+             if isinstance(value, (int, float)) and not isinstance(value, bool)]
+    for name in names:
+        metric(f'agent_{name}', 'gauge', f"FlappyBirdAI.get_learning_stats()['{name}']",
+               [({'agent': str(i + 1)}, stats[name]) for i, stats in enumerate(agents)
+                if stats.get(name) is not None])
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    metrics = None  # Set on the subclass made by start_metrics_server
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/metrics':
+            body, content_type = prometheus_text(self.metrics.snapshot()), PROMETHEUS_CONTENT_TYPE
+        elif path == '/metrics.json':
+            body, content_type = json.dumps(self.metrics.snapshot()), 'application/json'
+        else:
+            self.send_error(404, "Try /metrics (Prometheus) or /metrics.json")
+            return
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would drown the training output
+
+
+def serve_training_metrics(trainer, port=METRICS_PORT, host=METRICS_HOST):
+    """(TrainingMetrics, server) for a trainer when a metrics port is set, else (None, None).
+
+    Trainers only record metrics when they are served, so without a port the
+    training loop does no extra work.
+    """
+    if not port:
+        return None, None
+    metrics = TrainingMetrics(trainer)
+    server = start_metrics_server(metrics, port, host)
+    if server is None:
+        return None, None
+    return metrics, server
+
+
+def start_metrics_server(metrics, port=METRICS_PORT, host=METRICS_HOST):
+    """Serve `metrics` at http://host:port/metrics and /metrics.json from a daemon thread.
+
+    Returns the server (call shutdown() to stop it), or None if the port is taken.
+    """
+    handler = type('BoundMetricsRequestHandler', (MetricsRequestHandler,), {'metrics': metrics})
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError as e:
+        print(f"Metrics server could not listen on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    print(f"Serving training metrics at http://{host}:{port}/metrics (JSON: /metrics.json)")
+    return server
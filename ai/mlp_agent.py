@@ -0,0 +1,187 @@
+import numpy as np
+from config.config import *
+from ai.ai_agent import ApproximateAI, batch_arrays
+
+# Divides the decoded state fields (bird y, velocity, pipe x, gap y, bird-gap difference) to roughly [-1, 1]
+FEATURE_SCALES = np.array([SCREEN_HEIGHT, 20.0, SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_HEIGHT / 2])
+HUBER_DELTA = 1.0
+ADAM_BETAS = (0.9, 0.999)
+ADAM_EPSILON = 1e-8
+
+
+class ReplayBuffer:
+    """Fixed-size ring of transitions in flat NumPy arrays"""
+
+    def __init__(self, capacity=MLP_REPLAY_CAPACITY):
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.dones = np.zeros(capacity)
+        self.discounts = np.zeros(capacity)  # Weight of next_state's value (gamma**frames of the decision)
+        self.capacity = capacity
+        self.size = 0
+        self.position = 0
+
+    def append(self, state, action, reward, next_state, done, discount):
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.discounts[i] = discount
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, states, actions, rewards, next_states, dones, discounts):
+        n = min(len(states), self.capacity)  # Only the newest `capacity` transitions can be kept
+        index = (self.position + np.arange(n)) % self.capacity
+        for column, values in ((self.states, states), (self.actions, actions), (self.rewards, rewards),
+                               (self.next_states, next_states), (self.dones, dones), (self.discounts, discounts)):
+            column[index] = np.broadcast_to(values, (len(states),))[len(states) - n:]
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample(self, rng, batch_size):
+        index = rng.integers(0, self.size, batch_size)
+        return (self.states[index], self.actions[index], self.rewards[index], self.next_states[index],
+                self.dones[index], self.discounts[index])
+
+
+class MLPQAgent(ApproximateAI):
+    """Q-function as a small ReLU network in plain NumPy, trained DQN style.
+
+    Every update_q_table call stores the transition in a replay buffer, and
+    every `train_every` transitions one minibatch of `batch_size` replayed
+    transitions takes an Adam step on the Huber loss against a target
+    network that is re-synced every `target_sync_every` steps. Inputs are the
+    pixel-resolution state fields, so the footprint is the network plus the
+    fixed buffer whatever the number of states seen. q_values_batch evaluates
+    any number of birds with one matrix product per layer.
+    """
+    checkpoint_suffix = '.mlp.npz'
+
+    def __init__(self, learning_rate=LEARNING_RATE, discount_factor=DISCOUNT_FACTOR, epsilon=EPSILON,
+                 epsilon_decay=EPSILON_DECAY, hidden_sizes=MLP_HIDDEN_SIZES, batch_size=MLP_BATCH_SIZE,
+                 replay_capacity=MLP_REPLAY_CAPACITY, train_every=MLP_TRAIN_EVERY,
+                 target_sync_every=MLP_TARGET_SYNC_EVERY, warmup=MLP_WARMUP):
+        self.layer_sizes = [len(FEATURE_SCALES)] + list(hidden_sizes) + [2]
+        # learning_rate keeps the table agent's scale (trainers vary it per agent); Adam follows it proportionally
+        self.adam_learning_rate = MLP_ADAM_LEARNING_RATE * learning_rate / LEARNING_RATE
+        self.batch_size = batch_size
+        self.train_every = train_every
+        self.target_sync_every = target_sync_every
+        self.warmup = warmup
+        self.replay = ReplayBuffer(replay_capacity)
+        self.params = None
+        self.target_params = None
+        self.train_steps = 0
+        self.last_td_error = 0.0
+        super().__init__(learning_rate=learning_rate, discount_factor=discount_factor, epsilon=epsilon,
+                         epsilon_decay=epsilon_decay)
+
+    def reset_parameters(self):
+        # He initialization for the ReLU layers, zero biases
+        self.params = []
+        for fan_in, fan_out in zip(self.layer_sizes[:-1], self.layer_sizes[1:]):
+            self.params.append(self.rng.normal(0.0, np.sqrt(2.0 / fan_in), (fan_in, fan_out)))
+            self.params.append(np.zeros(fan_out))
+        self.reset_optimizer()
+
+    def reset_optimizer(self):
+        self.adam_m = [np.zeros_like(p) for p in self.params]
+        self.adam_v = [np.zeros_like(p) for p in self.params]
+        self.adam_t = 0
+        self.target_params = [p.copy() for p in self.params]
+
+    def get_parameters(self):
+        return {f'param_{i}': p for i, p in enumerate(self.params)}
+
+    def set_parameters(self, parameters):
+        params = [np.asarray(parameters[f'param_{i}'], dtype=np.float64) for i in range(len(self.params))]
+        for new, old in zip(params, self.params):
+            if new.shape != old.shape:
+                raise ValueError(f"Saved layer of shape {new.shape} doesn't match {old.shape}")
+        self.params = [p.copy() for p in params]
+        self.reset_optimizer()
+
+    def parameter_usage(self):
+        return sum(p.size for p in self.params)
+
+    def features(self, states):
+        return self.decode_batch(states) / FEATURE_SCALES
+
+    def forward(self, x, params):
+        """Network output plus the hidden activations needed for backprop"""
+        activations = [x]
+        for i in range(0, len(params) - 2, 2):
+            x = np.maximum(x @ params[i] + params[i + 1], 0.0)
+            activations.append(x)
+        return x @ params[-2] + params[-1], activations
+
+    def q_values_batch(self, states, params=None):
+        """(n, 2) Q-values for an array of states, one matrix product per layer"""
+        return self.forward(self.features(np.asarray(states, dtype=np.int64)), params or self.params)[0]
+
+    def q_values(self, state):
+        x = np.array(self.encoder.decode(state), dtype=np.float64) / FEATURE_SCALES
+        return self.forward(x[None, :], self.params)[0][0].tolist()
+
+    def update_q_table(self, state, action, reward, next_state, done=False, discount=None):
+        self.replay.append(state, action, reward, next_state, done,
+                           self.discount_factor if discount is None else discount)
+        if self.replay.size >= max(self.warmup, self.batch_size) and self.replay.position % self.train_every == 0:
+            self.train_step()
+        self.record_update(state, action, reward, next_state, done, self.last_td_error)
+
+    def update_batch(self, states, actions, rewards, next_states, dones, discount=None):
+        """Batch form of update_q_table: the transitions go into the replay buffer together and
+        the gradient steps their train_every schedule calls for are taken afterwards"""
+        states, actions, rewards, next_states, dones = batch_arrays(states, actions, rewards, next_states, dones)
+        position = self.replay.position
+        self.replay.extend(states, actions, rewards, next_states, dones,
+                           self.discount_factor if discount is None else discount)
+        if self.replay.size >= max(self.warmup, self.batch_size):
+            # One step per write position that is a multiple of train_every, as in update_q_table
+            end = position + min(len(states), self.replay.capacity)
+            for _ in range(end // self.train_every - position // self.train_every):
+                self.train_step()
+        self.record_batch(states, actions, rewards, next_states, dones, len(states) * self.last_td_error)
+
+    def train_step(self):
+        states, actions, rewards, next_states, dones, discounts = self.replay.sample(self.rng, self.batch_size)
+        next_q = self.q_values_batch(next_states, self.target_params).max(axis=1)
+        targets = rewards + discounts * next_q * (1.0 - dones)
+        q, activations = self.forward(self.features(states), self.params)
+        rows = np.arange(len(states))
+        td_errors = q[rows, actions] - targets
+        # Huber loss gradient: the TD error, clipped to +-HUBER_DELTA
+        grad_output = np.zeros_like(q)
+        grad_output[rows, actions] = np.clip(td_errors, -HUBER_DELTA, HUBER_DELTA) / len(states)
+        grads = [None] * len(self.params)
+        grad = grad_output
+        for layer in range(len(self.params) // 2 - 1, -1, -1):
+            grads[2 * layer] = activations[layer].T @ grad
+            grads[2 * layer + 1] = grad.sum(axis=0)
+            if layer:
+                grad = (grad @ self.params[2 * layer].T) * (activations[layer] > 0)
+        self.adam_step(grads)
+        self.train_steps += 1
+        if self.train_steps % self.target_sync_every == 0:
+            self.target_params = [p.copy() for p in self.params]
+        self.last_td_error = float(np.abs(td_errors).mean())
+        q_max, q_min = float(q.max()), float(q.min())
+        self.max_q_value = max(self.max_q_value, q_max)
+        self.min_q_value = min(self.min_q_value, q_min)
+
+    def adam_step(self, grads):
+        beta1, beta2 = ADAM_BETAS
+        self.adam_t += 1
+        step = self.adam_learning_rate * np.sqrt(1 - beta2 ** self.adam_t) / (1 - beta1 ** self.adam_t)
+        for p, g, m, v in zip(self.params, grads, self.adam_m, self.adam_v):
+            m *= beta1
+            m += (1 - beta1) * g
+            v *= beta2
+            v += (1 - beta2) * g * g
+            p -= step * m / (np.sqrt(v) + ADAM_EPSILON)
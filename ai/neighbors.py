@@ -0,0 +1,88 @@
+import heapq
+import itertools
+from config.config import *
+from ai.state_encoder import STATE_ENCODER
+
+
+class NeighborIndex:
+    """Grid index over the discretized fields of visited states, to value states the Q-table hasn't seen.
+
+    States are bucketed into cells `cell_size` buckets wide along each of the
+    five fields. A lookup takes the `k` visited states nearest to a state
+    (squared distance in field buckets) from its cell and the 3**5 - 1 cells
+    around it, scanned nearest first until no further cell can hold a nearer
+    state, and blends their Q-values with inverse squared distance weights.
+    add() is O(1), so update_q_table keeps the index current as it
+    inserts states; states since evicted from the table are dropped from
+    their cell when a lookup runs into them. A lookup costs tens of
+    microseconds (a dict get per cell scanned, a distance per state in them),
+    against about one for a table hit.
+    """
+
+    def __init__(self, encoder=STATE_ENCODER, k=NEIGHBOR_COUNT, cell_size=NEIGHBOR_CELL_SIZE):
+        self.encoder = encoder
+        self.k = k
+        self.cell_size = cell_size
+        self.cells = {}  # cell id -> {state: decoded fields}
+        # Cell ids are mixed-radix with a spare cell on both sides of every field, so a neighbour
+        # offset never wraps into another row
+        self.cell_strides = []
+        stride = 1
+        for field in reversed(encoder.fields):
+            self.cell_strides.append(stride)
+            stride *= -(-field.radix // cell_size) + 2
+        self.cell_strides.reverse()
+        self.min_values = [field.min_value for field in encoder.fields]
+        # Neighbour cell offsets grouped by how many fields they step across: a state in a cell that
+        # is m steps away differs by at least one bucket in m fields, so is at distance >= m
+        rings = {}
+        for deltas in itertools.product((-1, 0, 1), repeat=len(encoder.fields)):
+            offset = sum(delta * stride for delta, stride in zip(deltas, self.cell_strides))
+            rings.setdefault(sum(map(abs, deltas)), []).append(offset)
+        self.rings = sorted(rings.items())
+
+    def __len__(self):
+        return sum(len(cell) for cell in self.cells.values())
+
+    def cell_id(self, values):
+        cell_size = self.cell_size
+        return sum(((value - low) // cell_size + 1) * stride
+                   for value, low, stride in zip(values, self.min_values, self.cell_strides))
+
+    def add(self, state):
+        values = self.encoder.decode(state)
+        self.cells.setdefault(self.cell_id(values), {})[state] = values
+
+    def rebuild(self, q_table):
+        self.cells = {}
+        for state in q_table.keys():
+            self.add(state)
+
+    def estimate(self, state, q_table):
+        """Interpolated [q_wait, q_flap] for `state` from its nearest visited neighbours, None if it has none"""
+        values = self.encoder.decode(state)
+        base = self.cell_id(values)
+        get = self.cells.get
+        candidates = []
+        for steps, offsets in self.rings:
+            if len(candidates) >= self.k and heapq.nsmallest(self.k, candidates)[-1][0] <= steps:
+                break  # Nothing further out can be nearer than the k already found
+            for offset in offsets:
+                cell = get(base + offset)
+                if cell:
+                    for neighbor, neighbor_values in cell.items():
+                        distance = sum((a - b) * (a - b) for a, b in zip(values, neighbor_values))
+                        candidates.append((distance, neighbor, base + offset))
+        wait = flap = total = 0.0
+        for distance, neighbor, cell_id in heapq.nsmallest(self.k, candidates):
+            q_values = q_table.get(neighbor)
+            if q_values is None:  # Evicted from the table since it was indexed
+                del self.cells[cell_id][neighbor]
+                continue
+            weight = 1.0 / max(distance, 1)
+            wait += weight * q_values[0]
+            flap += weight * q_values[1]
+            total += weight
+        if not total:
+            return None
+        return [wait / total, flap / total]
@@ -0,0 +1,265 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from config.config import *
+
+# Wire format (little endian). Every message is a header followed by `count` records.
+#   header: magic (3s), protocol (B), op (B), version (Q), count (I)
+#   record: state key (q), kind (B), q_wait (d), q_flap (d)
+# Keys are the packed ints from ai.state_encoder and values float64 like the local tables, so a record
+# is 25 bytes.
+MAGIC = b'FBQ'
+PROTOCOL_VERSION = 2  # 2: float64 values
+HEADER = struct.Struct('<3sBBQI')
+RECORD = struct.Struct('<qBdd')
+
+OP_PUSH = 1  # Apply records, reply with the new table version
+OP_PULL = 2  # Reply with every entry changed after the given version
+OP_SYNC = 3  # Push then pull in a single round trip
+OP_REPLY = 4
+OP_ERROR = 5
+
+KIND_DELTA = 0  # Add to the server value (experience since the last sync)
+KIND_VALUE = 1  # State new to the sender, blended into the server value
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer")
+        data += chunk
+    return bytes(data)
+
+
+def send_message(sock, op, version, records=()):
+    body = b''.join(RECORD.pack(key, kind, q0, q1) for key, kind, q0, q1 in records)
+    sock.sendall(HEADER.pack(MAGIC, PROTOCOL_VERSION, op, version, len(body) // RECORD.size) + body)
+
+
+def recv_message(sock):
+    magic, protocol, op, version, count = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    if magic != MAGIC or protocol != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported message (magic={magic!r}, protocol={protocol})")
+    body = _recv_exact(sock, count * RECORD.size) if count else b''
+    return op, version, list(RECORD.iter_unpack(body))
+
+
+class SharedQTable:
+    """Versioned Q-table held by the server. Every push bumps the version and
+    stamps the touched states with it so clients can pull only what changed."""
+
+    def __init__(self, blend_strength=PARAM_SERVER_BLEND_STRENGTH):
+        self.blend_strength = blend_strength
+        self.q_table = {}
+        self.versions = {}
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def apply(self, records):
+        with self.lock:
+            if not records:
+                return self.version
+            self.version += 1
+            for key, kind, q0, q1 in records:
+                current = self.q_table.get(key)
+                if current is None:
+                    self.q_table[key] = [q0, q1]
+                elif kind == KIND_DELTA:
+                    current[0] += q0
+                    current[1] += q1
+                else:
+                    current[0] = (1 - self.blend_strength) * current[0] + self.blend_strength * q0
+                    current[1] = (1 - self.blend_strength) * current[1] + self.blend_strength * q1
+                self.versions[key] = self.version
+            return self.version
+
+    def changed_since(self, version):
+        with self.lock:
+            records = [(key, KIND_VALUE, self.q_table[key][0], self.q_table[key][1])
+                       for key, key_version in self.versions.items() if key_version > version]
+            return self.version, records
+
+    def save(self, filename):
+        with self.lock:
+            serializable_q_table = {str(k): v for k, v in self.q_table.items()}
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
+            json.dump(serializable_q_table, f)
+        os.replace(tmp_filename, filename)
+
+    def load(self, filename):
+        from ai.state_encoder import STATE_ENCODER
+        with open(filename, 'r') as f:
+            loaded_q_table = json.load(f)
+        records = [(STATE_ENCODER.parse_key(k), KIND_VALUE, v[0], v[1]) for k, v in loaded_q_table.items()]
+        self.apply(records)
+
+
+class _ParameterHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        table = self.server.table
+        # Serve requests until the client disconnects, so connections are reused
+        while True:
+            try:
+                op, version, records = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            except (ValueError, struct.error):
+                send_message(self.request, OP_ERROR, 0)
+                return
+            if op == OP_PUSH:
+                send_message(self.request, OP_REPLY, table.apply(records))
+            elif op == OP_PULL:
+                send_message(self.request, OP_REPLY, *table.changed_since(version))
+            elif op == OP_SYNC:
+                table.apply(records)
+                send_message(self.request, OP_REPLY, *table.changed_since(version))
+            else:
+                send_message(self.request, OP_ERROR, 0)
+
+
+class ParameterServer(socketserver.ThreadingTCPServer):
+    """TCP server holding one shared Q-table for trainers on any machine"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host=PARAM_SERVER_HOST, port=PARAM_SERVER_PORT, table=None):
+        self.table = table if table is not None else SharedQTable()
+        super().__init__((host, port), _ParameterHandler)
+
+    def start(self):
+        """Serve from a background thread (used when the server lives inside a trainer or a test)"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class ParameterClient:
+    """Persistent connection to a ParameterServer, reconnecting once on failure"""
+
+    def __init__(self, host=PARAM_SERVER_HOST, port=PARAM_SERVER_PORT, timeout=10.0):
+        self.address = (host, port)
+        self.timeout = timeout
+        self.sock = None
+
+    def _request(self, op, version, records=()):
+        for attempt in range(2):
+            try:
+                if self.sock is None:
+                    self.sock = socket.create_connection(self.address, timeout=self.timeout)
+                    self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                send_message(self.sock, op, version, records)
+                reply_op, reply_version, reply_records = recv_message(self.sock)
+                break
+            except (ConnectionError, OSError):
+                self.close()
+                if attempt:
+                    raise
+        if reply_op != OP_REPLY:
+            raise ValueError("Parameter server rejected the request")
+        return reply_version, reply_records
+
+    def push(self, records):
+        return self._request(OP_PUSH, 0, records)[0]
+
+    def pull(self, since=0):
+        return self._request(OP_PULL, since)
+
+    def sync(self, records, since):
+        return self._request(OP_SYNC, since, records)
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+
+class RemoteTableSync:
+    """Keeps one local Q-table in sync with the server.
+
+    Only the change since the previous sync is pushed. States this client
+    pushed come back from the server with its own change already applied
+    alongside everyone else's, so they take the server value as is; other
+    pulled values are blended into the local table with `blend_strength`
+    (the same role as MultiAITrainer.knowledge_sharing_strength). The
+    baseline only keeps states still in the local table, so it shrinks with
+    a BoundedQTable's evictions.
+    """
+
+    def __init__(self, client, blend_strength=PARAM_SERVER_BLEND_STRENGTH):
+        self.client = client
+        self.blend_strength = blend_strength
+        self.baseline = {}
+        self.version = 0
+
+    def sync(self, q_table, neighbors=None):
+        """Push local changes, blend in the pulled ones; states new to q_table are added to `neighbors`"""
+        # States evicted from a bounded table since the last sync; one that comes back is pushed as new
+        for state in [state for state in self.baseline if state not in q_table]:
+            del self.baseline[state]
+        records = []
+        for state, q_values in q_table.items():
+            base = self.baseline.get(state)
+            if base is None:
+                records.append((state, KIND_VALUE, q_values[0], q_values[1]))
+            elif q_values[0] != base[0] or q_values[1] != base[1]:
+                records.append((state, KIND_DELTA, q_values[0] - base[0], q_values[1] - base[1]))
+        pushed = {state for state, _, _, _ in records}
+        # The server stamps every pushed state with the new version, so all of them are pulled back
+        self.version, pulled = self.client.sync(records, self.version)
+        for state, _, q0, q1 in pulled:
+            local = q_table.get(state)
+            if local is not None and state not in pushed:
+                q_table[state] = [
+                    (1 - self.blend_strength) * local[0] + self.blend_strength * q0,
+                    (1 - self.blend_strength) * local[1] + self.blend_strength * q1
+                ]
+            else:
+                # A pushed state may have been evicted by an earlier insert of this pull
+                q_table[state] = [q0, q1]
+                if local is None and neighbors is not None:
+                    neighbors.add(state)
+            self.baseline[state] = tuple(q_table[state])
+        return len(records), len(pulled)
+
+
+def parse_address(address):
+    """Parse 'host:port' (or just 'port') into a (host, port) tuple"""
+    host, _, port = address.rpartition(':')
+    return host or PARAM_SERVER_HOST, int(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared Q-table parameter server")
+    parser.add_argument('--host', default=PARAM_SERVER_HOST)
+    parser.add_argument('--port', type=int, default=PARAM_SERVER_PORT)
+    parser.add_argument('--table', default=None, help="Q-table file to load at start and save on exit")
+    args = parser.parse_args()
+
+    server = ParameterServer(args.host, args.port)
+    if args.table and os.path.exists(args.table):
+        server.table.load(args.table)
+        print(f"Loaded {len(server.table.q_table)} states from {args.table}")
+    print(f"Parameter server listening on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.table:
+            server.table.save(args.table)
+            print(f"Saved {len(server.table.q_table)} states to {args.table}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import argparse
+import multiprocessing as mp
+import random
+from concurrent.futures import ProcessPoolExecutor
+from config.config import *
+
+# Hyperparameters explored by the scheduler, with the range each one is clipped to
+AGENT_HYPERPARAMETERS = {
+    'learning_rate': (0.001, 1.0),
+    'discount_factor': (0.5, 0.9999),
+    'epsilon_decay': (0.99, 0.99999),
+}
+# Values close to 1 are perturbed through their distance to 1 (the effective horizon)
+PERTURB_COMPLEMENT = {'discount_factor', 'epsilon_decay'}
+REWARD_WEIGHTS = {
+    'survival_reward': SURVIVAL_REWARD,
+    'score_reward': SCORE_REWARD,
+    'death_penalty': DEATH_PENALTY,
+    'height_penalty': HEIGHT_PENALTY,
+    'flap_penalty': FLAP_PENALTY,
+    'ceiling_penalty': CEILING_COLLISION_PENALTY,
+}
+
+
+def _init_worker():
+    from game.environment import enable_headless
+    enable_headless()
+
+
+def run_member(member, steps, seed):
+    """Worker: train one population member for a fixed frame budget.
+
+    Returns the updated Q-table and its visit counts as plain dicts (a BoundedQTable is rebuilt
+    from them on the other side), epsilon and the scores of the episodes played.
+    """
+    from ai.ai_agent import FlappyBirdAI
+    from game.environment import EpisodeBudget, FlappyEnv
+    from game.reward_system import RewardSystem
+
+    random.seed(seed)
+    hyperparameters = member['hyperparameters']
+    ai = FlappyBirdAI(learning_rate=hyperparameters['learning_rate'],
+                      discount_factor=hyperparameters['discount_factor'],
+                      epsilon=member['epsilon'],
+                      epsilon_decay=hyperparameters['epsilon_decay'])
+    ai.q_table = ai.new_q_table(member['q_table'], member.get('visits'))
+    reward_system = RewardSystem(**member['reward_weights'])
+    env = FlappyEnv()
+    budget = EpisodeBudget()
+    scores = []
+    steps_left = steps
+    while steps_left > 0:
+        bird, pipes = env.reset()
+        state = ai.get_state(bird, pipes)
+        game_over = truncated = False
+        budget.start()
+        while not game_over and not truncated and steps_left > 0:
+            action = ai.get_smart_action(state, bird, pipes)
+            game_over = env.step(action)
+            pipes = env.pipes
+            next_state = ai.get_state(bird, pipes)
+            reward = reward_system.calculate_reward(bird, pipes, env.score, game_over, action)
+            ai.update_q_table(state, action, reward, next_state, game_over)
+            state = next_state
+            steps_left -= 1
+            truncated = budget.tick()
+        reward_system.reset()
+        if game_over or truncated:
+            ai.end_episode()
+            scores.append(env.score)
+        elif not scores:
+            # The budget ran out mid-episode; count it so a bird that never dies is still ranked
+            scores.append(env.score)
+    return dict(ai.q_table), table_visits(ai.q_table), ai.epsilon, scores
+
+
+def table_visits(q_table):
+    """{state: visits} of a BoundedQTable, {} for a plain dict"""
+    if not hasattr(q_table, 'visits'):
+        return {}
+    return {state: q_table.visits(state) for state in q_table.meta}
+
+
+class PopulationBasedTrainer:
+    """Population-based training over the agent and reward hyperparameters.
+
+    Every round each member plays `steps_per_round` frames in a worker
+    process. Members are then ranked by mean score; the bottom fraction copy
+    the Q-table, epsilon and hyperparameters of a random top member, and the
+    copied hyperparameters are perturbed.
+    """
+
+    def __init__(self, population_size=PBT_POPULATION_SIZE, steps_per_round=PBT_STEPS_PER_ROUND,
+                 workers=PBT_WORKERS, truncation_fraction=PBT_TRUNCATION_FRACTION,
+                 perturb_factors=PBT_PERTURB_FACTORS):
+        self.population_size = population_size
+        self.steps_per_round = steps_per_round
+        self.workers = workers
+        self.truncation_fraction = truncation_fraction
+        self.perturb_factors = perturb_factors
+        self.round = 0
+        self.best_score = 0
+        self.members = []
+        for i in range(population_size):
+            # Same initial spread as MultiAITrainer
+            self.members.append({
+                'id': i,
+                'epsilon': EPSILON * (1 + i * 0.1),
+                'hyperparameters': {
+                    'learning_rate': LEARNING_RATE * (1 + i * 0.05),
+                    'discount_factor': DISCOUNT_FACTOR,
+                    'epsilon_decay': EPSILON_DECAY,
+                },
+                'reward_weights': dict(REWARD_WEIGHTS),
+                'q_table': {},
+                'visits': {},
+                'scores': [],
+            })
+
+    def load_q_table(self, filename=Q_TABLE_FILE):
+        from ai.ai_agent import FlappyBirdAI
+        ai = FlappyBirdAI()
+        ai.load_q_table(filename)
+        for member in self.members:
+            member['q_table'] = {state: list(q_values) for state, q_values in ai.q_table.items()}
+            member['visits'] = table_visits(ai.q_table)
+
+    def fitness(self, member):
+        scores = member['scores']
+        return sum(scores) / len(scores) if scores else 0
+
+    def perturb(self, value, low=None, high=None, complement=False):
+        if complement:
+            value = 1 - (1 - value) * random.choice(self.perturb_factors)
+        else:
+            value *= random.choice(self.perturb_factors)
+        if low is not None:
+            value = min(max(value, low), high)
+        return value
+
+    def exploit_and_explore(self):
+        ranked = sorted(self.members, key=self.fitness, reverse=True)
+        cutoff = max(1, int(len(ranked) * self.truncation_fraction))
+        top, bottom = ranked[:cutoff], ranked[-cutoff:]
+        for member in bottom:
+            if member in top:
+                continue
+            source = random.choice(top)
+            member['q_table'] = {state: list(q_values) for state, q_values in source['q_table'].items()}
+            member['visits'] = dict(source.get('visits', {}))
+            member['epsilon'] = source['epsilon']
+            member['hyperparameters'] = {name: self.perturb(source['hyperparameters'][name], *AGENT_HYPERPARAMETERS[name],
+                                                            complement=name in PERTURB_COMPLEMENT)
+                                         for name in AGENT_HYPERPARAMETERS}
+            member['reward_weights'] = {name: self.perturb(value) for name, value in source['reward_weights'].items()}
+            print(f"   Member {member['id'] + 1} <- member {source['id'] + 1}: " +
+                  ", ".join(f"{name}={value:.4g}" for name, value in member['hyperparameters'].items()))
+        return ranked[0]
+
+    def train_round(self, executor):
+        futures = [executor.submit(run_member, member, self.steps_per_round,
+                                   random.getrandbits(32))
+                   for member in self.members]
+        for member, future in zip(self.members, futures):
+            member['q_table'], member['visits'], member['epsilon'], member['scores'] = future.result()
+        self.round += 1
+        best = self.exploit_and_explore()
+        best_round_score = max(best['scores']) if best['scores'] else 0
+        print(f"Round {self.round}: best member {best['id'] + 1}, avg score {self.fitness(best):.1f}, "
+              f"Q-table size {len(best['q_table'])}")
+        return best, best_round_score
+
+    def run(self, rounds=None):
+        ctx = mp.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx, initializer=_init_worker) as executor:
+            while rounds is None or self.round < rounds:
+                best, best_round_score = self.train_round(executor)
+                if best_round_score > self.best_score:
+                    self.best_score = best_round_score
+                    self.save_best(best)
+                    print(f"🎉 New best score: {self.best_score} (Round {self.round}, member {best['id'] + 1})")
+
+    def save_best(self, member, filename=Q_TABLE_FILE):
+        from ai.ai_agent import FlappyBirdAI
+        ai = FlappyBirdAI()
+        ai.q_table = ai.new_q_table(member['q_table'], member.get('visits'))
+        ai.save_q_table(filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Population-based training of Flappy Bird agents")
+    parser.add_argument('--population', type=int, default=PBT_POPULATION_SIZE)
+    parser.add_argument('--workers', type=int, default=PBT_WORKERS)
+    parser.add_argument('--steps-per-round', type=int, default=PBT_STEPS_PER_ROUND)
+    parser.add_argument('--rounds', type=int, default=None, help="Rounds to run (default: until Ctrl+C)")
+    parser.add_argument('--resume', action='store_true', help="Continue the last saved training session")
+    args = parser.parse_args()
+
+    from ai.session import save_session, load_session, session_file
+    trainer = PopulationBasedTrainer(population_size=args.population, steps_per_round=args.steps_per_round,
+                                     workers=args.workers)
+    trainer.load_q_table()
+    # Members are plain dicts (Q-table, epsilon, hyperparameters), so they go in the trainer state
+    trainer_state = load_session(session_file('pbt'), []) if args.resume else None
+    if trainer_state is not None:
+        trainer.members = trainer_state['members']
+        trainer.round = trainer_state['round']
+        trainer.best_score = trainer_state['best_score']
+    print(f"Starting population-based training with {args.population} agents")
+    try:
+        trainer.run(rounds=args.rounds)
+    except KeyboardInterrupt:
+        print("\nTraining stopped by user.")
+    save_session(session_file('pbt'), [], {
+        'members': trainer.members, 'round': trainer.round, 'best_score': trainer.best_score,
+    })
+    print(f"🏁 Best score achieved: {trainer.best_score}")
+
+
+if __name__ == "__main__":
+    main()
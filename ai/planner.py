@@ -0,0 +1,134 @@
+from collections import OrderedDict
+from config.config import *
+from game.environment import SNAPSHOT_HEADER
+
+
+class LookaheadPlanner:
+    """Depth-limited search over simulated futures, with the Q-table as leaf evaluator.
+
+    Each decision branches into flap or wait, held for `frames_per_decision`
+    frames (flap on the first, glide after), for `depth` decisions. Futures are
+    simulated on a private FlappyEnv restored from a snapshot of the live bird
+    and pipes.
+
+    Decisions fall on a fixed frame grid (taken from the pipe position), and
+    only the first one is shortened to reach the grid. Searches from
+    consecutive frames therefore meet the same grid states with the same
+    depth left. Their values are kept in a transposition cache bounded to
+    `cache_size` entries with least-recently-used eviction.
+
+    The cache key is the state discretized at the physics' own resolution
+    (positions move in half pixels, velocity in GRAVITY steps), so it is exact.
+    The Q-table's coarser buckets merge states with different futures and
+    would hand back values of the wrong subtree.
+
+    Path rewards come from a RewardSystem like the one the agent learns from,
+    discounted with the agent's own factor, so they are on the same scale as
+    the Q-values at the leaves. Each decision starts with no consecutive flaps
+    counted, since snapshots don't carry that history.
+    """
+
+    def __init__(self, ai, depth=PLANNER_DEPTH, frames_per_decision=PLANNER_FRAMES_PER_DECISION,
+                 cache_size=PLANNER_CACHE_SIZE, discount_factor=None, reward_system=None):
+        from game.environment import FlappyEnv
+        from game.reward_system import RewardSystem
+        if discount_factor is None:
+            discount_factor = ai.discount_factor
+        self.ai = ai
+        self.depth = depth
+        self.frames_per_decision = frames_per_decision
+        self.cache_size = cache_size
+        self.discount_factor = discount_factor
+        self.reward_system = reward_system if reward_system is not None else RewardSystem()
+        self.env = FlappyEnv(record_collisions=False)
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.nodes = 0
+        # Discount for a decision lasting 0..frames_per_decision frames
+        self.discounts = [discount_factor ** frames for frames in range(frames_per_decision + 1)]
+
+    def clear(self):
+        """Drop cached values, e.g. after the Q-table has moved on"""
+        self.cache.clear()
+
+    def leaf_value(self, state):
+        q_values = self.ai.q_table.get(state)
+        if q_values is None:
+            q_values = self.ai.unseen_q_values(state)  # [0, 0], or the neighbour backoff when enabled
+        return max(q_values)
+
+    @staticmethod
+    def cache_key(snapshot, depth):
+        # Bird y and velocity plus every pipe; score, step count and pipe schedule don't change the physics
+        return snapshot[:2] + snapshot[SNAPSHOT_HEADER:] + (depth,)
+
+    def simulate(self, snapshot, action, frames):
+        """Play one decision from `snapshot`, returns (reward, child snapshot or None if crashed)"""
+        env = self.env
+        env.restore(snapshot)
+        reward_system = self.reward_system
+        reward_system.last_score = env.score
+        reward_system.consecutive_flaps = 0
+        total = 0.0
+        for frame in range(frames):
+            frame_action = action if frame == 0 else 0
+            game_over = env.step(frame_action)
+            total += self.discounts[frame] * reward_system.calculate_reward(env.bird, env.pipes, env.score,
+                                                                             game_over, frame_action)
+            if game_over:
+                return total, None
+        self.nodes += 1
+        return total, env.clone()
+
+    def value(self, snapshot, depth):
+        if depth == 0:
+            env = self.env
+            env.restore(snapshot)
+            return self.leaf_value(self.ai.get_state(env.bird, env.pipes))
+        key = self.cache_key(snapshot, depth)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return cached
+        self.misses += 1
+        best = max(self.action_value(snapshot, action, depth, self.frames_per_decision) for action in (0, 1))
+        self.cache[key] = best
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return best
+
+    def action_value(self, snapshot, action, depth, frames):
+        reward, child = self.simulate(snapshot, action, frames)
+        if child is None:
+            return reward
+        return reward + self.discounts[frames] * self.value(child, depth - 1)
+
+    def frames_to_grid(self, pipes):
+        # Pipes move PIPE_SPEED pixels a frame, so their position counts frames
+        return int(pipes[0].x // PIPE_SPEED) % self.frames_per_decision or self.frames_per_decision
+
+    def action_values(self, bird, pipes):
+        """Search value of (wait, flap) from the live bird and pipes"""
+        from game.environment import FlappyEnv
+        snapshot = FlappyEnv.snapshot_of(bird, pipes)
+        frames = self.frames_to_grid(pipes)
+        return [self.action_value(snapshot, action, self.depth, frames) for action in (0, 1)]
+
+    def get_action(self, state, bird, pipes):
+        """Drop-in replacement for FlappyBirdAI.get_smart_action"""
+        if not pipes:
+            return 0
+        wait_value, flap_value = self.action_values(bird, pipes)
+        if wait_value == flap_value:
+            return self.ai.get_smart_action(state, bird, pipes)
+        return 1 if flap_value > wait_value else 0
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'planner_cache_size': len(self.cache),
+            'planner_cache_hit_rate': self.hits / lookups if lookups else 0.0,
+            'planner_nodes': self.nodes,
+        }
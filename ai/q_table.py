@@ -0,0 +1,119 @@
+import heapq
+import sys
+from config.config import *
+
+# Visit count and last-touch tick share one int per state: visits in the high bits
+TICK_BITS = 40
+TICK_MASK = (1 << TICK_BITS) - 1
+MAX_VISITS = (1 << 23) - 1
+
+
+class BoundedQTable(dict):
+    """Q-table (state -> [q_wait, q_flap]) that stays under a fixed number of states.
+
+    Each state carries a visit count and the tick of its last update, packed
+    into a single int. When a new state would exceed `max_states`, the
+    `evict_fraction` lowest-ranked states are dropped in one batch: by least
+    recent update ('lru') or by fewest visits ('score'). States that were never
+    updated (visits == 0) always go first. `on_evict`, when set, is called
+    with the list of states each batch removed.
+    """
+
+    def __init__(self, max_states=Q_TABLE_MAX_STATES, policy=Q_TABLE_EVICTION_POLICY,
+                 evict_fraction=Q_TABLE_EVICTION_FRACTION, data=None, visits=None):
+        super().__init__()
+        if policy not in ('lru', 'score'):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.max_states = max_states
+        self.policy = policy
+        self.evict_fraction = evict_fraction
+        self.meta = {}
+        self.tick = 0
+        self.evictions = 0
+        self.eviction_batches = 0
+        self.on_evict = None
+        if data:
+            super().update(data)
+            visits = visits or {}
+            for state in data:
+                count = min(visits.get(state, 0), MAX_VISITS)
+                if count:
+                    self.meta[state] = count << TICK_BITS
+            if len(self) > self.max_states:
+                self.evict(len(self) - self.max_states)
+
+    def __reduce__(self):
+        # Plain dict pickling replays the items through __setitem__ before __dict__ (max_states) is
+        # restored, so rebuild from the constructor with the items instead; the state then restores
+        # the visit metadata, tick and counters
+        return (self.__class__, (self.max_states, self.policy, self.evict_fraction, dict(self)),
+                self.__dict__.copy())
+
+    def __setitem__(self, state, q_values):
+        is_new = state not in self
+        super().__setitem__(state, q_values)
+        if is_new and len(self) > self.max_states:
+            self.evict(max(1, int(self.max_states * self.evict_fraction)), protect=state)
+
+    def touch(self, state):
+        """Record an update of `state`"""
+        self.tick += 1
+        visits = (self.meta.get(state, 0) >> TICK_BITS) + 1
+        self.meta[state] = (min(visits, MAX_VISITS) << TICK_BITS) | (self.tick & TICK_MASK)
+
+    def visits(self, state):
+        return self.meta.get(state, 0) >> TICK_BITS
+
+    def _rank(self, state):
+        packed = self.meta.get(state, 0)
+        visits = packed >> TICK_BITS
+        if visits == 0:
+            return (0, 0)
+        if self.policy == 'lru':
+            return (1, packed & TICK_MASK)
+        return (1, packed)  # Fewest visits first, ties broken by age
+
+    def evict(self, count, protect=None):
+        victims = heapq.nsmallest(count + 1, self.keys(), key=self._rank)
+        removed = []
+        for state in victims:
+            if len(removed) == count:
+                break
+            if state == protect:
+                continue
+            super().__delitem__(state)
+            self.meta.pop(state, None)
+            removed.append(state)
+        self.evictions += len(removed)
+        self.eviction_batches += 1
+        if self.on_evict is not None:
+            self.on_evict(removed)
+        return len(removed)
+
+    def __delitem__(self, state):
+        super().__delitem__(state)
+        self.meta.pop(state, None)
+
+    def pop(self, state, *default):
+        self.meta.pop(state, None)
+        return super().pop(state, *default)
+
+    def clear(self):
+        super().clear()
+        self.meta.clear()
+
+    def memory_bytes(self):
+        """Rough memory estimate of the table, its value lists and the metadata"""
+        sample = next(iter(self.values()), [0.0, 0.0])
+        per_state = sys.getsizeof(sample) + sum(sys.getsizeof(q) for q in sample) + sys.getsizeof(1 << 62)
+        per_meta = sys.getsizeof(1 << 62)
+        return sys.getsizeof(self) + sys.getsizeof(self.meta) + len(self) * per_state + len(self.meta) * per_meta
+
+    def get_memory_stats(self):
+        return {
+            'q_table_max_states': self.max_states,
+            'eviction_policy': self.policy,
+            'evictions': self.evictions,
+            'eviction_batches': self.eviction_batches,
+            'memory_bytes': self.memory_bytes(),
+        }
@@ -0,0 +1,277 @@
+import argparse
+import heapq
+import math
+import os
+import re
+import tempfile
+import numpy as np
+from config.config import *
+from ai.state_encoder import STATE_ENCODER, FIELD_NAMES
+
+# One saved entry: "key": [q_wait, q_flap] or [q_wait, q_flap, visits]
+ENTRY_PATTERN = re.compile(r'"([^"]*)"\s*:\s*\[([^\]]*)\]')
+RECORD_DTYPE = np.dtype([
+    ('key', '<i8'),
+    ('q', '<f8', (2,)),
+    ('visits', '<f8'),
+    ('source', '<u2'),
+])
+READ_CHUNK_BYTES = 1 << 20
+BATCH_STATES = 65536
+BYTES_PER_SAVED_STATE = 30  # Lower bound of a saved entry, used to size partitions
+DEFAULT_PARTITION_STATES = 1000000
+
+
+def iter_q_table(filename, encoder=STATE_ENCODER):
+    """Stream (state, q_wait, q_flap, visits) out of a saved Q-table without loading it.
+
+    Visits is None for tables saved without visit counts.
+    """
+    with open(filename, 'r') as f:
+        buffer = ''
+        while True:
+            chunk = f.read(READ_CHUNK_BYTES)
+            buffer += chunk
+            end = 0
+            for match in ENTRY_PATTERN.finditer(buffer):
+                values = match.group(2).split(',')
+                visits = float(values[2]) if len(values) > 2 else None
+                yield encoder.parse_key(match.group(1)), float(values[0]), float(values[1]), visits
+                end = match.end()
+            buffer = buffer[end:]
+            if not chunk:
+                return
+
+
+def iter_batches(filename, source=0, encoder=STATE_ENCODER, batch_states=BATCH_STATES):
+    """Stream a saved Q-table as RECORD_DTYPE arrays of up to batch_states entries (missing visits = NaN)"""
+    batch = []
+    for state, q_wait, q_flap, visits in iter_q_table(filename, encoder):
+        batch.append((state, (q_wait, q_flap), math.nan if visits is None else visits, source))
+        if len(batch) == batch_states:
+            yield np.array(batch, dtype=RECORD_DTYPE)
+            batch = []
+    if batch:
+        yield np.array(batch, dtype=RECORD_DTYPE)
+
+
+class QTableWriter:
+    """Writes a Q-table in the checkpoint format one entry at a time"""
+
+    def __init__(self, filename, with_visits=False):
+        self.file = open(filename, 'w')
+        self.with_visits = with_visits
+        self.count = 0
+        self.file.write('{')
+
+    def write_batch(self, keys, q_values, visits=None):
+        entries = []
+        if self.with_visits:
+            for key, (q_wait, q_flap), count in zip(keys.tolist(), q_values.tolist(), visits.tolist()):
+                entries.append(f'"{key}": [{q_wait!r}, {q_flap!r}, {int(count)}]')
+        else:
+            for key, (q_wait, q_flap) in zip(keys.tolist(), q_values.tolist()):
+                entries.append(f'"{key}": [{q_wait!r}, {q_flap!r}]')
+        if entries:
+            self.file.write((', ' if self.count else '') + ', '.join(entries))
+            self.count += len(entries)
+
+    def close(self):
+        self.file.write('}')
+        self.file.close()
+
+
+class Partitioner:
+    """Spills records into hash partitions on disk so each one fits in memory.
+
+    All entries of a state land in the same partition, so merges and diffs are
+    done one partition at a time.
+    """
+
+    def __init__(self, directory, num_partitions):
+        self.num_partitions = num_partitions
+        self.paths = [os.path.join(directory, f'part_{i}.bin') for i in range(num_partitions)]
+        for path in self.paths:
+            open(path, 'wb').close()
+
+    def add(self, records):
+        if self.num_partitions == 1:
+            parts = np.zeros(len(records), dtype=np.int64)
+        else:
+            # Mix the key bits so neighbouring states spread over partitions
+            parts = ((records['key'].astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(40)) % np.uint64(self.num_partitions)
+        for part in np.unique(parts):
+            with open(self.paths[int(part)], 'ab') as f:
+                records[parts == part].tofile(f)
+
+    def __iter__(self):
+        for path in self.paths:
+            yield np.fromfile(path, dtype=RECORD_DTYPE)
+            os.remove(path)
+
+
+def count_partitions(filenames, partition_states):
+    total_bytes = sum(os.path.getsize(filename) for filename in filenames)
+    return max(1, math.ceil(total_bytes / BYTES_PER_SAVED_STATE / partition_states))
+
+
+def partition_tables(filenames, directory, partition_states):
+    partitioner = Partitioner(directory, count_partitions(filenames, partition_states))
+    has_visits = False
+    for source, filename in enumerate(filenames):
+        for batch in iter_batches(filename, source):
+            has_visits = has_visits or not np.isnan(batch['visits']).all()
+            partitioner.add(batch)
+    return partitioner, has_visits
+
+
+def merge_tables(filenames, output, weights=None, visit_weighted=False, partition_states=DEFAULT_PARTITION_STATES):
+    """Blend several tables: per state, the weighted mean of the Q-values of every table that has it.
+
+    Weights are per table, or the saved visit counts with visit_weighted
+    (tables without counts weigh 1 per state); a state whose weights sum to 0
+    gets the unweighted mean. Returns the number of states.
+    """
+    weights = np.asarray(weights if weights is not None else [1.0] * len(filenames), dtype=np.float64)
+    with tempfile.TemporaryDirectory(prefix='q_table_merge_') as directory:
+        partitioner, has_visits = partition_tables(filenames, directory, partition_states)
+        writer = QTableWriter(output, with_visits=has_visits)
+        try:
+            for records in partitioner:
+                if len(records) == 0:
+                    continue
+                visits = np.nan_to_num(records['visits'], nan=1.0) if visit_weighted else records['visits']
+                weight = weights[records['source']] * (visits if visit_weighted else 1.0)
+                order = np.argsort(records['key'], kind='stable')
+                keys = records['key'][order]
+                starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+                total_weight = np.add.reduceat(weight[order], starts)
+                blended = np.add.reduceat(records['q'][order] * weight[order, None], starts)
+                blended /= np.where(total_weight > 0, total_weight, 1.0)[:, None]
+                unweighted = total_weight <= 0  # e.g. every copy of the state has 0 visits: plain mean instead
+                if unweighted.any():
+                    counts = np.diff(np.r_[starts, len(keys)])
+                    blended[unweighted] = (np.add.reduceat(records['q'][order], starts)[unweighted]
+                                           / counts[unweighted, None])
+                merged_visits = np.add.reduceat(np.nan_to_num(records['visits'][order]), starts) if has_visits else None
+                writer.write_batch(keys[starts], blended, merged_visits)
+        finally:
+            writer.close()
+    return writer.count
+
+
+def last_per_key(records):
+    """One row per key, the last one as loading the table into a dict would keep. A saved table
+    can repeat a state, e.g. once as a legacy tuple key and once as a packed int."""
+    _, index = np.unique(records['key'][::-1], return_index=True)
+    return records[len(records) - 1 - index]
+
+
+def diff_tables(old_file, new_file, tolerance=1e-9, top=10, partition_states=DEFAULT_PARTITION_STATES):
+    """Compare two tables: added/removed/changed states, greedy-policy flips and the largest changes"""
+    report = {'only_old': 0, 'only_new': 0, 'common': 0, 'changed': 0, 'policy_flips': 0,
+              'mean_abs_change': 0.0, 'largest_changes': []}
+    total_change = 0.0
+    largest = []
+    with tempfile.TemporaryDirectory(prefix='q_table_diff_') as directory:
+        partitioner, _ = partition_tables([old_file, new_file], directory, partition_states)
+        for records in partitioner:
+            old = last_per_key(records[records['source'] == 0])
+            new = last_per_key(records[records['source'] == 1])
+            common, old_index, new_index = np.intersect1d(old['key'], new['key'], assume_unique=True, return_indices=True)
+            report['only_old'] += len(old) - len(common)
+            report['only_new'] += len(new) - len(common)
+            report['common'] += len(common)
+            if len(common) == 0:
+                continue
+            old_q = old['q'][old_index]
+            new_q = new['q'][new_index]
+            change = np.abs(new_q - old_q).max(axis=1)
+            report['changed'] += int((change > tolerance).sum())
+            report['policy_flips'] += int((np.argmax(old_q, axis=1) != np.argmax(new_q, axis=1)).sum())
+            total_change += float(change.sum())
+            for position in np.argsort(change)[-top:]:
+                item = (float(change[position]), int(common[position]), old_q[position].tolist(), new_q[position].tolist())
+                if len(largest) < top:
+                    heapq.heappush(largest, item)
+                else:
+                    heapq.heappushpop(largest, item)
+    if report['common']:
+        report['mean_abs_change'] = total_change / report['common']
+    report['largest_changes'] = sorted(largest, reverse=True)
+    return report
+
+
+def prune_table(filename, output, min_abs_q=None, min_visits=None, min_margin=None):
+    """Stream a table, keeping states that pass every given threshold. Returns (kept, dropped)."""
+    kept = dropped = 0
+    writer = None
+    try:
+        for records in iter_batches(filename):
+            if writer is None:
+                writer = QTableWriter(output, with_visits=not np.isnan(records['visits']).all())
+            keep = np.ones(len(records), dtype=bool)
+            q_values = records['q']
+            if min_abs_q is not None:
+                keep &= np.abs(q_values).max(axis=1) >= min_abs_q
+            if min_visits is not None:
+                keep &= np.nan_to_num(records['visits']) >= min_visits
+            if min_margin is not None:
+                keep &= np.abs(q_values[:, 0] - q_values[:, 1]) >= min_margin
+            writer.write_batch(records['key'][keep], q_values[keep], np.nan_to_num(records['visits'][keep]))
+            kept += int(keep.sum())
+            dropped += int(len(records) - keep.sum())
+    finally:
+        if writer is None:
+            writer = QTableWriter(output)
+        writer.close()
+    return kept, dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge, diff and prune saved Q-tables in bounded memory")
+    parser.add_argument('--partition-states', type=int, default=DEFAULT_PARTITION_STATES,
+                        help="Rough number of states held in memory at once by merge and diff")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    merge = commands.add_parser('merge', help="Blend several tables into one")
+    merge.add_argument('output')
+    merge.add_argument('tables', nargs='+')
+    merge.add_argument('--weights', default=None, help="Comma separated weight per table")
+    merge.add_argument('--visit-weighted', action='store_true', help="Weight each entry by its saved visit count")
+
+    diff = commands.add_parser('diff', help="Compare two tables")
+    diff.add_argument('old')
+    diff.add_argument('new')
+    diff.add_argument('--tolerance', type=float, default=1e-9)
+    diff.add_argument('--top', type=int, default=10, help="How many of the largest changes to list")
+
+    prune = commands.add_parser('prune', help="Drop states below thresholds")
+    prune.add_argument('table')
+    prune.add_argument('output')
+    prune.add_argument('--min-abs-q', type=float, default=None, help="Drop states whose Q-values are all smaller")
+    prune.add_argument('--min-visits', type=float, default=None, help="Drop states visited fewer times")
+    prune.add_argument('--min-margin', type=float, default=None, help="Drop states where wait and flap are this close")
+    args = parser.parse_args()
+
+    if args.command == 'merge':
+        weights = [float(w) for w in args.weights.split(',')] if args.weights else None
+        if weights is not None and len(weights) != len(args.tables):
+            parser.error("--weights needs one weight per table")
+        count = merge_tables(args.tables, args.output, weights, args.visit_weighted, args.partition_states)
+        print(f"Merged {len(args.tables)} tables into {args.output}: {count} states")
+    elif args.command == 'diff':
+        report = diff_tables(args.old, args.new, args.tolerance, args.top, args.partition_states)
+        print(f"Only in {args.old}: {report['only_old']}, only in {args.new}: {report['only_new']}, common: {report['common']}")
+        print(f"Changed: {report['changed']}, policy flips: {report['policy_flips']}, "
+              f"mean |change|: {report['mean_abs_change']:.4f}")
+        for change, state, old_q, new_q in report['largest_changes']:
+            fields = dict(zip(FIELD_NAMES, STATE_ENCODER.decode(state)))
+            print(f"  {fields}: {old_q[0]:.3f}/{old_q[1]:.3f} -> {new_q[0]:.3f}/{new_q[1]:.3f} (|change| {change:.3f})")
+    else:
+        kept, dropped = prune_table(args.table, args.output, args.min_abs_q, args.min_visits, args.min_margin)
+        print(f"Kept {kept} states, dropped {dropped} -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
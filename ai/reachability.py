@@ -0,0 +1,116 @@
+import math
+import numpy as np
+from config.config import *
+
+
+class ReachabilityIndex:
+    """Precomputed bounds on where the bird can be k frames from now.
+
+    Bird motion only depends on the velocity and the flap/wait choices, so for
+    every starting velocity and first action we tabulate the lowest and highest
+    vertical offset reachable after k frames: flapping on every later frame
+    gives the highest position, never flapping the lowest. Checking whether the
+    next gap is still reachable is then a few list lookups.
+
+    Bird.move pins the bird at the ceiling and zeroes its velocity. Flapping on
+    every frame then stays pinned, so the highest position is just clamped; the
+    lowest one changes, since a bird that hits the ceiling on its way up starts
+    falling from rest right away. That depends on the starting y, so the
+    tables keep the frame of each never-flap trajectory's apex and a fall from
+    rest, and can_clear splices them together when the rise reaches the ceiling.
+    """
+
+    def __init__(self, max_frames=REACHABILITY_MAX_FRAMES):
+        self.max_frames = max_frames
+        self.min_velocity = float(FLAP_STRENGTH)
+        self.max_velocity = math.ceil(math.sqrt(2 * GRAVITY * SCREEN_HEIGHT)) + 1
+        self.num_velocities = int(round((self.max_velocity - self.min_velocity) / GRAVITY)) + 1
+        # [action][velocity index][frames ahead] -> offset from the current y
+        self.min_dy = [[None] * self.num_velocities for _ in range(2)]
+        self.max_dy = [[None] * self.num_velocities for _ in range(2)]
+        self.apex_frame = [[0] * self.num_velocities for _ in range(2)]  # Frame of max_dy's highest point
+        for vi in range(self.num_velocities):
+            velocity = self.min_velocity + vi * GRAVITY
+            for action in (0, 1):
+                up = self._trajectory(velocity, action, flap_after=True)
+                down = self._trajectory(velocity, action, flap_after=False)
+                self.min_dy[action][vi] = up
+                self.max_dy[action][vi] = down
+                self.apex_frame[action][vi] = down.index(min(down))
+        self.fall_dy = self._trajectory(0.0, 0, flap_after=False)  # Falling from rest, after a ceiling hit
+        self.min_dy_array = np.array(self.min_dy, dtype=np.float32)
+        self.max_dy_array = np.array(self.max_dy, dtype=np.float32)
+
+    def _trajectory(self, velocity, action, flap_after):
+        offsets = [0.0]
+        y = 0.0
+        for frame in range(self.max_frames):
+            flap = action if frame == 0 else flap_after
+            if flap:
+                velocity = FLAP_STRENGTH
+            velocity += GRAVITY
+            y += velocity
+            offsets.append(y)
+        return offsets
+
+    def velocity_index(self, velocity):
+        vi = int(round((velocity - self.min_velocity) / GRAVITY))
+        return min(max(vi, 0), self.num_velocities - 1)
+
+    def ceiling_frame(self, y, action, vi, ceiling_y):
+        """First frame at which the never-flap trajectory from `y` hits the ceiling, None if it doesn't"""
+        max_dy = self.max_dy[action][vi]
+        limit = ceiling_y - y
+        apex = self.apex_frame[action][vi]
+        if max_dy[apex] >= limit:
+            return None
+        for frame in range(1, apex + 1):
+            if max_dy[frame] < limit:
+                return frame
+        return None
+
+    def frames_until(self, distance):
+        """Frames until a pipe edge `distance` pixels ahead reaches the bird (clamped to the table)"""
+        if distance < 0:
+            return 0
+        return min(int(distance // PIPE_SPEED) + 1, self.max_frames)
+
+    def can_clear(self, bird, pipe, action):
+        """Whether some sequence of actions starting with `action` keeps the bird inside the pipe's gap"""
+        half_width = bird.width / 2
+        half_height = bird.height / 2
+        frames_in = self.frames_until(pipe.x - (bird.x + half_width))
+        frames_out = self.frames_until(pipe.x + pipe.width - (bird.x - half_width))
+        if frames_out == 0:
+            return True  # Already past this pipe
+        vi = self.velocity_index(bird.velocity)
+        min_dy = self.min_dy[action][vi]
+        max_dy = self.max_dy[action][vi]
+        ceiling_y = bird.height // 2  # Where Bird.move pins the bird
+        hit_frame = self.ceiling_frame(bird.y, action, vi, ceiling_y)
+        ceiling = half_height
+        ground = SCREEN_HEIGHT - GROUND_HEIGHT - half_height
+        gap_top = pipe.top_height + half_height
+        gap_bottom = pipe.top_height + PIPE_GAP - half_height
+        # The next frame must stay above the ground whatever the pipe position
+        if bird.y + min_dy[1] > ground:
+            return False
+        for frames in (max(frames_in, 1), frames_out):
+            highest = max(bird.y + min_dy[frames], ceiling)
+            if hit_frame is not None and frames >= hit_frame:
+                lowest = min(ceiling_y + self.fall_dy[frames - hit_frame], ground)
+            else:
+                lowest = min(bird.y + max_dy[frames], ground)
+            if lowest < gap_top or highest > gap_bottom:
+                return False
+        return True
+
+    def action_mask(self, bird, pipes):
+        """(wait_ok, flap_ok) for the next pipe still ahead of the bird"""
+        for pipe in pipes:
+            if pipe.x + pipe.width >= bird.x - bird.width / 2:
+                return self.can_clear(bird, pipe, 0), self.can_clear(bird, pipe, 1)
+        return True, True
+
+
+REACHABILITY = ReachabilityIndex()
@@ -0,0 +1,70 @@
+import os
+import pickle
+import random
+import time
+import numpy as np
+from config.config import *
+
+SESSION_VERSION = 2  # 2: replay buffers store a discount per transition
+
+
+def session_file(name):
+    return SESSION_FILE_TEMPLATE.format(name=name)
+
+
+def save_session(filename, agents, trainer_state):
+    """Write agents, trainer counters, RNG states, pipe heatmap and adaptive gap offset to one file.
+
+    The file is written next to its destination and renamed over it, so a
+    crash mid-save leaves the previous checkpoint intact.
+    """
+    import game.main as main
+    session = {
+        'version': SESSION_VERSION,
+        'saved_at': time.time(),
+        'agents': [ai.session_state() for ai in agents],
+        'trainer': trainer_state,
+        'random_state': random.getstate(),
+        'numpy_random_state': np.random.get_state(),
+        'pipe_heatmap': {side: list(values) for side, values in main.GLOBAL_PIPE_HEATMAP.items()},
+        'adaptive_gap_offset': main.ADAPTIVE_GAP_OFFSET,
+    }
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = filename + '.tmp'
+    with open(temporary, 'wb') as f:
+        pickle.dump(session, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, filename)
+
+
+def load_session(filename, agents):
+    """Restore a checkpoint written by save_session into `agents`, returns the trainer state.
+
+    Returns None (and changes nothing) when there is no usable checkpoint.
+    """
+    import game.main as main
+    if not os.path.exists(filename):
+        print(f"No session checkpoint at {filename}, starting a new session")
+        return None
+    try:
+        with open(filename, 'rb') as f:
+            session = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError) as e:
+        print(f"Could not read session checkpoint {filename}: {e}. Starting a new session.")
+        return None
+    if session.get('version') != SESSION_VERSION or len(session['agents']) != len(agents):
+        print(f"Session checkpoint {filename} doesn't match this trainer, starting a new session")
+        return None
+    for ai, state in zip(agents, session['agents']):
+        ai.restore_session_state(state)
+    random.setstate(session['random_state'])
+    np.random.set_state(session['numpy_random_state'])
+    main.GLOBAL_PIPE_HEATMAP = session['pipe_heatmap']
+    main.PIPE_HEATMAP_REVISION += 1
+    main.ADAPTIVE_GAP_OFFSET = session['adaptive_gap_offset']
+    age = time.time() - session['saved_at']
+    print(f"Resumed session from {filename} (saved {age / 60:.1f} minutes ago)")
+    return session['trainer']
@@ -0,0 +1,136 @@
+import ast
+import math
+import numpy as np
+from config.config import *
+
+# Pixel ranges covered by the lookup tables. Values outside a range are clamped
+# to its nearest edge, so every key stays inside the packed space.
+PIPE_X_MARGIN = 100  # Pipes are still tracked a little after leaving the screen
+PIPE_SPAWN_X = SCREEN_WIDTH + 200
+FIELD_NAMES = ('bird_y', 'velocity', 'pipe_x', 'gap_y', 'gap_diff')
+
+
+def _trunc_div(value, divisor):
+    # Same rounding as int(value / divisor) in the original tuple encoding
+    return int(value / divisor)
+
+
+class _FieldTable:
+    """Lookup table mapping an integer pixel value to its pre-shifted key contribution"""
+
+    def __init__(self, low, high, divisor):
+        self.low = low
+        self.high = high
+        self.divisor = divisor
+        self.min_value = _trunc_div(low, divisor)
+        self.max_value = _trunc_div(high - 1, divisor)
+        self.radix = self.max_value - self.min_value + 1
+        self.stride = 1
+        self.contributions = []
+        self.array = None
+
+    def build(self, stride):
+        self.stride = stride
+        self.contributions = [(_trunc_div(pixel, self.divisor) - self.min_value) * stride
+                              for pixel in range(self.low, self.high)]
+        self.array = np.array(self.contributions, dtype=np.int64)
+
+    def lookup(self, pixel):
+        if pixel < self.low:
+            return self.contributions[0]
+        if pixel >= self.high:
+            return self.contributions[-1]
+        return self.contributions[pixel - self.low]
+
+    def lookup_batch(self, pixels):
+        index = np.clip(np.trunc(pixels).astype(np.int64) - self.low, 0, self.high - self.low - 1)
+        return self.array[index]
+
+    def pack(self, value):
+        value = min(max(value, self.min_value), self.max_value)
+        return (value - self.min_value) * self.stride
+
+
+class StateEncoder:
+    """Packs the five discretized state fields into a single int key.
+
+    Every input is bounded, so each field gets a per-pixel table holding its
+    bucket already multiplied by the field's stride. Encoding a frame is then
+    five list lookups and an add instead of five float divisions and a tuple.
+    Field order (most significant first): bird y, velocity, pipe x, gap y,
+    bird-gap difference.
+    """
+
+    def __init__(self, bird_y_divisor=BIRD_Y_DIVISOR, velocity_divisor=BIRD_VELOCITY_DIVISOR,
+                 pipe_x_divisor=PIPE_X_DIVISOR, gap_y_divisor=PIPE_GAP_Y_DIVISOR,
+                 gap_diff_divisor=BIRD_GAP_DIFF_DIVISOR):
+        # Fastest fall possible is from the ceiling to below the screen
+        max_velocity = int(math.ceil(math.sqrt(2 * GRAVITY * SCREEN_HEIGHT))) + 1
+        self.fields = [
+            _FieldTable(0, SCREEN_HEIGHT, bird_y_divisor),
+            _FieldTable(int(FLAP_STRENGTH), max_velocity + 1, velocity_divisor),
+            _FieldTable(-PIPE_X_MARGIN, PIPE_SPAWN_X + 1, pipe_x_divisor),
+            _FieldTable(0, SCREEN_HEIGHT, gap_y_divisor),
+            _FieldTable(-SCREEN_HEIGHT, SCREEN_HEIGHT + 1, gap_diff_divisor),
+        ]
+        stride = 1
+        for field in reversed(self.fields):
+            field.build(stride)
+            stride *= field.radix
+        self.num_keys = stride
+        self.bird_y, self.velocity, self.pipe_x, self.gap_y, self.gap_diff = self.fields
+        self.empty_key = self.pack((0, 0, 0, 0, 0))
+
+    def encode(self, bird, pipes):
+        if not pipes:
+            return self.empty_key
+        next_pipe = pipes[0]
+        gap_center_y = next_pipe.top_height + PIPE_GAP // 2
+        return (self.bird_y.lookup(int(bird.y))
+                + self.velocity.lookup(int(bird.velocity))
+                + self.pipe_x.lookup(int(next_pipe.x))
+                + self.gap_y.lookup(gap_center_y)
+                + self.gap_diff.lookup(int(bird.y - gap_center_y)))
+
+    def encode_batch(self, bird_ys, velocities, pipe_xs, gap_center_ys):
+        """Vectorized encode for arrays of raw pixel values, returns an int64 array of keys"""
+        bird_ys = np.asarray(bird_ys, dtype=np.float64)
+        gap_center_ys = np.asarray(gap_center_ys, dtype=np.float64)
+        return (self.bird_y.lookup_batch(bird_ys)
+                + self.velocity.lookup_batch(np.asarray(velocities, dtype=np.float64))
+                + self.pipe_x.lookup_batch(np.asarray(pipe_xs, dtype=np.float64))
+                + self.gap_y.lookup_batch(gap_center_ys)
+                + self.gap_diff.lookup_batch(bird_ys - gap_center_ys))
+
+    def pack(self, values):
+        """Pack an already discretized 5-tuple (the old Q-table key format)"""
+        return sum(field.pack(value) for field, value in zip(self.fields, values))
+
+    def decode(self, key):
+        """Unpack a key back into its discretized 5-tuple"""
+        values = []
+        for field in self.fields:
+            code, key = divmod(key, field.stride)
+            values.append(code + field.min_value)
+        return tuple(values)
+
+    def decode_batch(self, keys):
+        """Vectorized decode, returns an (n, 5) int64 array of discretized fields"""
+        keys = np.asarray(keys, dtype=np.int64)
+        decoded = np.empty((keys.shape[0], len(self.fields)), dtype=np.int64)
+        for column, field in enumerate(self.fields):
+            decoded[:, column] = keys // field.stride + field.min_value
+            keys = keys % field.stride
+        return decoded
+
+    def parse_key(self, text):
+        """Parse a saved Q-table key, accepting both packed ints and legacy tuple strings"""
+        text = text.strip()
+        if text.startswith('('):
+            return self.pack(ast.literal_eval(text))
+        return int(text)
+
+
+STATE_ENCODER = StateEncoder()
+# One bucket per pixel (and per unit of velocity), for agents that generalize across states themselves
+PIXEL_STATE_ENCODER = StateEncoder(1, 1, 1, 1, 1)
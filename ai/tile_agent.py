@@ -0,0 +1,124 @@
+import math
+import numpy as np
+from config.config import *
+from ai.ai_agent import ApproximateAI, batch_arrays
+
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+COORD_MULTIPLIER = 1000003
+MASK64 = (1 << 64) - 1
+TILE_CACHE_SIZE = 200000  # States whose active tiles are remembered for the scalar path
+
+
+class TileCodingAI(ApproximateAI):
+    """Linear Q-function over tile-coded bird y, velocity, pipe x and gap y.
+
+    `tilings` grids of tiles `tile_widths` wide cover the four inputs, each
+    shifted by a different fraction of a tile (asymmetric offsets 1, 3, 5, 7).
+    A state activates one tile per tiling; tiles are hashed into a fixed array
+    of 2**hash_bits weights per action and Q(s, a) is the sum of the active
+    weights. Neighbouring states share most tiles, so an update also moves
+    their values, and memory does not grow with the number of states seen.
+    """
+    checkpoint_suffix = '.tiles.npz'
+    session_excluded = ApproximateAI.session_excluded + ('tile_cache',)
+
+    def __init__(self, learning_rate=LEARNING_RATE, discount_factor=DISCOUNT_FACTOR, epsilon=EPSILON,
+                 epsilon_decay=EPSILON_DECAY, tilings=TILE_CODING_TILINGS, tile_widths=TILE_CODING_TILE_WIDTHS,
+                 hash_bits=TILE_CODING_HASH_BITS):
+        self.tilings = tilings
+        self.tile_widths = np.array(tile_widths, dtype=np.float64)
+        self.hash_bits = hash_bits
+        self.offsets = (np.arange(tilings)[:, None] * (2 * np.arange(len(tile_widths)) + 1)[None, :]
+                        / tilings) % 1.0
+        self.tiling_ids = np.arange(tilings, dtype=np.int64)
+        self.offset_rows = self.offsets.tolist()
+        self.width_list = self.tile_widths.tolist()
+        self.weights = None
+        self.tile_cache = {}
+        super().__init__(learning_rate=learning_rate, discount_factor=discount_factor, epsilon=epsilon,
+                         epsilon_decay=epsilon_decay)
+
+    def restore_session_state(self, state):
+        super().restore_session_state(state)
+        self.tile_cache = {}
+
+    def reset_parameters(self):
+        self.weights = np.zeros((1 << self.hash_bits, 2))
+        self.tile_cache.clear()
+
+    def get_parameters(self):
+        return {'weights': self.weights}
+
+    def set_parameters(self, parameters):
+        weights = np.asarray(parameters['weights'], dtype=np.float64)
+        if weights.shape != (1 << self.hash_bits, 2):
+            raise ValueError(f"Weights of shape {weights.shape} don't match {self.hash_bits} hash bits")
+        self.weights = weights.copy()
+
+    def parameter_usage(self):
+        return int(np.count_nonzero(self.weights.any(axis=1)))
+
+    def tiles_batch(self, states):
+        """(n, tilings) weight indices of the tiles active in each state"""
+        inputs = self.decode_batch(states)[:, :len(self.tile_widths)] / self.tile_widths
+        coords = np.floor(inputs[:, None, :] + self.offsets[None, :, :]).astype(np.int64)
+        hashed = np.broadcast_to(self.tiling_ids, coords.shape[:2]).copy()
+        for dimension in range(coords.shape[2]):
+            hashed = hashed * COORD_MULTIPLIER + coords[:, :, dimension]  # Wraps like the & MASK64 below
+        hashed = hashed.astype(np.uint64) * np.uint64(HASH_MULTIPLIER)
+        return (hashed >> np.uint64(64 - self.hash_bits)).astype(np.int64)
+
+    def tiles(self, state):
+        """Same indices as tiles_batch for one state, in plain Python (numpy overhead dominates at n = 1)"""
+        tiles = self.tile_cache.get(state)
+        if tiles is None:
+            if len(self.tile_cache) >= TILE_CACHE_SIZE:
+                self.tile_cache.clear()
+            inputs = [value / width for value, width in zip(self.encoder.decode(state), self.width_list)]
+            shift = 64 - self.hash_bits
+            tiles = []
+            for tiling, offsets in enumerate(self.offset_rows):
+                hashed = tiling
+                for value, offset in zip(inputs, offsets):
+                    hashed = (hashed * COORD_MULTIPLIER + math.floor(value + offset)) & MASK64
+                tiles.append(((hashed * HASH_MULTIPLIER) & MASK64) >> shift)
+            tiles = self.tile_cache[state] = np.array(tiles, dtype=np.int64)
+        return tiles
+
+    def q_values(self, state):
+        return self.weights[self.tiles(state)].sum(axis=0).tolist()
+
+    def q_values_batch(self, states):
+        """(n, 2) Q-values for an array of states, e.g. every bird of a population"""
+        return self.weights[self.tiles_batch(np.asarray(states, dtype=np.int64))].sum(axis=1)
+
+    def update_q_table(self, state, action, reward, next_state, done=False, discount=None):
+        tiles = self.tiles(state)
+        current_q = self.weights[tiles, action].sum()
+        max_next_q = 0.0 if done else max(self.q_values(next_state))
+        if discount is None:
+            discount = self.discount_factor
+        td_error = reward + discount * max_next_q - current_q
+        # The step is split over the active tiles; add.at keeps hash collisions within a state additive
+        np.add.at(self.weights[:, action], tiles, self.learning_rate * td_error / self.tilings)
+        q_change = abs(self.learning_rate * td_error)
+        self.record_update(state, action, reward, next_state, done, q_change, current_q + self.learning_rate * td_error)
+
+    def update_batch(self, states, actions, rewards, next_states, dones, discount=None):
+        """Batch form of update_q_table. Each (state, action) pair takes one step towards the mean
+        target of its n transitions, sized 1 - (1 - learning_rate)**n as in FlappyBirdAI.update_batch"""
+        states, actions, rewards, next_states, dones = batch_arrays(states, actions, rewards, next_states, dones)
+        targets = self.batch_targets(rewards, next_states, dones, discount)
+        unique, inverse = np.unique(states, return_inverse=True)
+        sa = 2 * inverse.ravel() + actions
+        counts = np.bincount(sa, minlength=2 * len(unique))
+        target_sums = np.bincount(sa, weights=targets, minlength=2 * len(unique))
+        pairs = np.flatnonzero(counts)
+        pair_actions = pairs % 2
+        tiles = self.tiles_batch(unique[pairs // 2])
+        current = self.weights[tiles, pair_actions[:, None]].sum(axis=1)
+        steps = (1 - (1 - self.learning_rate) ** counts[pairs]) * (target_sums[pairs] / counts[pairs] - current)
+        np.add.at(self.weights, (tiles, pair_actions[:, None]), (steps / self.tilings)[:, None])
+        td_errors = targets - current[np.searchsorted(pairs, sa)]
+        self.record_batch(states, actions, rewards, next_states, dones,
+                          self.learning_rate * float(np.abs(td_errors).sum()), current + steps)
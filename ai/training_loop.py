@@ -1,109 +1,151 @@
 from config.config import *
 import pygame
 
-def train_ai(episodes=DEFAULT_EPISODES, render_every=RENDER_EVERY):
-    """Train the AI agent through multiple episodes"""
-    from ai.ai_agent import FlappyBirdAI
+def train_ai(episodes=DEFAULT_EPISODES, render_every=RENDER_EVERY, resume=False, metrics_port=METRICS_PORT):
+    """Train the AI agent through multiple episodes (resume=True continues the last saved session)"""
+    from ai.ai_agent import create_agent
     from game.reward_system import RewardSystem
     from game.main import Bird, Pipe, screen, clock, draw_ground
+    from game.environment import EpisodeBudget
+    from ai.reachability import REACHABILITY
     
-    ai = FlappyBirdAI()
+    ai = create_agent()
+    budget = EpisodeBudget()
     reward_system = RewardSystem()
+    if RECORD_TRANSITIONS:
+        from ai.transition_log import TransitionLog
+        ai.transition_log = TransitionLog()
     
     # Load existing Q-table if available
     ai.load_q_table()
     
     best_score = 0
+    start_episode = 0
     
-    for episode in range(episodes):
-        # Initialize game state
-        bird = Bird()
-        pipes = [Pipe(SCREEN_WIDTH + 200)]
-        score = 0
-        game_over = False
+    from ai.session import save_session, load_session, session_file
+    if resume:
+        trainer_state = load_session(session_file('train'), [ai])
+        if trainer_state is not None:
+            start_episode = trainer_state['episode']
+            best_score = trainer_state['best_score']
+    
+    from ai.metrics import serve_training_metrics
+    metrics, metrics_server = serve_training_metrics('train', metrics_port)
+    
+    episode = start_episode
+    try:
+        for episode in range(start_episode, episodes):
+            # Initialize game state
+            bird = Bird()
+            pipes = [Pipe(SCREEN_WIDTH + 200)]
+            score = 0
+            game_over = False
+            truncated = False
+            budget.start()
         
-        # Get initial state
-        state = ai.get_state(bird, pipes)
+            # Get initial state
+            state = ai.get_state(bird, pipes)
         
-        while not game_over:
-            # Get AI action
-            action = ai.get_action(state)
+            while not game_over and not truncated:
+                # Get AI action
+                mask = REACHABILITY.action_mask(bird, pipes) if ACTION_MASK_DURING_TRAINING else None
+                action = ai.get_action(state, mask)
             
-            # Apply action
-            if action == 1:  # Flap
-                bird.flap()
+                # Apply action
+                if action == 1:  # Flap
+                    bird.flap()
             
-            # Update game state
-            bird.move()
+                # Update game state
+                bird.move()
             
-            # Update pipes
-            for pipe in pipes:
-                pipe.move()
-                if pipe.collides_with(bird):
-                    game_over = True
+                # Update pipes
+                for pipe in pipes:
+                    pipe.move()
+                    if pipe.collides_with(bird):
+                        game_over = True
+            
+                # Remove off-screen pipes and add new ones
+                if pipes[0].is_off_screen():
+                    pipes.pop(0)
+                    pipes.append(Pipe(SCREEN_WIDTH + 200))
+                    score += 1
             
-            # Remove off-screen pipes and add new ones
-            if pipes[0].is_off_screen():
-                pipes.pop(0)
-                pipes.append(Pipe(SCREEN_WIDTH + 200))
-                score += 1
+                # Check boundaries (updated for ground)
+                if bird.y - bird.radius < 0 or bird.y + bird.radius > SCREEN_HEIGHT - GROUND_HEIGHT:
+                    game_over = True
             
-            # Check boundaries (updated for ground)
-            if bird.y - bird.radius < 0 or bird.y + bird.radius > SCREEN_HEIGHT - GROUND_HEIGHT:
-                game_over = True
+                # Get next state
+                next_state = ai.get_state(bird, pipes)
             
-            # Get next state
-            next_state = ai.get_state(bird, pipes)
+                # Calculate reward
+                reward = reward_system.calculate_reward(bird, pipes, score, game_over)
             
-            # Calculate reward
-            reward = reward_system.calculate_reward(bird, pipes, score, game_over)
+                # Update Q-table
+                ai.update_q_table(state, action, reward, next_state, game_over)
             
-            # Update Q-table
-            ai.update_q_table(state, action, reward, next_state)
+                # Update state
+                state = next_state
             
-            # Update state
-            state = next_state
+                # Stop an episode that outlives its budget (not treated as a death)
+                truncated = budget.tick()
             
-            # Render occasionally
-            if episode % render_every == 0:
-                render_frame(bird, pipes, score, episode)
+                # Render occasionally
+                if episode % render_every == 0:
+                    render_frame(bird, pipes, score, episode)
+            if metrics is not None:
+                metrics.lap('play')
         
-        # Update best score
-        if score > best_score:
-            best_score = score
-            ai.save_q_table()  # Save when we get a new best score
+            # Update best score
+            if score > best_score:
+                best_score = score
+                ai.save_q_table()  # Save when we get a new best score
         
-        # Print progress
-        if episode % 100 == 0:
-            print(f"Episode {episode}, Score: {score}, Best: {best_score}")
+            # Print progress
+            if episode % 100 == 0:
+                print(f"Episode {episode}, Score: {score}, Best: {best_score}")
+                save_session(session_file('train'), [ai], {'episode': episode + 1, 'best_score': best_score})
+                if metrics is not None:
+                    metrics.checkpoint_saved()
         
-        # Reset reward system
-        reward_system.reset()
+            # Reset reward system
+            reward_system.reset()
+            if metrics is not None:
+                metrics.end_generation([score], budget.steps, [ai])
+                metrics.lap('bookkeeping')
+    except KeyboardInterrupt:
+        # Keep what was learned; a resumed run replays the interrupted episode
+        save_session(session_file('train'), [ai], {'episode': episode, 'best_score': best_score})
+        raise
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
     
     print(f"Training complete! Best score: {best_score}")
     ai.save_q_table()
+    save_session(session_file('train'), [ai], {'episode': episodes, 'best_score': best_score})
+    if ai.transition_log is not None:
+        ai.transition_log.close()
     return ai
 
+renderer = None  # Created on the first rendered frame
+
 def render_frame(bird, pipes, score, episode):
     """Render a single frame for visualization"""
-    from game.main import screen, clock, draw_ground
-    
-    screen.fill(WHITE)
-    
-    # Draw ground layer
-    draw_ground()
+    from game.main import clock
+    from game.renderer import FrameRenderer
+    global renderer
+    if renderer is None:
+        renderer = FrameRenderer(background=WHITE)
+    renderer.begin_frame()
     
     # Draw game objects
-    bird.draw()
+    renderer.draw_bird(bird)
     for pipe in pipes:
-        pipe.draw()
+        renderer.draw_pipe(pipe)
     
     # Draw info
-    font = pygame.font.Font(None, 36)
-    score_text = font.render(f"Score: {score}", True, BLACK)
-    episode_text = font.render(f"Episode: {episode}", True, BLACK)
-    screen.blit(score_text, (10, 10))
-    screen.blit(episode_text, (10, 50))
+    renderer.text(f"Score: {score}", (10, 10), 36)
+    renderer.text(f"Episode: {episode}", (10, 50), 36)
     
-    pygame.display.flip()
-    clock.tick(60) 
\ No newline at end of file
+    renderer.end_frame()
+    clock.tick(60)
@@ -0,0 +1,200 @@
+import argparse
+import os
+import time
+import numpy as np
+from config.config import *
+
+# One raw file per column, so each can be memory-mapped on its own
+TRANSITION_COLUMNS = (
+    ('state', np.dtype('<i8')),
+    ('action', np.dtype('u1')),
+    ('reward', np.dtype('<f4')),
+    ('next_state', np.dtype('<i8')),
+    ('done', np.dtype('u1')),
+)
+
+
+class TransitionLog:
+    """Append-only columnar log of (state, action, reward, next_state, done) transitions.
+
+    The log is a directory of chunks, each holding one fixed-width raw file
+    per column. Appends go to an in-memory buffer that is written to the
+    column files every `buffer_rows` transitions; each writer starts a new
+    chunk, and a chunk is closed after `chunk_rows` transitions. Readers
+    memory-map the columns, so a pass over the log never loads it whole.
+    """
+
+    def __init__(self, directory=TRANSITION_LOG_DIR, chunk_rows=TRANSITION_LOG_CHUNK_ROWS,
+                 buffer_rows=TRANSITION_LOG_BUFFER_ROWS):
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.buffer = {name: np.empty(buffer_rows, dtype=dtype) for name, dtype in TRANSITION_COLUMNS}
+        self.buffered = 0
+        self.chunk = None
+        self.chunk_size = 0
+        self.rows = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, state, action, reward, next_state, done):
+        i = self.buffered
+        buffer = self.buffer
+        buffer['state'][i] = state
+        buffer['action'][i] = action
+        buffer['reward'][i] = reward
+        buffer['next_state'][i] = next_state
+        buffer['done'][i] = done
+        self.buffered = i + 1
+        if self.buffered == len(buffer['state']):
+            self.flush()
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        """append() for arrays of transitions"""
+        columns = {'state': states, 'action': actions, 'reward': rewards, 'next_state': next_states, 'done': dones}
+        capacity = len(self.buffer['state'])
+        start = 0
+        while start < len(states):
+            end = min(len(states), start + capacity - self.buffered)
+            for name, _ in TRANSITION_COLUMNS:
+                self.buffer[name][self.buffered:self.buffered + end - start] = columns[name][start:end]
+            self.buffered += end - start
+            start = end
+            if self.buffered == capacity:
+                self.flush()
+
+    def new_chunk(self):
+        chunk = os.path.join(self.directory, f"chunk_{len(list_chunks(self.directory)):06d}")
+        os.makedirs(chunk)
+        self.chunk = chunk
+        self.chunk_size = 0
+
+    def flush(self):
+        start = 0
+        while start < self.buffered:
+            if self.chunk is None or self.chunk_size >= self.chunk_rows:
+                self.new_chunk()
+            end = min(self.buffered, start + self.chunk_rows - self.chunk_size)
+            for name, _ in TRANSITION_COLUMNS:
+                with open(os.path.join(self.chunk, name + '.bin'), 'ab') as f:
+                    self.buffer[name][start:end].tofile(f)
+            self.chunk_size += end - start
+            self.rows += end - start
+            start = end
+        self.buffered = 0
+
+    def close(self):
+        self.flush()
+
+
+def list_chunks(directory=TRANSITION_LOG_DIR):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.startswith('chunk_'))
+
+
+def read_chunk(chunk):
+    """Memory-mapped columns of one chunk (a dict of arrays, all the same length)"""
+    sizes = {name: os.path.getsize(os.path.join(chunk, name + '.bin')) // dtype.itemsize
+             for name, dtype in TRANSITION_COLUMNS}
+    rows = min(sizes.values())  # A write cut short leaves some columns longer
+    if rows == 0:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in TRANSITION_COLUMNS}
+    return {name: np.memmap(os.path.join(chunk, name + '.bin'), dtype=dtype, mode='r', shape=(rows,))
+            for name, dtype in TRANSITION_COLUMNS}
+
+
+def iter_chunks(directory=TRANSITION_LOG_DIR):
+    for chunk in list_chunks(directory):
+        yield read_chunk(chunk)
+
+
+def fitted_q_iteration(directory=TRANSITION_LOG_DIR, q_table=None, discount_factor=DISCOUNT_FACTOR,
+                       learning_rate=1.0, sweeps=100, tolerance=1e-4):
+    """Batch Q-learning over every logged transition.
+
+    Each sweep computes the target r + discount * max Q(next) (0 after a
+    crash) of every transition with the current table, averages the targets
+    per (state, action) and moves the Q-value `learning_rate` of the way
+    there (1.0 is plain fitted-Q iteration). States come from `q_table` if
+    given, new ones start at [0, 0] like the online learner.
+    Returns (updated q_table dict, sweeps run).
+    """
+    q_table = q_table or {}
+    keys = [np.fromiter(q_table.keys(), dtype=np.int64, count=len(q_table))]
+    for columns in iter_chunks(directory):
+        keys.append(np.unique(columns['state']))
+        keys.append(np.unique(columns['next_state']))
+    states = np.unique(np.concatenate(keys))
+    q_values = np.zeros((len(states), 2))
+    for i, state in enumerate(states.tolist()):
+        if state in q_table:
+            q_values[i] = q_table[state][:2]
+    q_values = q_values.ravel()
+    sweep = 0
+    for sweep in range(1, sweeps + 1):
+        values = q_values.reshape(-1, 2).max(axis=1)
+        target_sums = np.zeros(len(q_values))
+        counts = np.zeros(len(q_values))
+        for columns in iter_chunks(directory):
+            state_index = np.searchsorted(states, columns['state'])
+            next_index = np.searchsorted(states, columns['next_state'])
+            sa = 2 * state_index + columns['action']
+            targets = columns['reward'] + discount_factor * values[next_index] * (1 - columns['done'])
+            target_sums += np.bincount(sa, weights=targets, minlength=len(q_values))
+            counts += np.bincount(sa, minlength=len(q_values))
+        seen = counts > 0
+        new_q_values = q_values.copy()
+        new_q_values[seen] += learning_rate * (target_sums[seen] / counts[seen] - q_values[seen])
+        change = np.abs(new_q_values - q_values).max() if len(q_values) else 0.0
+        q_values = new_q_values
+        if change < tolerance:
+            break
+    result = dict(q_table)
+    for state, pair in zip(states.tolist(), q_values.reshape(-1, 2).tolist()):
+        result[state] = pair
+    return result, sweep
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a transition log or train a Q-table offline from it")
+    parser.add_argument('--log', default=TRANSITION_LOG_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('info', help="Summarize the log")
+    fit = commands.add_parser('fit', help="Fitted-Q sweeps over the whole log")
+    fit.add_argument('--init', default=None, help="Q-table to refine (default: start from zeros)")
+    fit.add_argument('--output', default=Q_TABLE_FILE)
+    fit.add_argument('--discount', type=float, default=DISCOUNT_FACTOR)
+    fit.add_argument('--learning-rate', type=float, default=1.0,
+                     help="Step towards the batch targets each sweep (1.0 = fitted-Q iteration)")
+    fit.add_argument('--sweeps', type=int, default=100)
+    fit.add_argument('--tolerance', type=float, default=1e-4)
+    args = parser.parse_args()
+
+    chunks = list_chunks(args.log)
+    if not chunks:
+        print(f"No transitions in {args.log} (set RECORD_TRANSITIONS = True and train)")
+        return
+    if args.command == 'info':
+        rows = crashes = 0
+        states = set()
+        for columns in iter_chunks(args.log):
+            rows += len(columns['state'])
+            crashes += int(columns['done'].sum())
+            states.update(np.unique(columns['state']).tolist())
+        print(f"{args.log}: {len(chunks)} chunks, {rows} transitions, {crashes} crashes, {len(states)} distinct states")
+        return
+
+    from ai.ai_agent import FlappyBirdAI
+    ai = FlappyBirdAI()
+    if args.init:
+        ai.load_q_table(args.init)
+    start = time.perf_counter()
+    q_table, sweeps = fitted_q_iteration(args.log, dict(ai.q_table.items()), args.discount,
+                                         args.learning_rate, args.sweeps, args.tolerance)
+    print(f"{sweeps} sweeps over {len(chunks)} chunks in {time.perf_counter() - start:.1f}s")
+    ai.q_table = ai.new_q_table(q_table)
+    ai.save_q_table(args.output)
+    print(f"Saved {len(ai.q_table)} states to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
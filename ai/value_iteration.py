@@ -0,0 +1,241 @@
+import argparse
+import random
+import time
+import numpy as np
+from config.config import *
+
+TERMINAL = -1  # Next-state marker for a crash
+
+
+class TransitionModel:
+    """Sparse empirical model of the discretized game: next-state counts and mean reward per (state, action).
+
+    Bird physics are deterministic and pipe gaps are the only randomness, so
+    the model is filled by simulating FlappyEnv. With `branch` every visited
+    frame also tries the action not taken (clone, step, restore), so both
+    actions get samples in every state the behaviour policy reaches.
+    Rewards come from the same RewardSystem the online learners use.
+    """
+
+    def __init__(self):
+        self.next_counts = {}  # (state, action) -> {next state or TERMINAL: count}
+        self.reward_sums = {}
+        self.samples = 0
+
+    def add(self, state, action, reward, next_state, done):
+        key = (state, action)
+        counts = self.next_counts.get(key)
+        if counts is None:
+            counts = self.next_counts[key] = {}
+            self.reward_sums[key] = 0.0
+        next_state = TERMINAL if done else next_state
+        counts[next_state] = counts.get(next_state, 0) + 1
+        self.reward_sums[key] += reward
+        self.samples += 1
+
+    def _step(self, ai, env, reward_system, state, action):
+        done = env.step(action)
+        next_state = ai.get_state(env.bird, env.pipes)
+        reward = reward_system.calculate_reward(env.bird, env.pipes, env.score, done, action)
+        self.add(state, action, reward, next_state, done)
+        return next_state, done
+
+    def _branch(self, ai, env, reward_system, state, action):
+        """Sample `action` from the current frame and put the episode back as it was"""
+        snapshot = env.clone()
+        last_score, consecutive_flaps = reward_system.last_score, reward_system.consecutive_flaps
+        self._step(ai, env, reward_system, state, action)
+        env.restore(snapshot)
+        reward_system.last_score, reward_system.consecutive_flaps = last_score, consecutive_flaps
+
+    def play(self, ai, env, reward_system, actions=None, max_frames=None, exploration=MODEL_EXPLORATION, branch=True):
+        """Play one episode from env's current state into the model, returns the frames played.
+
+        Follows `actions` if given (a recorded episode), else the agent's smart
+        action with `exploration` chance of a random one.
+        """
+        reward_system.reset()
+        state = ai.get_state(env.bird, env.pipes)
+        frames = 0
+        while max_frames is None or frames < max_frames:
+            if actions is not None:
+                if frames >= len(actions):
+                    break
+                action = actions[frames]
+            elif random.random() < exploration:
+                action = random.randint(0, 1)
+            else:
+                action = ai.get_smart_action(state, env.bird, env.pipes)
+            if branch:
+                self._branch(ai, env, reward_system, state, 1 - action)
+            state, done = self._step(ai, env, reward_system, state, action)
+            frames += 1
+            if done:
+                break
+        return frames
+
+    def collect(self, ai, frames=MODEL_COLLECTION_FRAMES, exploration=MODEL_EXPLORATION, branch=True):
+        """Simulate episodes until `frames` frames were played"""
+        from game.environment import FlappyEnv
+        from game.reward_system import RewardSystem
+        env = FlappyEnv(record_collisions=False)
+        reward_system = RewardSystem()
+        played = 0
+        while played < frames:
+            env.reset()
+            played += self.play(ai, env, reward_system, max_frames=min(frames - played, EPISODE_MAX_STEPS or frames),
+                                exploration=exploration, branch=branch)
+        return played
+
+    def collect_recorded(self, ai, filename=EPISODE_LOG_FILE, branch=True):
+        """Re-simulate every episode of a recording log (game/recording.py) into the model"""
+        from game.environment import FlappyEnv
+        from game.reward_system import RewardSystem
+        from game.recording import read_episodes
+        env = FlappyEnv(record_collisions=False)
+        reward_system = RewardSystem()
+        played = 0
+        for episode in read_episodes(filename):
+            env.reset(episode.seed)
+            played += self.play(ai, env, reward_system, actions=episode.actions, branch=branch)
+        return played
+
+    def to_arrays(self):
+        """Flatten into numpy arrays for value iteration.
+
+        Returns (states, seen, rewards, edge_sa, edge_next, edge_prob, leaf_states):
+        state-action pairs are indexed state_index * 2 + action. Next states are
+        indices into states, then into leaf_states (reached but never acted
+        from), and len(states) + len(leaf_states) stands for a crash.
+        """
+        states = np.array(sorted({state for state, _ in self.next_counts}), dtype=np.int64)
+        index = {state: i for i, state in enumerate(states.tolist())}
+        leaves = {}
+        seen = np.zeros((len(states), 2), dtype=bool)
+        rewards = np.zeros(2 * len(states))
+        edge_sa, edge_next, edge_prob = [], [], []
+        for (state, action), counts in self.next_counts.items():
+            sa = 2 * index[state] + action
+            total = sum(counts.values())
+            seen[index[state], action] = True
+            rewards[sa] = self.reward_sums[(state, action)] / total
+            for next_state, count in counts.items():
+                if next_state == TERMINAL:
+                    target = None
+                elif next_state in index:
+                    target = index[next_state]
+                else:
+                    target = len(states) + leaves.setdefault(next_state, len(leaves))
+                edge_sa.append(sa)
+                edge_next.append(target)
+                edge_prob.append(count / total)
+        terminal = len(states) + len(leaves)
+        edge_next = np.array([terminal if target is None else target for target in edge_next], dtype=np.int64)
+        leaf_states = np.array(list(leaves), dtype=np.int64)
+        return (states, seen, rewards, np.array(edge_sa, dtype=np.int64), edge_next,
+                np.array(edge_prob), leaf_states)
+
+
+def value_iteration(model, discount_factor=DISCOUNT_FACTOR, tolerance=VALUE_ITERATION_TOLERANCE,
+                    max_sweeps=VALUE_ITERATION_MAX_SWEEPS, leaf_q_table=None):
+    """Solve the model's Bellman optimality equations with vectorized sweeps.
+
+    States only ever reached as a next state are valued from `leaf_q_table`
+    (max Q, 0 when missing). Returns (states, q_values (n, 2), seen mask, sweeps).
+    """
+    states, seen, rewards, edge_sa, edge_next, edge_prob, leaf_states = model.to_arrays()
+    leaf_q_table = leaf_q_table or {}
+    leaf_values = np.array([max(leaf_q_table.get(state, (0.0, 0.0))) for state in leaf_states.tolist()])
+    num_sa = 2 * len(states)
+    q_values = np.zeros(num_sa)
+    values = np.zeros(len(states) + len(leaf_states) + 1)  # Crash value stays 0
+    values[len(states):-1] = leaf_values
+    sweeps = 0
+    for sweeps in range(1, max_sweeps + 1):
+        values[:len(states)] = np.where(seen, q_values.reshape(-1, 2), -np.inf).max(axis=1)
+        new_q_values = rewards + discount_factor * np.bincount(edge_sa, weights=edge_prob * values[edge_next],
+                                                               minlength=num_sa)
+        change = np.abs(new_q_values - q_values).max() if num_sa else 0.0
+        q_values = new_q_values
+        if change < tolerance:
+            break
+    return states, q_values.reshape(-1, 2), seen, sweeps
+
+
+def to_q_table(states, q_values, seen):
+    """Q-table dict for FlappyBirdAI. An action the model never tried gets the state's other
+    value minus 1, so the greedy policy sticks to actions it has evidence for."""
+    q_values = q_values.copy()
+    q_values[~seen[:, 0], 0] = q_values[~seen[:, 0], 1] - 1
+    q_values[~seen[:, 1], 1] = q_values[~seen[:, 1], 0] - 1
+    return {state: [wait, flap] for state, (wait, flap) in zip(states.tolist(), q_values.tolist())}
+
+
+def evaluate(ai, episodes, max_frames=EPISODE_MAX_STEPS):
+    """Scores of the agent's play policy (get_smart_action, no exploration) over fresh episodes"""
+    from game.environment import FlappyEnv
+    env = FlappyEnv(record_collisions=False)
+    epsilon, ai.epsilon = ai.epsilon, 0.0
+    scores = []
+    for _ in range(episodes):
+        env.reset()
+        while not env.step(ai.get_smart_action(ai.get_state(env.bird, env.pipes), env.bird, env.pipes)):
+            if max_frames and env.steps >= max_frames:
+                break
+        scores.append(env.score)
+    ai.epsilon = epsilon
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a transition model of the game and solve it by value iteration")
+    parser.add_argument('--frames', type=int, default=MODEL_COLLECTION_FRAMES, help="Simulated frames to explore")
+    parser.add_argument('--exploration', type=float, default=MODEL_EXPLORATION)
+    parser.add_argument('--episode-log', default=None, help="Also learn from the episodes in a recording log")
+    parser.add_argument('--no-branch', action='store_true', help="Only sample the action actually taken")
+    parser.add_argument('--init', default=Q_TABLE_FILE,
+                        help="Q-table used by the behaviour policy and to value states the model never expanded")
+    parser.add_argument('--output', default=VALUE_ITERATION_FILE,
+                        help="Where to write the --init table with the solved states merged in")
+    parser.add_argument('--discount', type=float, default=DISCOUNT_FACTOR)
+    parser.add_argument('--tolerance', type=float, default=VALUE_ITERATION_TOLERANCE)
+    parser.add_argument('--evaluate', type=int, default=0, help="Test episodes to play with the result")
+    args = parser.parse_args()
+
+    from game.environment import enable_headless
+    enable_headless()
+    from ai.ai_agent import FlappyBirdAI
+    ai = FlappyBirdAI(epsilon=0.0)
+    ai.load_q_table(args.init)
+    model = TransitionModel()
+    start = time.perf_counter()
+    if args.episode_log:
+        try:
+            played = model.collect_recorded(ai, args.episode_log, branch=not args.no_branch)
+            print(f"Replayed {played} recorded frames")
+        except FileNotFoundError:
+            print(f"No episode log at {args.episode_log}, simulating only")
+        except ValueError as e:
+            print(f"Skipping the episode log: {e}")
+    played = model.collect(ai, args.frames, args.exploration, branch=not args.no_branch)
+    print(f"Collected {model.samples} transitions over {len(model.next_counts)} state-actions "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    states, q_values, seen, sweeps = value_iteration(model, args.discount, args.tolerance,
+                                                     leaf_q_table=dict(ai.q_table.items()))
+    print(f"Value iteration: {len(states)} states, {sweeps} sweeps in {time.perf_counter() - start:.1f}s")
+    # Solved states overwrite their --init values; states the model never reached and the visit
+    # counts of a bounded table are kept
+    solved = to_q_table(states, q_values, seen)
+    for state, values in solved.items():
+        ai.q_table[state] = values
+    ai.save_q_table(args.output)
+    print(f"Saved {len(ai.q_table)} states ({len(solved)} solved) to {args.output}")
+    if args.evaluate:
+        scores = evaluate(ai, args.evaluate)
+        print(f"Test play over {len(scores)} episodes: mean score {np.mean(scores):.1f}, best {max(scores)}")
+
+
+if __name__ == "__main__":
+    main()
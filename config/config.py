@@ -32,15 +32,82 @@ EPSILON = 0.2  # Higher initial exploration
 EPSILON_DECAY = 0.9999  # Slower decay to maintain exploration longer
 EPSILON_MIN = 0.05  # Higher minimum to maintain some exploration
 
+# Q-table memory budget
+Q_TABLE_MAX_STATES = None  # Evict states beyond this many (None = unbounded)
+Q_TABLE_EVICTION_POLICY = 'lru'  # 'lru' (least recently updated) or 'score' (fewest visits)
+Q_TABLE_EVICTION_FRACTION = 0.05  # Fraction of the budget evicted per batch
+
+# Agent used by the trainers
+AGENT_TYPE = 'table'  # 'table' (Q-table), 'tiles' (tile-coded linear Q-function) or 'mlp' (NumPy Q-network)
+TILE_CODING_TILINGS = 8  # Overlapping tilings, each offset by a fraction of a tile
+TILE_CODING_TILE_WIDTHS = (40, 3, 40, 40)  # Tile size over bird y, velocity, pipe x and gap y
+TILE_CODING_HASH_BITS = 18  # 2**bits weights per action, tiles are hashed into them
+MLP_HIDDEN_SIZES = (64, 64)  # Hidden layer widths of the Q-network
+MLP_ADAM_LEARNING_RATE = 1e-3  # Adam step size at LEARNING_RATE (scaled with the agent's learning_rate)
+MLP_BATCH_SIZE = 64  # Replayed transitions per gradient step
+MLP_REPLAY_CAPACITY = 100000  # Transitions kept in the replay buffer
+MLP_TRAIN_EVERY = 4  # New transitions between gradient steps
+MLP_TARGET_SYNC_EVERY = 1000  # Gradient steps between target network copies
+MLP_WARMUP = 1000  # Transitions collected before the first gradient step
+
+# State-coverage index
+TRACK_COVERAGE = False  # Maintain per-state visit/TD-error statistics during updates
+COVERAGE_TD_SMOOTHING = 0.1  # Weight of the newest |TD error| in the running average
+COVERAGE_SNAPSHOT_FILE = "data/coverage.npz"
+
+# Nearest-visited-state backoff (ai/neighbors.py). Every update whose next state is not in the table runs a
+# neighbour lookup: ~70-95 us each on a 13k-state table against ~1 us for a plain update, so training steps
+# that mostly land on unseen states get many times slower
+NEIGHBOR_BACKOFF = False  # Value unseen states from their nearest visited neighbours instead of [0, 0]
+NEIGHBOR_COUNT = 4  # Visited states blended into one estimate
+NEIGHBOR_CELL_SIZE = 2  # Width of an index cell in state buckets; neighbours further than this may be missed
+
+# Lookahead planning policy
+USE_LOOKAHEAD_PLANNER = False  # Act with ai/planner.py instead of get_smart_action
+PLANNER_DEPTH = 5  # Decisions searched ahead
+PLANNER_FRAMES_PER_DECISION = 4  # Frames each flap/wait decision is held for
+PLANNER_CACHE_SIZE = 100000  # Transposition cache entries
+
+# Model-based value iteration (ai/value_iteration.py)
+MODEL_COLLECTION_FRAMES = 200000  # Simulated frames explored to estimate the transition model
+MODEL_EXPLORATION = 0.2  # Chance of a random action while collecting transitions
+VALUE_ITERATION_TOLERANCE = 1e-4  # Stop once no Q-value moves more than this in a sweep
+VALUE_ITERATION_MAX_SWEEPS = 5000
+VALUE_ITERATION_FILE = "data/q_table_value_iteration.json"  # Default output, kept apart from the trained Q_TABLE_FILE
+
 # AI Training parameters
 DEFAULT_EPISODES = 1000
 RENDER_EVERY = 100
+SHARED_PIPE_TRACK = False  # Multi-AI: all agents fly through one shared pipe track per generation
+ASYNC_EPISODES = False  # Multi-AI: restart each agent as soon as its episode ends instead of waiting for the others
+EPISODE_MAX_STEPS = 36000  # Truncate an episode after this many frames (10 minutes at 60 FPS, None = no limit)
+EPISODE_MAX_SECONDS = None  # Truncate an episode after this much wall time (None = no limit)
+DECISION_INTERVAL = 1  # Frames each agent decision lasts, with one Q-update per decision (1 = decide every frame)
+ADAPTIVE_DECISIONS = False  # End a decision early once the discretized state changes (DECISION_INTERVAL is then the longest)
+RECORD_EPISODES = False  # Append every continuous-training episode to EPISODE_LOG_FILE for later replay
+EPISODE_LOG_FILE = "data/episodes.bin"
+DETACHED_VIEWER = False  # Draw training in a separate viewer process instead of inline on the training loop
+VIEWER_FPS = 60  # Frame rate of the viewer, and how often training publishes a frame to it
+RECORD_TRANSITIONS = False  # Append every Q-learning transition to TRANSITION_LOG_DIR for offline training
+TRANSITION_LOG_DIR = "data/transitions"
+TRANSITION_LOG_CHUNK_ROWS = 1 << 22  # Transitions per chunk directory
+TRANSITION_LOG_BUFFER_ROWS = 8192  # Transitions buffered in memory between appends to disk
+SESSION_FILE_TEMPLATE = "data/session_{name}.pkl"  # Full trainer + agent checkpoint used by --resume
+METRICS_PORT = None  # Serve live training metrics over HTTP on this port (None = off)
+METRICS_HOST = "127.0.0.1"  # Metrics are only reachable from this machine
+METRICS_SCORE_WINDOW = 1000  # Recent episode scores behind the score percentiles
+METRICS_RATE_WINDOW = 60  # Seconds the per-second rates are averaged over
 
 # AI State discretization - IMPROVED
 BIRD_Y_DIVISOR = 25  # Finer state representation
 BIRD_VELOCITY_DIVISOR = 1  # Fine velocity states
 PIPE_X_DIVISOR = 25  # Finer distance representation
 PIPE_GAP_Y_DIVISOR = 25  # Finer gap position
+BIRD_GAP_DIFF_DIVISOR = 20  # Bird offset from gap center
+
+# Reachability tables for the safety heuristics
+REACHABILITY_MAX_FRAMES = 130  # Frames ahead covered (a new pipe reaches the bird in ~125)
+ACTION_MASK_DURING_TRAINING = False  # Force the only action that can still clear the next gap
 
 # Reward system parameters - IMPROVED
 SURVIVAL_REWARD = 0.05  # Reduced to avoid over-rewarding survival
@@ -50,4 +117,28 @@ HEIGHT_PENALTY = -0.1  # Penalty for being too high
 PIPE_PROXIMITY_REWARD = 2.0  # Reward for being near pipes
 PIPE_DISTANCE_PENALTY = -1.0  # Penalty for being far from pipes
 FLAP_PENALTY = -0.2  # Penalty for unnecessary flapping
-CEILING_COLLISION_PENALTY = -5.0  # Penalty for hitting ceiling 
\ No newline at end of file
+CEILING_COLLISION_PENALTY = -5.0  # Penalty for hitting ceiling
+
+# Parameter server (shared Q-table across machines)
+PARAM_SERVER_HOST = "127.0.0.1"
+PARAM_SERVER_PORT = 5757
+PARAM_SERVER_BLEND_STRENGTH = 0.3  # Weight of the shared value when blending into a local table
+PARAM_SERVER_SYNC_EVERY = 10  # Generations between syncs in continuous training
+
+# Actor-learner training
+ACTOR_COUNT = 4  # Headless simulation processes
+ACTOR_RING_CAPACITY = 65536  # Transitions buffered per actor
+POLICY_SNAPSHOT_MAX_STATES = 524288  # Capacity of the shared policy snapshot
+POLICY_PUBLISH_EVERY = 5000  # Learner updates between policy snapshots
+
+# Population-based training
+PBT_POPULATION_SIZE = 8  # Agents in the population
+PBT_WORKERS = None  # Worker processes (None = one per CPU)
+PBT_STEPS_PER_ROUND = 20000  # Frames each agent plays between exploit/explore steps
+PBT_TRUNCATION_FRACTION = 0.25  # Bottom fraction replaced by copies of the top fraction
+PBT_PERTURB_FACTORS = (0.8, 1.2)  # Multipliers applied to copied hyperparameters
+
+# Headless test scenarios (tests/)
+SCENARIO_SEED = 1234  # Pipe schedule seed, so every run sees the same pipes
+SCENARIO_MAX_STEPS = 20000  # Frames a scenario may run before it is cut off
+SCENARIO_TRAIN_EPISODES = 100  # Seeded training episodes behind the trained-AI scenario's Q-table
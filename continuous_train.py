@@ -2,7 +2,6 @@ import pygame
 import sys
 from ai.training_loop import train_ai
 from config.config import *
-from game.main import get_adaptive_gap_center, ground_img, screen
 
 HIGH_SCORE_FILE = 'AI_high_score.txt'
 
@@ -20,8 +19,18 @@ def save_high_score(score):
     except Exception:
         pass
 
-def continuous_train():
-    """Train the AI continuously until user stops it"""
+def continuous_train(param_server=None, viewer=DETACHED_VIEWER, planner=USE_LOOKAHEAD_PLANNER, resume=False,
+                     metrics_port=METRICS_PORT):
+    """Train the AI continuously until user stops it (resume=True continues the last saved session)"""
+    # A detached viewer draws the training in its own process; this one runs headless
+    viewer_link = None
+    if viewer:
+        from game.viewer import ViewerLink
+        from game.environment import enable_headless
+        viewer_link = ViewerLink('continuous')
+        viewer_link.start()
+        enable_headless()
+    
     pygame.init()
     
     print("Starting Continuous AI Training for Flappy Bird...")
@@ -43,31 +52,103 @@ def continuous_train():
     high_score = load_high_score()  # Track high score
     
     # Initialize AI and reward system once
-    from ai.ai_agent import FlappyBirdAI
+    from ai.ai_agent import create_agent
     from game.reward_system import RewardSystem
     from game.main import Bird, Pipe, clock, save_pipe_heatmap, load_pipe_heatmap, adjust_adaptive_gap_offset
+    from game.environment import EpisodeBudget
+    
+    ai = create_agent()
+    budget = EpisodeBudget()
+    
+    # Agent decisions every DECISION_INTERVAL frames (or on state changes), one update each
+    from ai.decision_interval import DecisionInterval
+    decisions = DecisionInterval(ai)
+    if decisions.interval > 1:
+        print(f"Deciding every {decisions.interval} frames" + (" or on state changes" if decisions.adaptive else ""))
     
-    ai = FlappyBirdAI()
+    # Optional lookahead planning policy in place of get_smart_action
+    lookahead = None
+    if planner:
+        from ai.planner import LookaheadPlanner
+        lookahead = LookaheadPlanner(ai)
+        print(f"Acting with a {PLANNER_DEPTH}-decision lookahead planner")
+    
+    # Optional compact episode log, viewed afterwards with replay.py
+    recorder = None
+    pipe_rng = None
+    if RECORD_EPISODES:
+        from game.recording import EpisodeRecorder
+        recorder = EpisodeRecorder()
+        print(f"Recording episodes to {EPISODE_LOG_FILE}")
+    # Optional transition log for offline training (python -m ai.transition_log fit)
+    if RECORD_TRANSITIONS:
+        from ai.transition_log import TransitionLog
+        ai.transition_log = TransitionLog()
+        print(f"Logging transitions to {TRANSITION_LOG_DIR}")
     reward_system = RewardSystem()
     
     # Load existing Q-table if available
     ai.load_q_table()
     
+    # Optional parameter server pooling experience with other workers
+    remote_sync = None
+    if param_server and not ai.tabular:
+        print(f"The parameter server shares Q-tables, ignoring it for the '{AGENT_TYPE}' agent")
+    elif param_server:
+        from ai.param_server import ParameterClient, RemoteTableSync, parse_address
+        remote_sync = RemoteTableSync(ParameterClient(*parse_address(param_server)))
+        print(f"Sharing knowledge through parameter server at {param_server}")
+    
     # Load pipe heatmap
     load_pipe_heatmap()
     
+    # Live counters, optionally served over HTTP for dashboards (ai/metrics.py)
+    from ai.metrics import serve_training_metrics
+    metrics, metrics_server = serve_training_metrics('continuous', metrics_port)
+    
+    # Full session checkpoint: agent, counters, RNG state, heatmap and gap offset
+    from ai.session import save_session, load_session, session_file
+    def save_training_session():
+        save_session(session_file('continuous'), [ai], {
+            'generation': generation, 'best_score': best_score,
+            'recent_scores': recent_scores, 'high_score': high_score,
+        })
+        if metrics is not None:
+            metrics.checkpoint_saved()
+    if resume:
+        trainer_state = load_session(session_file('continuous'), [ai])
+        if trainer_state is not None:
+            generation = trainer_state['generation']
+            best_score = trainer_state['best_score']
+            recent_scores = trainer_state['recent_scores']
+            high_score = max(high_score, trainer_state['high_score'])
+            print(f"Continuing at generation {generation}, ε: {ai.epsilon:.3f}")
+    
     try:
         while True:
             # Initialize game state for this generation
+            if recorder is not None:
+                pipe_rng = recorder.start()
             bird = Bird()
-            pipes = [Pipe(SCREEN_WIDTH + 200)]
+            pipes = [Pipe(SCREEN_WIDTH + 200, pipe_rng)]
             score = 0
             game_over = False
+            truncated = False
+            budget.start()
             
             # Get initial state
-            state = ai.get_state(bird, pipes)
+            decisions.start(ai.get_state(bird, pipes))
             
-            while not game_over:
+            while not game_over and not truncated:
+                # Hotkeys forwarded by the detached viewer
+                if viewer_link is not None:
+                    for command in viewer_link.poll_commands():
+                        if command == 'quit':
+                            return
+                        elif command == 'clear_heatmap':
+                            from game.main import clear_pipe_heatmap
+                            clear_pipe_heatmap()
+                
                 # Handle input events in main thread
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
@@ -82,19 +163,19 @@ def continuous_train():
                         elif event.key == pygame.K_c:
                             show_collision_zones = not show_collision_zones
                         elif event.key == pygame.K_b:
-                            from game.main import GLOBAL_PIPE_HEATMAP, save_pipe_heatmap
-                            for arr in (GLOBAL_PIPE_HEATMAP['top'], GLOBAL_PIPE_HEATMAP['bottom']):
-                                for i in range(len(arr)):
-                                    arr[i] = 0
-                            save_pipe_heatmap()
+                            from game.main import clear_pipe_heatmap
+                            clear_pipe_heatmap()
                         elif event.key == pygame.K_g:
                             show_gap_distances = not show_gap_distances
                 
                 if not training_active:
+                    decisions.flush(bird, pipes)  # The decision in progress still gets its update
                     break
                 
-                # Get AI action using smart action selection
-                action = ai.get_smart_action(state, bird, pipes)
+                # Get AI action using smart action selection (or the lookahead planner); waits between decisions
+                action = decisions.act(bird, pipes, lookahead.get_action if lookahead is not None else None)
+                if recorder is not None:
+                    recorder.record(action)
                 
                 # Apply action
                 if action == 1:  # Flap
@@ -123,44 +204,59 @@ def continuous_train():
                 # Remove off-screen pipes and add new ones
                 if pipes[0].is_off_screen():
                     pipes.pop(0)
-                    pipes.append(Pipe(SCREEN_WIDTH + 200))
+                    pipes.append(Pipe(SCREEN_WIDTH + 200, pipe_rng))
                     score += 1
                 
                 # Check boundaries (only ground, no ceiling death)
                 if bird.get_rect().bottom > SCREEN_HEIGHT - GROUND_HEIGHT:
                     game_over = True
                 
-                # Get next state
-                next_state = ai.get_state(bird, pipes)
-                
                 # Calculate reward (now includes action for flap penalty)
                 reward = reward_system.calculate_reward(bird, pipes, score, game_over, action)
                 
-                # Update Q-table
-                ai.update_q_table(state, action, reward, next_state)
+                # Update Q-table once the decision is over
+                decisions.step(bird, pipes, reward, game_over)
                 
-                # Update state
-                state = next_state
+                # Stop an episode that outlives its budget (not treated as a death)
+                truncated = budget.tick()
+                if truncated:
+                    decisions.flush(bird, pipes)
                 
-                # Render every frame with controls displayed
-                render_frame(bird, pipes, score, generation, ai.epsilon, high_score, ai, state, action)
+                # Render every frame with controls displayed, or hand the frame to the viewer
+                if viewer_link is not None:
+                    viewer_link.publish(bird, pipes, score, generation, ai.epsilon, high_score,
+                                        ai.q_table.get(decisions.state, [0, 0]), action)
+                else:
+                    render_frame(bird, pipes, score, generation, ai.epsilon, high_score, ai, decisions.state, action)
             
             if not training_active:
                 break
+            if metrics is not None:
+                metrics.lap('play')
             
             # End generation and update learning parameters
             ai.end_episode()
+            if lookahead is not None:
+                lookahead.clear()  # Cached values used the Q-table as it was during this episode
             
             # Track recent scores
             recent_scores.append(score)
             if len(recent_scores) > 100:
                 recent_scores.pop(0)
             
+            # Append the episode to the replay log
+            if recorder is not None:
+                from game.recording import FLAG_NEW_BEST, FLAG_TRUNCATED
+                flags = (FLAG_NEW_BEST if score > best_score else 0) | (FLAG_TRUNCATED if truncated else 0)
+                recorder.finish(score, generation + 1, flags)
+            
             # Update best score and high score
             if score > best_score:
                 best_score = score
                 ai.save_q_table()
                 print(f"🎉 New best score: {best_score} (Generation {generation + 1})")
+                if recorder is not None:
+                    print(f"   Replay it with: python replay.py --generation {generation + 1}")
             
             # Update high score
             if score > high_score:
@@ -172,6 +268,9 @@ def continuous_train():
             
             # Save heatmap after each generation
             save_pipe_heatmap()
+            if metrics is not None:
+                metrics.end_generation([score], budget.steps, [ai])
+                metrics.lap('bookkeeping')
             
             # Increment generation AFTER the game is complete
             generation += 1
@@ -181,9 +280,25 @@ def continuous_train():
                 avg_recent = sum(recent_scores) / len(recent_scores) if recent_scores else 0
                 print(f"Generation {generation}, Current Score: {score}, Best: {best_score}, High: {high_score}, Avg: {avg_recent:.1f}, ε: {ai.epsilon:.3f}")
             
+            # Sync with the parameter server
+            if remote_sync is not None and generation % PARAM_SERVER_SYNC_EVERY == 0:
+                try:
+                    pushed, pulled = remote_sync.sync(ai.q_table, ai.neighbors)
+                    print(f"🌐 Parameter server sync: pushed {pushed}, pulled {pulled} states")
+                except (ConnectionError, OSError, ValueError) as e:
+                    print(f"Parameter server sync failed: {e}")
+                if metrics is not None:
+                    metrics.lap('sync')
+            
             # Save progress every 100 generations
             if generation % 100 == 0:
                 ai.save_q_table()
+                save_training_session()
+                if ai.coverage is not None:
+                    ai.coverage.export_snapshot()
+                    print(ai.coverage.summary())
+                if metrics is not None:
+                    metrics.lap('checkpoint')
                 avg_recent = sum(recent_scores) / len(recent_scores) if recent_scores else 0
                 print(f"✅ Saved progress! Generation {generation}, Best score: {best_score}, High score: {high_score}, Recent avg: {avg_recent:.1f}")
     
@@ -196,137 +311,116 @@ def continuous_train():
         print(f"Best score achieved: {best_score}")
         print(f"High score achieved: {high_score}")
         if 'ai' in locals():
+            from ai.ai_agent import size_description
             print(f"Final epsilon: {ai.epsilon:.4f}")
-            print(f"Q-table size: {len(ai.q_table)} states")
+            print(size_description(ai.get_learning_stats()))
+            if ai.transition_log is not None:
+                ai.transition_log.close()
+            if 'save_training_session' in locals():
+                save_training_session()
         print("Final progress has been saved.")
         save_high_score(high_score)
+        if 'metrics_server' in locals() and metrics_server is not None:
+            metrics_server.shutdown()
+        if viewer_link is not None:
+            viewer_link.stop()
         pygame.quit()
         sys.exit()
 
-def draw_ground():
-    ground_y = SCREEN_HEIGHT - GROUND_HEIGHT
-    for x in range(0, SCREEN_WIDTH, ground_img.get_width()):
-        screen.blit(ground_img, (x, ground_y))
+renderer = None  # Created on the first rendered frame
 
 def render_frame(bird, pipes, score, generation, epsilon, high_score, ai, state, action):
     """Render a single frame for visualization with controls and Q-values displayed"""
-    from game.main import clock, background_img
-    global show_axes, show_hitboxes, show_collision_zones, show_gap_distances
-    # Draw background first
-    screen.blit(background_img, (0, 0))
-    draw_ground()
+    from game.main import clock, get_adaptive_gap_center
+    from game.renderer import FrameRenderer
+    global show_axes, show_hitboxes, show_collision_zones, show_gap_distances, renderer
+    if renderer is None:
+        renderer = FrameRenderer()
+    renderer.begin_frame()
     
     # Draw axes if enabled
     if show_axes:
-        pygame.draw.line(screen, (200, 200, 200), (SCREEN_WIDTH//2, 0), (SCREEN_WIDTH//2, SCREEN_HEIGHT), 1)
-        pygame.draw.line(screen, (200, 200, 200), (0, SCREEN_HEIGHT//2), (SCREEN_WIDTH, SCREEN_HEIGHT//2), 1)
+        renderer.draw_line((200, 200, 200), (SCREEN_WIDTH//2, 0), (SCREEN_WIDTH//2, SCREEN_HEIGHT), 1)
+        renderer.draw_line((200, 200, 200), (0, SCREEN_HEIGHT//2), (SCREEN_WIDTH, SCREEN_HEIGHT//2), 1)
         if pipes:
             gap_center_y = get_adaptive_gap_center(pipes[0].top_height)
-            pygame.draw.line(screen, (255, 0, 255), (0, gap_center_y), (SCREEN_WIDTH, gap_center_y), 2)
+            renderer.draw_line((255, 0, 255), (0, gap_center_y), (SCREEN_WIDTH, gap_center_y), 2)
     for pipe in pipes:
-        pipe.draw()
+        renderer.draw_pipe(pipe)
         if show_hitboxes:
-            pygame.draw.rect(screen, RED, (pipe.x, 0, pipe.width, pipe.top_height), 3)
-            pygame.draw.rect(screen, RED, (pipe.x, SCREEN_HEIGHT - pipe.bottom_height - GROUND_HEIGHT, pipe.width, pipe.bottom_height), 3)
+            renderer.draw_rect(RED, (pipe.x, 0, pipe.width, pipe.top_height), 3)
+            renderer.draw_rect(RED, (pipe.x, SCREEN_HEIGHT - pipe.bottom_height - GROUND_HEIGHT, pipe.width, pipe.bottom_height), 3)
     # Draw bird sprite
-    bird.draw()
+    renderer.draw_bird(bird)
     # Draw bird hitbox if enabled
     if show_hitboxes:
-        rect = bird.get_rect()
-        pygame.draw.rect(screen, RED, rect, 2)
+        renderer.draw_rect(RED, bird.get_rect(), 2)
         # Draw ground collider
-        pygame.draw.rect(screen, RED, (0, SCREEN_HEIGHT - GROUND_HEIGHT, SCREEN_WIDTH, GROUND_HEIGHT), 2)
+        renderer.draw_rect(RED, (0, SCREEN_HEIGHT - GROUND_HEIGHT, SCREEN_WIDTH, GROUND_HEIGHT), 2)
     # Draw collision zones if enabled
     if show_collision_zones and pipes:
-        next_pipe = pipes[0]
-        gap_center_y = next_pipe.top_height + PIPE_GAP // 2
-        
-        # Draw collision zones on pipes
         for pipe in pipes:
             # Top pipe collision zone
-            pygame.draw.rect(screen, (255, 0, 0, 100), (pipe.x, 0, pipe.width, pipe.top_height))
+            renderer.draw_rect((255, 0, 0, 100), (pipe.x, 0, pipe.width, pipe.top_height))
             # Bottom pipe collision zone
-            pygame.draw.rect(screen, (255, 0, 0, 100), (pipe.x, SCREEN_HEIGHT - pipe.bottom_height - GROUND_HEIGHT, pipe.width, pipe.bottom_height))
+            renderer.draw_rect((255, 0, 0, 100), (pipe.x, SCREEN_HEIGHT - pipe.bottom_height - GROUND_HEIGHT, pipe.width, pipe.bottom_height))
     
     # Draw gap distances and pink line if enabled
     if show_gap_distances and pipes:
         pipe = pipes[0]
         gap_center_y = get_adaptive_gap_center(pipe.top_height)
         # Draw the high-contrast pink line
-        pygame.draw.line(screen, (255, 0, 255), (0, gap_center_y), (SCREEN_WIDTH, gap_center_y), 3)
+        renderer.draw_line((255, 0, 255), (0, gap_center_y), (SCREEN_WIDTH, gap_center_y), 3)
         # Draw the distances with black outline for contrast
         top_dist = gap_center_y - pipe.top_height
         bottom_dist = (pipe.top_height + PIPE_GAP) - gap_center_y
-        font_dist = pygame.font.Font(None, 22)
-        # Draw outline for top_text
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                if dx != 0 or dy != 0:
-                    outline = font_dist.render(f"Top→Pink: {int(top_dist)} px", True, (0,0,0))
-                    screen.blit(outline, (pipe.x + pipe.width + 5 + dx, pipe.top_height + 5 + dy))
-        top_text = font_dist.render(f"Top→Pink: {int(top_dist)} px", True, (255,0,255))
-        screen.blit(top_text, (pipe.x + pipe.width + 5, pipe.top_height + 5))
-        # Draw outline for bottom_text
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                if dx != 0 or dy != 0:
-                    outline = font_dist.render(f"Pink→Bottom: {int(bottom_dist)} px", True, (0,0,0))
-                    screen.blit(outline, (pipe.x + pipe.width + 5 + dx, pipe.top_height + PIPE_GAP - 25 + dy))
-        bottom_text = font_dist.render(f"Pink→Bottom: {int(bottom_dist)} px", True, (255,0,255))
-        screen.blit(bottom_text, (pipe.x + pipe.width + 5, pipe.top_height + PIPE_GAP - 25))
+        renderer.text(f"Top→Pink: {int(top_dist)} px", (pipe.x + pipe.width + 5, pipe.top_height + 5),
+                      22, (255, 0, 255), outline=(0, 0, 0))
+        renderer.text(f"Pink→Bottom: {int(bottom_dist)} px", (pipe.x + pipe.width + 5, pipe.top_height + PIPE_GAP - 25),
+                      22, (255, 0, 255), outline=(0, 0, 0))
     
-    # Draw info and controls at the top
-    font = pygame.font.Font(None, 24)
-    font_small = pygame.font.Font(None, 18)
+    # Game info (top left)
+    renderer.text(f"Score: {score}", (10, 10))
+    renderer.text(f"High Score: {high_score}", (10, 35))
+    renderer.text(f"Generation: {generation}", (10, 60))
+    renderer.text(f"Epsilon: {epsilon:.3f}", (10, 85))
     
-    # Game info
-    score_text = font.render(f"Score: {score}", True, BLACK)
-    high_score_text = font.render(f"High Score: {high_score}", True, BLACK)
-    generation_text = font.render(f"Generation: {generation}", True, BLACK)
-    epsilon_text = font.render(f"Epsilon: {epsilon:.3f}", True, BLACK)
-    
-    # Q-values for current state
+    # Q-values for current state and the chosen action (right side)
     q_values = ai.q_table.get(state, [0, 0])
-    q_wait_text = font_small.render(f"Q(WAIT): {q_values[0]:.2f}", True, BLACK)
-    q_flap_text = font_small.render(f"Q(FLAP): {q_values[1]:.2f}", True, BLACK)
-    
-    # Current action indicator
-    action_text = font_small.render(f"Action: {'FLAP' if action == 1 else 'WAIT'}", True, (255, 0, 0) if action == 1 else (0, 0, 255))
+    renderer.text(f"Q(WAIT): {q_values[0]:.2f}", (SCREEN_WIDTH - 150, 10), 18)
+    renderer.text(f"Q(FLAP): {q_values[1]:.2f}", (SCREEN_WIDTH - 150, 30), 18)
+    renderer.text(f"Action: {'FLAP' if action == 1 else 'WAIT'}", (SCREEN_WIDTH - 150, 50), 18,
+                  (255, 0, 0) if action == 1 else (0, 0, 255))
     
-    # State information with bird-gap difference
+    # State information with bird-gap difference (bottom)
     if pipes:
         next_pipe = pipes[0]
         gap_center_y = get_adaptive_gap_center(next_pipe.top_height)
         bird_gap_diff = bird.y - gap_center_y
         state_info = f"Bird Y: {int(bird.y)}, Vel: {bird.velocity:.1f}, Pipe X: {int(next_pipe.x)}, Gap Y: {int(gap_center_y)}, Diff: {bird_gap_diff:.1f}"
-        state_text = font_small.render(state_info, True, BLACK)
     else:
-        state_text = font_small.render("No pipes", True, BLACK)
+        state_info = "No pipes"
+    renderer.text(state_info, (10, SCREEN_HEIGHT - 80), 18)
     
     # Controls
-    controls_text1 = font_small.render("Q: Quit | A: Toggle Axes | H: Toggle Hitboxes", True, BLACK)
-    controls_text2 = font_small.render("C: Toggle Collision Zones | B: Clear Pipe Heatmap | G: Gap Dists", True, BLACK)
-
-
-    
-    # Position everything at the top
-    screen.blit(score_text, (10, 10))
-    screen.blit(high_score_text, (10, 35))
-    screen.blit(generation_text, (10, 60))
-    screen.blit(epsilon_text, (10, 85))
-    
-    # Q-values section (right side)
-    screen.blit(q_wait_text, (SCREEN_WIDTH - 150, 10))
-    screen.blit(q_flap_text, (SCREEN_WIDTH - 150, 30))
-    screen.blit(action_text, (SCREEN_WIDTH - 150, 50))
-    
-    # State info (bottom)
-    screen.blit(state_text, (10, SCREEN_HEIGHT - 80))
-    screen.blit(controls_text1, (10, SCREEN_HEIGHT - 60))
-    screen.blit(controls_text2, (10, SCREEN_HEIGHT - 40))
+    renderer.text("Q: Quit | A: Toggle Axes | H: Toggle Hitboxes", (10, SCREEN_HEIGHT - 60), 18)
+    renderer.text("C: Toggle Collision Zones | B: Clear Pipe Heatmap | G: Gap Dists", (10, SCREEN_HEIGHT - 40), 18)
     
-    pygame.display.flip()
+    renderer.end_frame()
     clock.tick(60)
 
 if __name__ == "__main__":
-    continuous_train() 
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Train the Flappy Bird AI continuously")
+    parser.add_argument('--param-server', default=None, metavar='HOST:PORT',
+                        help="Share knowledge through a parameter server (python -m ai.param_server)")
+    parser.add_argument('--viewer', action='store_true', default=DETACHED_VIEWER,
+                        help="Draw training in a separate viewer process so rendering never slows training")
+    parser.add_argument('--planner', action='store_true', default=USE_LOOKAHEAD_PLANNER,
+                        help="Act with the lookahead planner instead of the smart heuristics")
+    parser.add_argument('--resume', action='store_true', help="Continue the last saved training session")
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT,
+                        help=f"Serve live training metrics at http://{METRICS_HOST}:PORT/metrics (and /metrics.json)")
+    args = parser.parse_args()
+    continuous_train(param_server=args.param_server, viewer=args.viewer, planner=args.planner, resume=args.resume,
+                     metrics_port=args.metrics_port) 
\ No newline at end of file
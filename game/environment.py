@@ -0,0 +1,153 @@
+import os
+import random
+import time
+from config.config import *
+
+
+def enable_headless():
+    """Let game.main open its display without a window. Call before game.main is imported."""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+
+class EpisodeBudget:
+    """Per-episode step and wall-clock limits.
+
+    Running out of budget truncates the episode: the last transition is not
+    terminal and keeps bootstrapping, unlike a crash.
+    """
+
+    def __init__(self, max_steps=EPISODE_MAX_STEPS, max_seconds=EPISODE_MAX_SECONDS):
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.steps = 0
+        self.deadline = None
+
+    def start(self):
+        self.steps = 0
+        self.deadline = time.perf_counter() + self.max_seconds if self.max_seconds else None
+
+    def tick(self):
+        """Count one step, returns True once the episode is out of budget"""
+        self.steps += 1
+        if self.max_steps and self.steps >= self.max_steps:
+            return True
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+
+MASK64 = (1 << 64) - 1
+SNAPSHOT_HEADER = 8  # Scalar fields in a FlappyEnv.clone() tuple before the pipes
+
+
+class PipeSchedule:
+    """Counter-based pipe gap generator.
+
+    The n-th gap is a hash of (seed, n), so the whole generator state is two
+    ints and an environment snapshot never has to copy a Mersenne Twister
+    state. Pipe.reset() only needs randint().
+    """
+
+    def __init__(self, seed=None):
+        self.seed = random.getrandbits(64) if seed is None else seed & MASK64
+        self.counter = 0
+
+    def randint(self, low, high):
+        # splitmix64 of the draw index
+        z = (self.seed + (self.counter + 1) * 0x9E3779B97F4A7C15) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        z ^= z >> 31
+        self.counter += 1
+        return low + z % (high - low + 1)
+
+
+class FlappyEnv:
+    """A single-bird episode with the same rules as continuous training, without rendering"""
+
+    def __init__(self, pool=None, record_collisions=True):
+        from game.main import SpritePool
+        self.pool = pool if pool is not None else SpritePool()
+        self.record_collisions = record_collisions  # Off for simulated futures: leave the pipe heatmap alone
+        self.bird = None
+        self.pipes = []
+        self.score = 0
+        self.steps = 0
+        self.game_over = False
+        self.rng = PipeSchedule()
+
+    def reset(self, seed=None):
+        """Start a new episode. With a seed the pipe schedule is reproducible."""
+        if self.bird is not None:
+            self.pool.release_all([self.bird], self.pipes)
+        self.rng = PipeSchedule(seed)
+        self.bird = self.pool.acquire_bird()
+        self.pipes = [self.pool.acquire_pipe(SCREEN_WIDTH + 200, self.rng)]
+        self.score = 0
+        self.steps = 0
+        self.game_over = False
+        return self.bird, self.pipes
+
+    def step(self, action):
+        """Advance one frame, returns True once the bird has crashed"""
+        bird = self.bird
+        if action == 1:
+            bird.flap()
+        bird.move()
+        for pipe in self.pipes:
+            pipe.move()
+            if pipe.collides_with(bird, self.record_collisions):
+                self.game_over = True
+        if self.pipes[0].is_off_screen():
+            self.pool.release_pipe(self.pipes.pop(0))
+            self.pipes.append(self.pool.acquire_pipe(SCREEN_WIDTH + 200, self.rng))
+            self.score += 1
+        if bird.get_rect().bottom > SCREEN_HEIGHT - GROUND_HEIGHT:
+            self.game_over = True
+        self.steps += 1
+        return self.game_over
+
+    def clone(self):
+        """Snapshot the full episode state as a flat tuple of numbers (cheap to copy and hash).
+
+        Layout: bird y, bird velocity, hit ceiling, score, steps, game over,
+        schedule seed, schedule counter, then x and top height of each pipe.
+        """
+        return self.snapshot_of(self.bird, self.pipes, self.score, self.steps, self.game_over, self.rng)
+
+    @staticmethod
+    def snapshot_of(bird, pipes, score=0, steps=0, game_over=False, rng=None):
+        """Snapshot of a bird and pipes that do not belong to an env (rng=None: arbitrary future pipes)"""
+        snapshot = [bird.y, bird.velocity, bird.hit_ceiling, score, steps, game_over,
+                    rng.seed if rng is not None else 0, rng.counter if rng is not None else 0]
+        for pipe in pipes:
+            snapshot.append(pipe.x)
+            snapshot.append(pipe.top_height)
+        return tuple(snapshot)
+
+    def restore(self, snapshot):
+        """Put the environment back into a state returned by clone(), from this or any other env"""
+        if self.bird is None:
+            self.bird = self.pool.acquire_bird()
+        num_pipes = (len(snapshot) - SNAPSHOT_HEADER) // 2
+        while len(self.pipes) > num_pipes:
+            self.pool.release_pipe(self.pipes.pop())
+        while len(self.pipes) < num_pipes:
+            self.pipes.append(self.pool.acquire_pipe(0, self.rng))  # Gap overwritten below
+        for pipe, index in zip(self.pipes, range(SNAPSHOT_HEADER, len(snapshot), 2)):
+            pipe.x = snapshot[index]
+            pipe.top_height = snapshot[index + 1]
+            pipe.bottom_height = SCREEN_HEIGHT - pipe.top_height - PIPE_GAP - GROUND_HEIGHT
+            pipe.collision_points.clear()
+        bird = self.bird
+        (bird.y, bird.velocity, bird.hit_ceiling, self.score, self.steps, self.game_over,
+         self.rng.seed, self.rng.counter) = snapshot[:SNAPSHOT_HEADER]
+        return self.bird, self.pipes
+
+    def rollout(self, actions, snapshot=None):
+        """Play `actions` (from `snapshot` if given), stops at a crash. Returns the frames survived."""
+        if snapshot is not None:
+            self.restore(snapshot)
+        for frames, action in enumerate(actions):
+            if self.step(action):
+                return frames + 1
+        return len(actions)
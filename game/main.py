@@ -36,6 +36,8 @@ if os.path.exists(PIPE_HEATMAP_FILE):
 else:
     GLOBAL_PIPE_HEATMAP = {'top': [0]*SCREEN_HEIGHT, 'bottom': [0]*SCREEN_HEIGHT}
 
+PIPE_HEATMAP_REVISION = 0  # Bumped on every heatmap change, so cached pipe tints know when to redraw
+
 if os.path.exists(ADAPTIVE_GAP_FILE):
     with open(ADAPTIVE_GAP_FILE, 'r') as f:
         ADAPTIVE_GAP_OFFSET = json.load(f).get('offset', 0)
@@ -46,9 +48,18 @@ def save_pipe_heatmap():
     with open(PIPE_HEATMAP_FILE, 'w') as f:
         json.dump(GLOBAL_PIPE_HEATMAP, f)
 
+def clear_pipe_heatmap():
+    global PIPE_HEATMAP_REVISION
+    PIPE_HEATMAP_REVISION += 1
+    for arr in (GLOBAL_PIPE_HEATMAP['top'], GLOBAL_PIPE_HEATMAP['bottom']):
+        for i in range(len(arr)):
+            arr[i] = 0
+    save_pipe_heatmap()
+
 def load_pipe_heatmap():
-    global GLOBAL_PIPE_HEATMAP
+    global GLOBAL_PIPE_HEATMAP, PIPE_HEATMAP_REVISION
     if os.path.exists(PIPE_HEATMAP_FILE):
+        PIPE_HEATMAP_REVISION += 1
         with open(PIPE_HEATMAP_FILE, 'r') as f:
             _heatmap_data = json.load(f)
             GLOBAL_PIPE_HEATMAP = {
@@ -127,12 +138,18 @@ class Bird:
 
 # Pipe class
 class Pipe:
-    def __init__(self, x):
-        self.x = x
-        self.top_height = random.randint(50, SCREEN_HEIGHT - PIPE_GAP - GROUND_HEIGHT - 50)
-        self.bottom_height = SCREEN_HEIGHT - self.top_height - PIPE_GAP - GROUND_HEIGHT
+    def __init__(self, x, rng=None):
         self.width = pipe_top_img.get_width()
         self.collision_points = []
+        self.reset(x, rng)
+
+    def reset(self, x, rng=None):
+        # Re-roll the gap so pooled pipes can be reused as new ones.
+        # A seeded generator (anything with randint) makes the pipe schedule reproducible.
+        self.x = x
+        self.top_height = (rng or random).randint(50, SCREEN_HEIGHT - PIPE_GAP - GROUND_HEIGHT - 50)
+        self.bottom_height = SCREEN_HEIGHT - self.top_height - PIPE_GAP - GROUND_HEIGHT
+        self.collision_points.clear()
 
     def move(self):
         self.x -= PIPE_SPEED
@@ -167,13 +184,18 @@ class Pipe:
     def is_off_screen(self):
         return self.x + self.width < 0
 
-    def collides_with(self, bird):
+    def collides_with(self, bird, record=True):
+        global PIPE_HEATMAP_REVISION
         # Use an ellipse collider for the bird (like Unity's 2D circle collider, but matching the sprite)
+        # With record=False (simulated futures) the hit is not added to the heatmap
         bird_rect = bird.get_rect()
         # Top pipe collision
         top_pipe_rect = pygame.Rect(self.x, 0, self.width, self.top_height)
         if bird_rect.colliderect(top_pipe_rect):
+            if not record:
+                return True
             self.collision_points.append((bird.x, bird.y))
+            PIPE_HEATMAP_REVISION += 1
             for y in range(max(0, int(bird.y - bird.height // 2)), min(self.top_height, int(bird.y + bird.height // 2))):
                 if 0 <= y < SCREEN_HEIGHT:
                     GLOBAL_PIPE_HEATMAP['top'][y] += 1
@@ -181,7 +203,10 @@ class Pipe:
         # Bottom pipe collision
         bottom_pipe_rect = pygame.Rect(self.x, SCREEN_HEIGHT - self.bottom_height - GROUND_HEIGHT, self.width, self.bottom_height)
         if bird_rect.colliderect(bottom_pipe_rect):
+            if not record:
+                return True
             self.collision_points.append((bird.x, bird.y))
+            PIPE_HEATMAP_REVISION += 1
             for y in range(max(0, int(bird.y - bird.height // 2)), min(self.bottom_height, int(bird.y + bird.height // 2))):
                 y_screen = SCREEN_HEIGHT - self.bottom_height - GROUND_HEIGHT + y
                 if 0 <= y_screen < SCREEN_HEIGHT:
@@ -189,6 +214,36 @@ class Pipe:
             return True
         return False
 
+class SpritePool:
+    """Recycles Bird and Pipe instances instead of allocating new ones every generation"""
+    def __init__(self):
+        self.free_birds = []
+        self.free_pipes = []
+
+    def acquire_bird(self):
+        if self.free_birds:
+            bird = self.free_birds.pop()
+            bird.reset()
+            return bird
+        return Bird()
+
+    def acquire_pipe(self, x, rng=None):
+        if self.free_pipes:
+            pipe = self.free_pipes.pop()
+            pipe.reset(x, rng)
+            return pipe
+        return Pipe(x, rng)
+
+    def release_bird(self, bird):
+        self.free_birds.append(bird)
+
+    def release_pipe(self, pipe):
+        self.free_pipes.append(pipe)
+
+    def release_all(self, birds=(), pipes=()):
+        self.free_birds.extend(birds)
+        self.free_pipes.extend(pipes)
+
 ground_offset = 0  # Global variable for ground movement
 
 def draw_ground():
@@ -264,18 +319,17 @@ def adjust_adaptive_gap_offset(direction, step=5):
 # Main game loop
 def main():
     global high_score, ground_offset
+    from game.renderer import FrameRenderer
+    renderer = FrameRenderer(background=WHITE)
     bird = Bird()
     pipes = [Pipe(SCREEN_WIDTH + 200)]
     score = 0
     running = True
 
     while running:
-        # Clear screen with white background
-        screen.fill(WHITE)
-        # Move ground
+        # Move ground (white background and ground come from the renderer's cached layer)
         ground_offset = (ground_offset - PIPE_SPEED) % ground_img.get_width()
-        # Draw ground layer FIRST (behind everything)
-        draw_ground()
+        renderer.begin_frame(ground_offset)
         
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -284,14 +338,15 @@ def main():
                 bird.flap()
 
         bird.move()
-        bird.draw()
+        renderer.draw_bird(bird)
 
         # Move and draw pipes
         for pipe in pipes:
             pipe.move()
-            pipe.draw()
+            renderer.draw_pipe(pipe)
             if pipe.collides_with(bird):
                 show_game_over_screen(score)
+                renderer.invalidate()
                 # Reset game
                 bird.reset()
                 pipes = [Pipe(SCREEN_WIDTH + 200)]
@@ -307,6 +362,7 @@ def main():
         # Check if bird hits the ground (removed ceiling check)
         if bird.get_rect().bottom > SCREEN_HEIGHT - GROUND_HEIGHT:
             show_game_over_screen(score)
+            renderer.invalidate()
             # Reset game
             bird.reset()
             pipes = [Pipe(SCREEN_WIDTH + 200)]
@@ -314,15 +370,12 @@ def main():
             continue
 
         # Display score (on top layer)
-        font = pygame.font.Font(None, 36)
-        text = font.render("Score: {}".format(score), True, BLACK)
-        screen.blit(text, (10, 10))
+        renderer.text("Score: {}".format(score), (10, 10), 36)
         
         # Display high score (on top layer)
-        high_score_text = font.render("High Score: {}".format(high_score), True, BLACK)
-        screen.blit(high_score_text, (10, 50))
+        renderer.text("High Score: {}".format(high_score), (10, 50), 36)
 
-        pygame.display.flip()
+        renderer.end_frame()
         clock.tick(FPS)
 
     pygame.quit()
@@ -0,0 +1,107 @@
+import os
+import random
+import struct
+import numpy as np
+from config.config import *
+
+# The file starts with a magic and a format version, then one record per episode: header followed by
+# the bit-packed action sequence. Episodes are re-simulated from their seed, so the version must
+# change whenever physics or pipe generation do; logs of another version are refused, not replayed.
+FILE_HEADER = struct.Struct('<4sH')  # magic, format version
+FILE_MAGIC = b'FBEP'
+FORMAT_VERSION = 2  # 2: PipeSchedule draws gaps from splitmix64 of (seed, n), not random.Random(seed)
+RECORD_HEADER = struct.Struct('<IIIIB')  # seed, generation, score, number of actions, flags
+FLAG_NEW_BEST = 1
+FLAG_TRUNCATED = 2
+
+
+def check_file_header(header, filename):
+    """Raise ValueError unless `header` (the first FILE_HEADER.size bytes) is this format version"""
+    if len(header) < FILE_HEADER.size or header[:len(FILE_MAGIC)] != FILE_MAGIC:
+        raise ValueError(f"{filename} is not an episode log, or predates versioned logs")
+    _, version = FILE_HEADER.unpack(header)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{filename} is episode log format {version}, this version reads "
+                         f"{FORMAT_VERSION}; its episodes would replay against different pipes")
+
+
+class EpisodeRecord:
+    def __init__(self, seed, generation, score, actions, flags=0, index=0):
+        self.seed = seed
+        self.generation = generation
+        self.score = score
+        self.actions = actions
+        self.flags = flags
+        self.index = index
+
+    @property
+    def is_new_best(self):
+        return bool(self.flags & FLAG_NEW_BEST)
+
+    @property
+    def truncated(self):
+        return bool(self.flags & FLAG_TRUNCATED)
+
+
+class EpisodeRecorder:
+    """Appends episodes to a compact binary log: pipe seed, packed actions and score.
+
+    The pipe schedule is regenerated from the seed and bird physics are
+    deterministic, so an episode costs ~1 bit per frame plus a 17 byte header.
+    An existing log of another format version is moved aside to <name>.old.
+    """
+
+    def __init__(self, filename=EPISODE_LOG_FILE):
+        self.filename = filename
+        self.seed = None
+        self.actions = bytearray()
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(filename) and os.path.getsize(filename):
+            with open(filename, 'rb') as f:
+                header = f.read(FILE_HEADER.size)
+            try:
+                check_file_header(header, filename)
+            except ValueError as e:
+                os.replace(filename, filename + '.old')
+                print(f"{e}. Moved it to {filename}.old and starting a new log.")
+
+    def start(self, seed=None):
+        """Begin a new episode, returns the PipeSchedule to generate its pipes with"""
+        from game.environment import PipeSchedule
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.actions.clear()
+        return PipeSchedule(self.seed)
+
+    def record(self, action):
+        self.actions.append(action)
+
+    def finish(self, score, generation=0, flags=0):
+        packed = np.packbits(np.frombuffer(self.actions, dtype=np.uint8)).tobytes()
+        with open(self.filename, 'ab') as f:
+            if f.tell() == 0:
+                f.write(FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION))
+            f.write(RECORD_HEADER.pack(self.seed, generation, score, len(self.actions), flags))
+            f.write(packed)
+
+
+def read_episodes(filename=EPISODE_LOG_FILE):
+    """Yield every EpisodeRecord in a log, oldest first. Raises ValueError for a log of another format."""
+    with open(filename, 'rb') as f:
+        header = f.read(FILE_HEADER.size)
+        if not header:
+            return
+        check_file_header(header, filename)
+        index = 0
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return  # End of file, or a record cut short by an interrupted write
+            seed, generation, score, length, flags = RECORD_HEADER.unpack(header)
+            packed = f.read((length + 7) // 8)
+            if len(packed) < (length + 7) // 8:
+                return
+            actions = np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=length)
+            yield EpisodeRecord(seed, generation, score, actions.tolist(), flags, index)
+            index += 1
@@ -0,0 +1,215 @@
+import pygame
+from config.config import *
+
+PIPE_CACHE_SIZE = 256  # Composited pipe columns kept per heatmap revision
+TEXT_CACHE_SIZE = 512
+
+
+class FrameRenderer:
+    """Draws frames as cached layers and only pushes changed regions to the display.
+
+    Background and ground are composited once into a static layer; every frame
+    first restores the regions dirtied last frame from it, then draws the
+    sprites and overlays queued since begin_frame(), then the HUD. Pipes are
+    cached as pre-composited columns (sprites + heatmap tint) and HUD text is
+    only re-rendered when its value changes. Only the touched rectangles go to
+    pygame.display.update().
+    """
+
+    def __init__(self, background=None):
+        from game.main import screen, background_img, ground_img
+        self.screen = screen
+        self.ground_y = SCREEN_HEIGHT - GROUND_HEIGHT
+        self.ground_rect = pygame.Rect(0, self.ground_y, SCREEN_WIDTH, GROUND_HEIGHT)
+        self.ground_width = ground_img.get_width()
+
+        # Static layer: background (image, or a fill colour) with the ground at offset 0
+        self.static = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        if background is None:
+            self.static.blit(background_img, (0, 0))
+        else:
+            self.static.fill(background)
+        # One strip wider than the screen by a tile, so any scroll offset is a single blit
+        self.ground_strip = pygame.Surface((SCREEN_WIDTH + self.ground_width, GROUND_HEIGHT)).convert()
+        self.ground_strip.blit(self.static, (0, 0), self.ground_rect)
+        self.ground_strip.blit(self.static, (SCREEN_WIDTH, 0), (0, self.ground_y, self.ground_width, GROUND_HEIGHT))
+        for x in range(0, SCREEN_WIDTH + self.ground_width, self.ground_width):
+            self.ground_strip.blit(ground_img, (x, 0))
+        self.static.blit(self.ground_strip, self.ground_rect.topleft, (0, 0, SCREEN_WIDTH, GROUND_HEIGHT))
+        self.ground_offset = 0
+
+        self.fonts = {}
+        self.text_cache = {}
+        self.pipe_cache = {}
+        self.heatmap_key = None
+        self.ops = []  # (rect, draw function, args) queued for this frame
+        self.hud = {}  # position -> (key, surface, rect) drawn on screen
+        self.hud_frame = {}
+        self.last_rects = []
+        self.full_redraw = True
+
+    def invalidate(self):
+        """Force a full redraw next frame, e.g. after something else drew on the screen"""
+        self.full_redraw = True
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    # Static layer
+
+    def restore(self, rect):
+        self.screen.blit(self.static, rect, rect)
+        if self.ground_offset and rect.colliderect(self.ground_rect):
+            clip = rect.clip(self.ground_rect)
+            area = pygame.Rect(clip.x + self.ground_offset, 0, clip.width, clip.height)
+            area.y = clip.y - self.ground_y
+            self.screen.blit(self.ground_strip, clip, area)
+
+    # Frame building
+
+    def begin_frame(self, ground_offset=0):
+        if ground_offset != self.ground_offset:
+            self.ground_offset = ground_offset
+            self.last_rects.append(self.ground_rect)
+        self.ops = []
+        self.hud_frame = {}
+
+    def _queue(self, rect, function, *args):
+        self.ops.append((pygame.Rect(rect), function, args))
+
+    def blit(self, surface, position):
+        self._queue(surface.get_rect(topleft=position), self.screen.blit, surface, position)
+
+    def draw_bird(self, bird):
+        image = bird.get_frame()
+        rect = image.get_rect(center=(bird.x, int(bird.y)))
+        self._queue(rect, self.screen.blit, image, rect)
+
+    def draw_pipe(self, pipe):
+        column = self.pipe_column(pipe.top_height)
+        self._queue(column.get_rect(topleft=(pipe.x, 0)), self.screen.blit, column, (pipe.x, 0))
+        for x, y in pipe.collision_points:
+            self.draw_circle((0, 0, 255), (int(x), int(y)), 3)
+
+    def draw_rect(self, color, rect, width=0):
+        rect = pygame.Rect(rect)
+        self._queue(rect.inflate(width, width), pygame.draw.rect, self.screen, color, rect, width)
+
+    def draw_line(self, color, start, end, width=1):
+        left, right = min(start[0], end[0]), max(start[0], end[0])
+        top, bottom = min(start[1], end[1]), max(start[1], end[1])
+        rect = pygame.Rect(left - width, top - width, right - left + 2 * width + 1, bottom - top + 2 * width + 1)
+        self._queue(rect, pygame.draw.line, self.screen, color, start, end, width)
+
+    def draw_circle(self, color, center, radius):
+        rect = pygame.Rect(center[0] - radius, center[1] - radius, 2 * radius + 1, 2 * radius + 1)
+        self._queue(rect, pygame.draw.circle, self.screen, color, center, radius)
+
+    def text(self, text, position, size=24, color=BLACK, outline=None):
+        """HUD text drawn on top of everything, re-rendered only when it changes"""
+        key = (text, size, color, outline)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            if len(self.text_cache) >= TEXT_CACHE_SIZE:
+                self.text_cache.clear()
+            surface = self.text_cache[key] = self.render_text(text, size, color, outline)
+        if outline is not None:
+            position = (position[0] - 1, position[1] - 1)
+        self.hud_frame[position] = (key, surface, surface.get_rect(topleft=position))
+
+    def render_text(self, text, size, color, outline):
+        font = self.font(size)
+        rendered = font.render(text, True, color)
+        if outline is None:
+            return rendered
+        # Outline drawn once into the cached surface instead of 8 extra renders per frame
+        surface = pygame.Surface((rendered.get_width() + 2, rendered.get_height() + 2), pygame.SRCALPHA)
+        shadow = font.render(text, True, outline)
+        for dx in [0, 1, 2]:
+            for dy in [0, 1, 2]:
+                if dx != 1 or dy != 1:
+                    surface.blit(shadow, (dx, dy))
+        surface.blit(rendered, (1, 1))
+        return surface
+
+    # Pipe columns
+
+    def pipe_column(self, top_height):
+        from game.main import GLOBAL_PIPE_HEATMAP, PIPE_HEATMAP_REVISION
+        heatmap_key = (id(GLOBAL_PIPE_HEATMAP), PIPE_HEATMAP_REVISION)
+        if heatmap_key != self.heatmap_key or len(self.pipe_cache) >= PIPE_CACHE_SIZE:
+            self.heatmap_key = heatmap_key
+            self.pipe_cache.clear()
+        column = self.pipe_cache.get(top_height)
+        if column is None:
+            column = self.pipe_cache[top_height] = self.build_pipe_column(top_height, GLOBAL_PIPE_HEATMAP)
+        return column
+
+    def build_pipe_column(self, top_height, heatmap):
+        """Both pipe sprites and their heatmap tint, as Pipe.draw would draw them at x = 0"""
+        from game.main import pipe_top_img, pipe_bottom_img
+        width = pipe_top_img.get_width()
+        column = pygame.Surface((width, SCREEN_HEIGHT), pygame.SRCALPHA)
+        bottom_height = SCREEN_HEIGHT - top_height - PIPE_GAP - GROUND_HEIGHT
+        bottom_y = SCREEN_HEIGHT - bottom_height - GROUND_HEIGHT
+        column.blit(pipe_top_img, pipe_top_img.get_rect(bottomleft=(0, top_height)))
+        column.blit(pipe_bottom_img, pipe_bottom_img.get_rect(topleft=(0, bottom_y)))
+        for y in range(top_height):
+            hits = heatmap['top'][y]
+            if hits > 0:
+                pygame.draw.line(column, (0, 0, 128 + min(255, hits * 30)//2), (0, y), (width, y))
+        for y in range(bottom_height):
+            y_screen = bottom_y + y
+            hits = heatmap['bottom'][y_screen]
+            if hits > 0:
+                pygame.draw.line(column, (0, 0, 128 + min(255, hits * 30)//2), (0, y_screen), (width, y_screen))
+        return column
+
+    # Output
+
+    def end_frame(self):
+        """Draw the queued frame and update only the regions that changed"""
+        screen_rect = self.screen.get_rect()
+        sprite_rects = [rect for rect, _, _ in self.ops]
+        if self.full_redraw:
+            self.restore(screen_rect)
+            dirty = [screen_rect]
+        else:
+            dirty = self.last_rects + sprite_rects
+            # HUD entries that changed or disappeared leave their old area behind
+            for position, (key, _, rect) in self.hud.items():
+                entry = self.hud_frame.get(position)
+                if entry is None or entry[0] != key:
+                    dirty.append(rect)
+        # Restoring a region erases any HUD text under it, so that text is redrawn too
+        redraw_hud = []
+        pending = dict(self.hud_frame)
+        changed = True
+        while changed:
+            changed = False
+            for position, entry in list(pending.items()):
+                old = self.hud.get(position)
+                if self.full_redraw or old is None or old[0] != entry[0] or entry[2].collidelist(dirty) != -1:
+                    redraw_hud.append(entry)
+                    dirty.append(entry[2])
+                    del pending[position]
+                    changed = True
+        dirty = [rect.clip(screen_rect) for rect in dirty]
+        dirty = [rect for rect in dirty if rect.width and rect.height]
+        if not self.full_redraw:
+            for rect in dirty:
+                self.restore(rect)
+        for _, function, args in self.ops:
+            function(*args)
+        for _, surface, rect in redraw_hud:
+            self.screen.blit(surface, rect)
+        if self.full_redraw:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+        self.hud = self.hud_frame
+        self.last_rects = sprite_rects
+        self.full_redraw = False
@@ -1,14 +1,15 @@
 from config.config import *
 
 class RewardSystem:
-    def __init__(self):
+    def __init__(self, survival_reward=SURVIVAL_REWARD, score_reward=SCORE_REWARD, death_penalty=DEATH_PENALTY,
+                 height_penalty=HEIGHT_PENALTY, flap_penalty=FLAP_PENALTY, ceiling_penalty=CEILING_COLLISION_PENALTY):
         self.last_score = 0
-        self.survival_reward = SURVIVAL_REWARD
-        self.score_reward = SCORE_REWARD
-        self.death_penalty = DEATH_PENALTY
-        self.height_penalty = HEIGHT_PENALTY
-        self.flap_penalty = FLAP_PENALTY
-        self.ceiling_penalty = CEILING_COLLISION_PENALTY
+        self.survival_reward = survival_reward
+        self.score_reward = score_reward
+        self.death_penalty = death_penalty
+        self.height_penalty = height_penalty
+        self.flap_penalty = flap_penalty
+        self.ceiling_penalty = ceiling_penalty
         self.consecutive_flaps = 0
     
     def calculate_reward(self, bird, pipes, score, game_over, action=None):
@@ -0,0 +1,11 @@
+from multiprocessing import shared_memory
+
+
+def open_shared_memory(name, size):
+    """Create a new shared memory block (name None), or attach to the one another process created.
+
+    Returns (block, owner); only the owner should unlink the block when done.
+    """
+    if name is None:
+        return shared_memory.SharedMemory(create=True, size=size), True
+    return shared_memory.SharedMemory(name=name), False
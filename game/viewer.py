@@ -0,0 +1,287 @@
+import multiprocessing as mp
+import queue
+import time
+import numpy as np
+from config.config import *
+from game.shared_block import open_shared_memory
+
+MAX_SNAPSHOT_PIPES = 4
+
+# Everything the viewer needs to draw one frame, fixed width so it lives in shared memory
+SNAPSHOT_DTYPE = np.dtype([
+    ('generation', '<i8'),
+    ('score', '<i8'),
+    ('high_score', '<i8'),
+    ('epsilon', '<f8'),
+    ('q_values', '<f8', (2,)),
+    ('action', 'i1'),
+    ('ai_index', '<i4'),
+    ('num_ais', '<i4'),
+    ('gap_offset', '<i4'),
+    ('bird', '<f8', (3,)),  # x, y, velocity
+    ('num_pipes', '<i4'),
+    ('pipes', '<f8', (MAX_SNAPSHOT_PIPES, 2)),  # x, top height
+])
+
+# Keys the viewer sends back to the trainer; display toggles stay in the viewer
+VIEWER_COMMAND_KEYS = {
+    'continuous': {'q': 'quit', 'b': 'clear_heatmap'},
+    'multi': {'q': 'quit', 's': 'save', 'r': 'reset', 'd': 'debug', 'k': 'share'},
+}
+VIEWER_CONTROLS = {
+    'continuous': ("Q: Quit | A: Toggle Axes | H: Toggle Hitboxes",
+                   "C: Toggle Collision Zones | B: Clear Pipe Heatmap | G: Gap Dists"),
+    'multi': ("Q: Quit | S: Save | R: Reset | D: Debug | K: Share Knowledge",
+              "A: Axes | H: Hitboxes | C: Collision Zones | G: Gap Dists"),
+}
+
+
+class FrameSlot:
+    """Latest training frame in shared memory, guarded by a sequence counter like PolicySnapshot"""
+
+    def __init__(self, name=None):
+        self.shm, self.owner = open_shared_memory(name, 16 + SNAPSHOT_DTYPE.itemsize)
+        self.header = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf)
+        self.row = np.ndarray((1,), dtype=SNAPSHOT_DTYPE, buffer=self.shm.buf, offset=16)
+        if self.owner:
+            self.header[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, values):
+        self.header[0] += 1
+        self.row[0] = values
+        self.header[0] += 1
+
+    def read(self, last_sequence=0):
+        """Return (sequence, snapshot) if a newer frame exists, else None"""
+        while True:
+            sequence = int(self.header[0])
+            if sequence == last_sequence:
+                return None
+            if sequence % 2:
+                time.sleep(0.0001)
+                continue
+            snapshot = self.row[0].copy()
+            if int(self.header[0]) == sequence:
+                return sequence, snapshot
+
+    def close(self):
+        self.header = self.row = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class ViewerLink:
+    """Trainer side of a viewer running in its own process.
+
+    publish() only copies the frame when the viewer could show it (VIEWER_FPS),
+    and commands from the viewer's hotkeys are polled at the same rate, so the
+    simulation never waits on the display.
+    """
+
+    def __init__(self, mode='continuous', fps=VIEWER_FPS):
+        self.mode = mode
+        self.interval = 1.0 / fps
+        self.next_publish = 0.0
+        self.next_poll = 0.0
+        self.slot = None
+        self.commands = None
+        self.stop_event = None
+        self.process = None
+
+    def start(self):
+        # Start before the trainer goes headless: the viewer inherits the environment
+        ctx = mp.get_context('spawn')
+        self.slot = FrameSlot()
+        self.commands = ctx.Queue()
+        self.stop_event = ctx.Event()
+        self.process = ctx.Process(target=viewer_main, daemon=True,
+                                   args=(self.slot.name, self.commands, self.stop_event, self.mode))
+        self.process.start()
+
+    def publish(self, bird, pipes, score, generation, epsilon, high_score, q_values, action,
+                ai_index=-1, num_ais=1):
+        now = time.perf_counter()
+        if now < self.next_publish:
+            return
+        self.next_publish = now + self.interval
+        from game.main import ADAPTIVE_GAP_OFFSET
+        pipe_rows = [(pipe.x, pipe.top_height) for pipe in pipes[:MAX_SNAPSHOT_PIPES]]
+        num_pipes = len(pipe_rows)
+        pipe_rows += [(0.0, 0.0)] * (MAX_SNAPSHOT_PIPES - num_pipes)
+        self.slot.write((generation, score, high_score, epsilon, tuple(q_values[:2]), action,
+                         ai_index, num_ais, ADAPTIVE_GAP_OFFSET, (bird.x, bird.y, bird.velocity),
+                         num_pipes, pipe_rows))
+
+    def poll_commands(self):
+        """Commands sent by the viewer since the last poll"""
+        now = time.perf_counter()
+        if now < self.next_poll:
+            return []
+        self.next_poll = now + self.interval
+        commands = []
+        while True:
+            try:
+                commands.append(self.commands.get_nowait())
+            except queue.Empty:
+                return commands
+
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def stop(self):
+        if self.process is None:
+            return
+        self.stop_event.set()
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.slot.close()
+        self.process = None
+
+
+class SnapshotRenderer:
+    """Draws snapshots with the same overlays as continuous_train.render_frame"""
+
+    def __init__(self, mode):
+        from game.main import Bird, Pipe
+        from game.renderer import FrameRenderer
+        self.mode = mode
+        self.bird = Bird()
+        self.pipes = [Pipe(0) for _ in range(MAX_SNAPSHOT_PIPES)]
+        self.frame = FrameRenderer()
+        self.show_axes = False
+        self.show_hitboxes = False
+        self.show_collision_zones = False
+        self.show_gap_distances = mode == 'continuous'
+
+    def toggle(self, key):
+        """Handle a display-only hotkey, returns False if the key is not one"""
+        import pygame
+        if key == pygame.K_a:
+            self.show_axes = not self.show_axes
+        elif key == pygame.K_h:
+            self.show_hitboxes = not self.show_hitboxes
+        elif key == pygame.K_c:
+            self.show_collision_zones = not self.show_collision_zones
+        elif key == pygame.K_g:
+            self.show_gap_distances = not self.show_gap_distances
+        else:
+            return False
+        return True
+
+    def load(self, snapshot):
+        """Move the viewer's own bird and pipes to the snapshot, returns the visible pipes"""
+        import game.main as main
+        main.ADAPTIVE_GAP_OFFSET = int(snapshot['gap_offset'])
+        self.bird.x, self.bird.y, self.bird.velocity = snapshot['bird'].tolist()
+        pipes = self.pipes[:int(snapshot['num_pipes'])]
+        for pipe, (x, top_height) in zip(pipes, snapshot['pipes'].tolist()):
+            pipe.x = x
+            pipe.top_height = int(top_height)
+            pipe.bottom_height = SCREEN_HEIGHT - pipe.top_height - PIPE_GAP - GROUND_HEIGHT
+        return pipes
+
+    def draw(self, snapshot):
+        """Queue the snapshot on the frame renderer and push the changed regions to the display"""
+        from game.main import get_adaptive_gap_center
+        frame = self.frame
+        pipes = self.load(snapshot)
+        bird = self.bird
+        frame.begin_frame()
+        if self.show_axes:
+            frame.draw_line((200, 200, 200), (SCREEN_WIDTH//2, 0), (SCREEN_WIDTH//2, SCREEN_HEIGHT), 1)
+            frame.draw_line((200, 200, 200), (0, SCREEN_HEIGHT//2), (SCREEN_WIDTH, SCREEN_HEIGHT//2), 1)
+        for pipe in pipes:
+            frame.draw_pipe(pipe)
+            if self.show_hitboxes or self.show_collision_zones:
+                width = 3 if self.show_hitboxes else 0
+                frame.draw_rect(RED, (pipe.x, 0, pipe.width, pipe.top_height), width)
+                frame.draw_rect(RED, (pipe.x, SCREEN_HEIGHT - pipe.bottom_height - GROUND_HEIGHT, pipe.width, pipe.bottom_height), width)
+        frame.draw_bird(bird)
+        if self.show_hitboxes:
+            frame.draw_rect(RED, bird.get_rect(), 2)
+            frame.draw_rect(RED, (0, SCREEN_HEIGHT - GROUND_HEIGHT, SCREEN_WIDTH, GROUND_HEIGHT), 2)
+        if pipes and (self.show_gap_distances or self.show_axes):
+            pipe = pipes[0]
+            gap_center_y = get_adaptive_gap_center(pipe.top_height)
+            frame.draw_line((255, 0, 255), (0, gap_center_y), (SCREEN_WIDTH, gap_center_y), 3)
+            if self.show_gap_distances:
+                frame.text(f"Top→Pink: {int(gap_center_y - pipe.top_height)} px",
+                           (pipe.x + pipe.width + 5, pipe.top_height + 5), 22, (255, 0, 255), outline=(0, 0, 0))
+                frame.text(f"Pink→Bottom: {int(pipe.top_height + PIPE_GAP - gap_center_y)} px",
+                           (pipe.x + pipe.width + 5, pipe.top_height + PIPE_GAP - 25), 22, (255, 0, 255), outline=(0, 0, 0))
+
+        # Game info
+        lines = [f"Score: {snapshot['score']}", f"High Score: {snapshot['high_score']}",
+                 f"Generation: {snapshot['generation']}", f"Epsilon: {snapshot['epsilon']:.3f}"]
+        if snapshot['ai_index'] >= 0:
+            lines.append(f"AI {snapshot['ai_index'] + 1} (Best)")
+        for row, line in enumerate(lines):
+            frame.text(line, (10, 10 + row * 25))
+
+        # Q-values and action (right side)
+        q_wait, q_flap = snapshot['q_values'].tolist()
+        action = int(snapshot['action'])
+        frame.text(f"Q(WAIT): {q_wait:.2f}", (SCREEN_WIDTH - 150, 10), 18)
+        frame.text(f"Q(FLAP): {q_flap:.2f}", (SCREEN_WIDTH - 150, 30), 18)
+        frame.text(f"Action: {'FLAP' if action == 1 else 'WAIT'}", (SCREEN_WIDTH - 150, 50), 18,
+                   (255, 0, 0) if action == 1 else (0, 0, 255))
+
+        # State and controls (bottom)
+        if pipes:
+            gap_center_y = get_adaptive_gap_center(pipes[0].top_height)
+            state_info = (f"Bird Y: {int(bird.y)}, Vel: {bird.velocity:.1f}, Pipe X: {int(pipes[0].x)}, "
+                          f"Gap Y: {int(gap_center_y)}, Diff: {bird.y - gap_center_y:.1f}")
+        else:
+            state_info = "No pipes"
+        if snapshot['num_ais'] > 1:
+            state_info = f"Training {snapshot['num_ais']} AIs simultaneously | " + state_info
+        frame.text(state_info, (10, SCREEN_HEIGHT - 80), 18)
+        for row, line in enumerate(VIEWER_CONTROLS[self.mode]):
+            frame.text(line, (10, SCREEN_HEIGHT - 60 + row * 20), 18)
+        frame.end_frame()
+
+
+def viewer_main(slot_name, commands, stop_event, mode='continuous'):
+    """Viewer process: draws the latest published frame at VIEWER_FPS and forwards hotkeys"""
+    import pygame
+    from game.main import clock, load_pipe_heatmap
+    pygame.display.set_caption("Flappy Bird - Training Viewer")
+    slot = FrameSlot(name=slot_name)
+    renderer = SnapshotRenderer(mode)
+    command_keys = {getattr(pygame, f'K_{key}'): command for key, command in VIEWER_COMMAND_KEYS[mode].items()}
+    sequence = 0
+    snapshot = None
+    generation = None
+    try:
+        while not stop_event.is_set():
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return  # Closing the window leaves training running
+                elif event.type == pygame.KEYDOWN and not renderer.toggle(event.key):
+                    command = command_keys.get(event.key)
+                    if command is not None:
+                        commands.put(command)
+                    if command == 'clear_heatmap':
+                        generation = None  # Reload once the trainer has saved the cleared heatmap
+            update = slot.read(sequence)
+            if update is not None:
+                sequence, snapshot = update
+                # The trainer saves the pipe heatmap after each generation
+                if snapshot['generation'] != generation:
+                    generation = snapshot['generation']
+                    try:
+                        load_pipe_heatmap()
+                    except ValueError:
+                        generation = None  # Caught the file mid-write, retry on the next frame
+            if snapshot is not None:
+                renderer.draw(snapshot)
+            clock.tick(VIEWER_FPS)
+    finally:
+        slot.close()
+        pygame.quit()
@@ -3,9 +3,23 @@ import sys
 from config.config import *
 import json
 
+# Keyboard shortcuts, shared with the detached viewer's forwarded commands
+HOTKEY_COMMANDS = {
+    pygame.K_q: 'quit',
+    pygame.K_s: 'save',
+    pygame.K_r: 'reset',
+    pygame.K_d: 'debug',
+    pygame.K_k: 'share',
+}
+
 class MultiAITrainer:
-    def __init__(self, num_ais=4):
+    def __init__(self, num_ais=4, shared_track=SHARED_PIPE_TRACK, param_server=None, async_episodes=ASYNC_EPISODES,
+                 viewer_link=None):
         self.num_ais = num_ais
+        self.viewer_link = viewer_link  # Detached viewer process, replaces inline rendering
+        self.renderer = None  # Created on the first rendered frame
+        self.shared_track = shared_track
+        self.async_episodes = async_episodes
         self.ais = []
         self.reward_systems = []
         self.generation = 0
@@ -18,14 +32,29 @@ class MultiAITrainer:
         self.knowledge_sharing_strength = 0.1  # How much to blend Q-values
         
         # Initialize multiple AIs
-        from ai.ai_agent import FlappyBirdAI
+        from ai.ai_agent import create_agent
         from game.reward_system import RewardSystem
+        from game.main import SpritePool
+        from game.environment import EpisodeBudget
+        
+        # Birds and pipes are recycled across generations
+        self.sprite_pool = SpritePool()
+        
+        # Step/time budget bounding each generation
+        self.budget = EpisodeBudget()
+        
+        # Live counters, only set (and served over HTTP) by multi_ai_train(metrics_port=...)
+        self.metrics = None
+        
+        # Per-AI environments kept running across generations in async mode
+        self.async_envs = []
+        self.async_budgets = []
         
         for i in range(num_ais):
             # Each AI starts with slightly different parameters for diversity
             epsilon = EPSILON * (1 + i * 0.1)  # Different exploration rates
             learning_rate = LEARNING_RATE * (1 + i * 0.05)  # Different learning rates
-            ai = FlappyBirdAI(epsilon=epsilon, learning_rate=learning_rate)
+            ai = create_agent(epsilon=epsilon, learning_rate=learning_rate)
             reward_system = RewardSystem()
             
             # Load existing Q-table if available
@@ -37,8 +66,38 @@ class MultiAITrainer:
             self.ais.append(ai)
             self.reward_systems.append(reward_system)
         
+        # Agent decisions every DECISION_INTERVAL frames (or on state changes), one update each
+        from ai.decision_interval import DecisionInterval
+        self.decisions = [DecisionInterval(ai) for ai in self.ais]
+        
+        # Optional transition log shared by all AIs, for offline training
+        self.transition_log = None
+        if RECORD_TRANSITIONS:
+            from ai.transition_log import TransitionLog
+            self.transition_log = TransitionLog()
+            for ai in self.ais:
+                ai.transition_log = self.transition_log
+        
+        # Optional parameter server pooling knowledge with trainers on other machines
+        self.param_client = None
+        self.remote_syncs = []
+        if param_server and not self.ais[0].tabular:
+            print(f"The parameter server shares Q-tables, ignoring it for the '{AGENT_TYPE}' agent")
+        elif param_server:
+            from ai.param_server import ParameterClient, RemoteTableSync, parse_address
+            self.param_client = ParameterClient(*parse_address(param_server))
+            self.remote_syncs = [RemoteTableSync(self.param_client) for _ in range(num_ais)]
+            print(f"Sharing knowledge through parameter server at {param_server}")
+        
         print(f"Initialized {num_ais} AIs with shared knowledge system")
         print(f"Knowledge sharing every {self.knowledge_sharing_frequency} generations")
+        if self.async_episodes:
+            print("Async mode: each AI restarts as soon as its episode ends")
+        elif self.shared_track:
+            print("Lockstep mode: all AIs share one pipe track per generation")
+        if self.decisions[0].interval > 1:
+            print(f"Deciding every {self.decisions[0].interval} frames"
+                  + (" or on state changes" if self.decisions[0].adaptive else ""))
     
     def merge_q_tables(self, source_q_table, target_q_table):
         """Merge Q-values from source to target with weighted averaging"""
@@ -59,6 +118,14 @@ class MultiAITrainer:
         """Share knowledge between all AIs"""
         print(f"🔄 Sharing knowledge between {self.num_ais} AIs...")
         
+        if not self.ais[0].tabular:
+            # Function approximators have no table entries to merge: pull every AI towards the mean parameters
+            shared_parameters = self.ais[0].average_parameters(self.ais)
+            for ai in self.ais:
+                ai.blend_parameters(shared_parameters, 0.3)
+            print("✅ Knowledge shared! Parameters blended towards the population mean")
+            return
+        
         # Collect all Q-tables and create shared knowledge
         all_q_tables = [ai.q_table for ai in self.ais]
         
@@ -82,52 +149,92 @@ class MultiAITrainer:
                 else:
                     # New state for this AI, adopt shared knowledge
                     ai.q_table[state] = shared_q_values.copy()
+                    if ai.neighbors is not None:
+                        ai.neighbors.add(state)
         
         print(f"✅ Knowledge shared! Shared Q-table size: {len(self.shared_q_table)} states")
+        
+        if self.param_client is not None:
+            self.sync_remote_knowledge()
+    
+    def sync_remote_knowledge(self):
+        """Push each AI's new experience to the parameter server and blend back the pooled table"""
+        try:
+            pushed = pulled = 0
+            for ai, remote_sync in zip(self.ais, self.remote_syncs):
+                sent, received = remote_sync.sync(ai.q_table, ai.neighbors)
+                pushed += sent
+                pulled += received
+            print(f"🌐 Parameter server sync: pushed {pushed}, pulled {pulled} states")
+        except (ConnectionError, OSError, ValueError) as e:
+            print(f"Parameter server sync failed: {e}")
+    
+    def handle_command(self, command):
+        """Run a hotkey command, returns False when training should stop"""
+        if command == 'quit':
+            print("\nStopping training...")
+            return False
+        elif command == 'save':
+            print("\nSaving progress...")
+            self.save_all_ais()
+        elif command == 'reset':
+            print("\nResetting training...")
+            self.reset_all_ais()
+        elif command == 'debug':
+            print("\nDebug info requested...")
+            self.show_debug_info()
+        elif command == 'share':
+            print("\nManual knowledge sharing...")
+            self.share_knowledge()
+        return True
+    
+    def handle_events(self):
+        """Process keyboard input, returns False when training should stop"""
+        if self.viewer_link is not None:
+            return all(self.handle_command(command) for command in self.viewer_link.poll_commands())
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            elif event.type == pygame.KEYDOWN:
+                command = HOTKEY_COMMANDS.get(event.key)
+                if command is not None and not self.handle_command(command):
+                    return False
+        return True
     
     def train_generation(self):
         """Train all AIs for one generation"""
-        from game.main import Bird, Pipe, screen, clock, draw_ground
+        if self.async_episodes:
+            return self.train_generation_async()
+        if self.shared_track:
+            return self.train_generation_lockstep()
+        
+        pool = self.sprite_pool
         
         # Initialize game states for all AIs
-        birds = [Bird() for _ in range(self.num_ais)]
-        pipes_list = [[Pipe(SCREEN_WIDTH + 200)] for _ in range(self.num_ais)]
+        birds = [pool.acquire_bird() for _ in range(self.num_ais)]
+        pipes_list = [[pool.acquire_pipe(SCREEN_WIDTH + 200)] for _ in range(self.num_ais)]
         scores = [0] * self.num_ais
         game_overs = [False] * self.num_ais
+        actions = [0] * self.num_ais
         
         # Get initial states
-        states = [ai.get_state(birds[i], pipes_list[i]) for i, ai in enumerate(self.ais)]
+        for i, ai in enumerate(self.ais):
+            self.decisions[i].start(ai.get_state(birds[i], pipes_list[i]))
+        self.budget.start()
         
         # Game loop for all AIs
-        while not all(game_overs) and any(not game_over for game_over in game_overs):
+        while not all(game_overs):
             # Handle input events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_q:
-                        print("\nStopping training...")
-                        return False
-                    elif event.key == pygame.K_s:
-                        print("\nSaving progress...")
-                        self.save_all_ais()
-                    elif event.key == pygame.K_r:
-                        print("\nResetting training...")
-                        self.reset_all_ais()
-                    elif event.key == pygame.K_d:
-                        print("\nDebug info requested...")
-                        self.show_debug_info()
-                    elif event.key == pygame.K_k:
-                        print("\nManual knowledge sharing...")
-                        self.share_knowledge()
+            if not self.handle_events():
+                return False
             
             # Update each AI that's still playing
             for i in range(self.num_ais):
                 if game_overs[i]:
                     continue
                 
-                # Get AI action
-                action = self.ais[i].get_smart_action(states[i], birds[i], pipes_list[i])
+                # Get AI action (a wait between decisions)
+                action = actions[i] = self.decisions[i].act(birds[i], pipes_list[i])
                 
                 # Apply action
                 if action == 1:
@@ -144,41 +251,182 @@ class MultiAITrainer:
                 
                 # Remove off-screen pipes and add new ones
                 if pipes_list[i][0].is_off_screen():
-                    pipes_list[i].pop(0)
-                    pipes_list[i].append(Pipe(SCREEN_WIDTH + 200))
+                    pool.release_pipe(pipes_list[i].pop(0))
+                    pipes_list[i].append(pool.acquire_pipe(SCREEN_WIDTH + 200))
                     scores[i] += 1
                 
                 # Check boundaries
                 if birds[i].y + birds[i].radius > SCREEN_HEIGHT - GROUND_HEIGHT:
                     game_overs[i] = True
                 
-                # Get next state
-                next_state = self.ais[i].get_state(birds[i], pipes_list[i])
-                
                 # Calculate reward
                 reward = self.reward_systems[i].calculate_reward(birds[i], pipes_list[i], scores[i], game_overs[i], action)
                 
-                # Update Q-table
-                self.ais[i].update_q_table(states[i], action, reward, next_state)
-                
-                # Update state
-                states[i] = next_state
+                # Update Q-table once the decision is over
+                self.decisions[i].step(birds[i], pipes_list[i], reward, game_overs[i])
             
             # Render the best performing AI
             best_ai_idx = self.get_best_performing_ai(scores)
             if best_ai_idx is not None:
                 self.render_frame(birds[best_ai_idx], pipes_list[best_ai_idx], scores[best_ai_idx], 
                                 self.generation, self.ais[best_ai_idx].epsilon, self.high_score, 
-                                self.ais[best_ai_idx], states[best_ai_idx], 
-                                self.ais[best_ai_idx].get_smart_action(states[best_ai_idx], birds[best_ai_idx], pipes_list[best_ai_idx]))
+                                self.ais[best_ai_idx], self.decisions[best_ai_idx].state, actions[best_ai_idx])
+            
+            # Cut the generation short once it runs out of budget (survivors are truncated, not killed)
+            if self.budget.tick():
+                for i in range(self.num_ais):
+                    if not game_overs[i]:
+                        self.decisions[i].flush(birds[i], pipes_list[i])
+                break
         
-        # End generation for all AIs
-        for ai in self.ais:
-            ai.end_episode()
+        # Return sprites to the pool for the next generation
+        pool.release_all(birds, [pipe for pipes in pipes_list for pipe in pipes])
+        
+        self.end_generation(scores)
+        return True
+    
+    def train_generation_lockstep(self):
+        """Train all AIs for one generation on a single shared pipe track"""
+        pool = self.sprite_pool
+        
+        birds = [pool.acquire_bird() for _ in range(self.num_ais)]
+        pipes = [pool.acquire_pipe(SCREEN_WIDTH + 200)]
+        scores = [0] * self.num_ais
+        game_overs = [False] * self.num_ais
+        actions = [0] * self.num_ais
+        
+        for i, ai in enumerate(self.ais):
+            self.decisions[i].start(ai.get_state(birds[i], pipes))
+        self.budget.start()
+        
+        while not all(game_overs):
+            if not self.handle_events():
+                return False
+            
+            # Birds that started this frame alive
+            alive = [i for i in range(self.num_ais) if not game_overs[i]]
+            
+            for i in alive:
+                actions[i] = self.decisions[i].act(birds[i], pipes)
+                if actions[i] == 1:
+                    birds[i].flap()
+                birds[i].move()
+            
+            # Pipes move once per frame for the whole population
+            for pipe in pipes:
+                pipe.move()
+            for i in alive:
+                for pipe in pipes:
+                    if pipe.collides_with(birds[i]):
+                        game_overs[i] = True
+            
+            if pipes[0].is_off_screen():
+                pool.release_pipe(pipes.pop(0))
+                pipes.append(pool.acquire_pipe(SCREEN_WIDTH + 200))
+                for i in alive:
+                    scores[i] += 1
+            
+            for i in alive:
+                if birds[i].y + birds[i].radius > SCREEN_HEIGHT - GROUND_HEIGHT:
+                    game_overs[i] = True
+                reward = self.reward_systems[i].calculate_reward(birds[i], pipes, scores[i], game_overs[i], actions[i])
+                self.decisions[i].step(birds[i], pipes, reward, game_overs[i])
+            
+            best_ai_idx = self.get_best_performing_ai(scores)
+            if best_ai_idx is not None:
+                self.render_frame(birds[best_ai_idx], pipes, scores[best_ai_idx],
+                                self.generation, self.ais[best_ai_idx].epsilon, self.high_score,
+                                self.ais[best_ai_idx], self.decisions[best_ai_idx].state, actions[best_ai_idx])
+            
+            if self.budget.tick():
+                for i in range(self.num_ais):
+                    if not game_overs[i]:
+                        self.decisions[i].flush(birds[i], pipes)
+                break
+        
+        pool.release_all(birds, pipes)
+        
+        self.end_generation(scores)
+        return True
+    
+    def start_async_episode(self, i):
+        """Reset AI i's environment, episode budget and pending decision"""
+        bird, pipes = self.async_envs[i].reset()
+        self.async_budgets[i].start()
+        self.decisions[i].start(self.ais[i].get_state(bird, pipes))
+    
+    def train_generation_async(self):
+        """Train until every AI has finished at least one episode.
+        
+        Each AI is restarted the moment its episode ends, so nobody waits for
+        the longest survivor; episodes still running carry over to the next
+        generation.
+        """
+        from game.environment import EpisodeBudget, FlappyEnv
+        
+        if not self.async_envs:
+            self.async_envs = [FlappyEnv(pool=self.sprite_pool) for _ in range(self.num_ais)]
+            self.async_budgets = [EpisodeBudget() for _ in range(self.num_ais)]
+            for i in range(self.num_ais):
+                self.start_async_episode(i)
+        
+        finished = [False] * self.num_ais
+        scores = [0] * self.num_ais
+        actions = [0] * self.num_ais
+        self.budget.start()
+        
+        while not all(finished):
+            if not self.handle_events():
+                return False
+            
+            for i, (ai, env) in enumerate(zip(self.ais, self.async_envs)):
+                decisions = self.decisions[i]
+                actions[i] = decisions.act(env.bird, env.pipes)
+                game_over = env.step(actions[i])
+                reward = self.reward_systems[i].calculate_reward(env.bird, env.pipes, env.score, game_over, actions[i])
+                decisions.step(env.bird, env.pipes, reward, game_over)
+                
+                truncated = self.async_budgets[i].tick()
+                if game_over or truncated:
+                    if truncated:
+                        decisions.flush(env.bird, env.pipes)
+                    scores[i] = max(scores[i], env.score)
+                    finished[i] = True
+                    ai.end_episode()
+                    self.reward_systems[i].reset()
+                    self.start_async_episode(i)
+            
+            live_scores = [env.score for env in self.async_envs]
+            best_ai_idx = self.get_best_performing_ai(live_scores)
+            if best_ai_idx is not None:
+                env = self.async_envs[best_ai_idx]
+                self.render_frame(env.bird, env.pipes, env.score,
+                                self.generation, self.ais[best_ai_idx].epsilon, self.high_score,
+                                self.ais[best_ai_idx], self.decisions[best_ai_idx].state, actions[best_ai_idx])
+            
+            if self.budget.tick():
+                break
+        
+        # Episodes still running count with their score so far
+        scores = [max(score, env.score) for score, env in zip(scores, self.async_envs)]
+        self.end_generation(scores, end_episodes=False)
+        return True
+    
+    def end_generation(self, scores, end_episodes=True):
+        """Update learning parameters, share knowledge and track high scores after a generation"""
+        if self.metrics is not None:
+            self.metrics.lap('play')
+        
+        # End generation for all AIs (async mode already ends each episode as it finishes)
+        if end_episodes:
+            for ai in self.ais:
+                ai.end_episode()
         
         # Share knowledge periodically
         if self.generation % self.knowledge_sharing_frequency == 0:
             self.share_knowledge()
+            if self.metrics is not None:
+                self.metrics.lap('share')
         
         # Update high score
         max_score = max(scores)
@@ -189,11 +437,14 @@ class MultiAITrainer:
             self.save_all_ais()
         
         # Reset reward systems
-        for reward_system in self.reward_systems:
-            reward_system.reset()
+        if end_episodes:
+            for reward_system in self.reward_systems:
+                reward_system.reset()
         
+        if self.metrics is not None:
+            self.metrics.end_generation(scores, self.budget.steps, self.ais)
+            self.metrics.lap('bookkeeping')
         self.generation += 1
-        return True
     
     def get_best_performing_ai(self, scores):
         """Get the index of the best performing AI"""
@@ -213,12 +464,39 @@ class MultiAITrainer:
         with open("q_table_shared.json", 'w') as f:
             json.dump(serializable_shared_q_table, f)
         
+        if self.metrics is not None:
+            self.metrics.checkpoint_saved()
         print(f"💾 All {self.num_ais} AIs + shared knowledge saved!")
     
+    def save_session(self):
+        """Checkpoint every AI and the trainer counters for --resume (ai/session.py)"""
+        from ai.session import save_session, session_file
+        save_session(session_file('multi'), self.ais, {
+            'generation': self.generation,
+            'high_score': self.high_score,
+            'best_ai_index': self.best_ai_index,
+            'shared_q_table': self.shared_q_table,
+        })
+        if self.metrics is not None:
+            self.metrics.checkpoint_saved()
+    
+    def resume_session(self):
+        """Continue from the last save_session(); running async episodes start over"""
+        from ai.session import load_session, session_file
+        trainer_state = load_session(session_file('multi'), self.ais)
+        if trainer_state is None:
+            return False
+        self.generation = trainer_state['generation']
+        self.high_score = trainer_state['high_score']
+        self.best_ai_index = trainer_state['best_ai_index']
+        self.shared_q_table = trainer_state['shared_q_table']
+        print(f"Continuing at generation {self.generation}, high score {self.high_score}")
+        return True
+    
     def reset_all_ais(self):
         """Reset all AIs and shared knowledge"""
         for ai in self.ais:
-            ai.q_table = {}
+            ai.q_table = ai.new_q_table()
         self.shared_q_table = {}
         self.high_score = 0
         self.generation = 0
@@ -233,79 +511,77 @@ class MultiAITrainer:
         print(f"   Shared Q-table size: {len(self.shared_q_table)} states")
         print(f"   Knowledge sharing every {self.knowledge_sharing_frequency} generations")
         
+        from ai.ai_agent import size_description
         for i, ai in enumerate(self.ais):
             stats = ai.get_learning_stats()
             print(f"   AI {i+1}:")
             print(f"     Epsilon: {stats['epsilon']:.4f}")
-            print(f"     Q-table size: {stats['q_table_size']} states")
+            print(f"     {size_description(stats)}")
             print(f"     Exploration rate: {stats['exploration_rate']:.2%}")
             print(f"     Avg Q-change: {stats['avg_q_change']:.4f}")
     
     def render_frame(self, bird, pipes, score, generation, epsilon, high_score, ai, state, action):
         """Render a single frame for visualization"""
-        from game.main import screen, clock, draw_ground
-        
-        screen.fill(WHITE)
-        
-        # Draw ground layer
-        draw_ground()
+        if self.viewer_link is not None:
+            self.viewer_link.publish(bird, pipes, score, generation, epsilon, high_score,
+                                     ai.q_table.get(state, [0, 0]), action, self.best_ai_index, self.num_ais)
+            return
+        
+        from game.main import clock
+        from game.renderer import FrameRenderer
+        if self.renderer is None:
+            self.renderer = FrameRenderer(background=WHITE)
+        renderer = self.renderer
+        renderer.begin_frame()
         
         # Draw game objects
-        bird.draw()
+        renderer.draw_bird(bird)
         for pipe in pipes:
-            pipe.draw()
-        
-        # Draw info and controls
-        font = pygame.font.Font(None, 24)
-        font_small = pygame.font.Font(None, 18)
+            renderer.draw_pipe(pipe)
         
         # Game info
-        score_text = font.render(f"Score: {score}", True, BLACK)
-        high_score_text = font.render(f"High Score: {high_score}", True, BLACK)
-        generation_text = font.render(f"Generation: {generation}", True, BLACK)
-        epsilon_text = font.render(f"Epsilon: {epsilon:.3f}", True, BLACK)
-        ai_text = font.render(f"AI {self.best_ai_index + 1} (Best)", True, BLACK)
-        
-        # Q-values for current state
-        q_values = ai.q_table.get(state, [0, 0])
-        q_wait_text = font_small.render(f"Q(WAIT): {q_values[0]:.2f}", True, BLACK)
-        q_flap_text = font_small.render(f"Q(FLAP): {q_values[1]:.2f}", True, BLACK)
-        action_text = font_small.render(f"Action: {'FLAP' if action == 1 else 'WAIT'}", True, (255, 0, 0) if action == 1 else (0, 0, 255))
-        
-        # Multi-AI info
-        multi_ai_text = font_small.render(f"Training {self.num_ais} AIs simultaneously", True, BLACK)
-        
-        # Controls
-        controls_text = font_small.render("Q: Quit | S: Save | R: Reset | D: Debug | K: Share Knowledge", True, BLACK)
-        
-        # Position everything
-        screen.blit(score_text, (10, 10))
-        screen.blit(high_score_text, (10, 35))
-        screen.blit(generation_text, (10, 60))
-        screen.blit(epsilon_text, (10, 85))
-        screen.blit(ai_text, (10, 110))
+        renderer.text(f"Score: {score}", (10, 10))
+        renderer.text(f"High Score: {high_score}", (10, 35))
+        renderer.text(f"Generation: {generation}", (10, 60))
+        renderer.text(f"Epsilon: {epsilon:.3f}", (10, 85))
+        renderer.text(f"AI {self.best_ai_index + 1} (Best)", (10, 110))
         
         # Q-values section (right side)
-        screen.blit(q_wait_text, (SCREEN_WIDTH - 150, 10))
-        screen.blit(q_flap_text, (SCREEN_WIDTH - 150, 30))
-        screen.blit(action_text, (SCREEN_WIDTH - 150, 50))
+        q_values = ai.q_table.get(state, [0, 0])
+        renderer.text(f"Q(WAIT): {q_values[0]:.2f}", (SCREEN_WIDTH - 150, 10), 18)
+        renderer.text(f"Q(FLAP): {q_values[1]:.2f}", (SCREEN_WIDTH - 150, 30), 18)
+        renderer.text(f"Action: {'FLAP' if action == 1 else 'WAIT'}", (SCREEN_WIDTH - 150, 50), 18,
+                      (255, 0, 0) if action == 1 else (0, 0, 255))
         
-        # Multi-AI info (bottom)
-        screen.blit(multi_ai_text, (10, SCREEN_HEIGHT - 60))
-        screen.blit(controls_text, (10, SCREEN_HEIGHT - 40))
+        # Multi-AI info and controls (bottom)
+        renderer.text(f"Training {self.num_ais} AIs simultaneously", (10, SCREEN_HEIGHT - 60), 18)
+        renderer.text("Q: Quit | S: Save | R: Reset | D: Debug | K: Share Knowledge", (10, SCREEN_HEIGHT - 40), 18)
         
-        pygame.display.flip()
+        renderer.end_frame()
         clock.tick(60)
 
-def multi_ai_train():
-    """Train multiple AIs simultaneously"""
+def multi_ai_train(param_server=None, viewer=DETACHED_VIEWER, resume=False, metrics_port=METRICS_PORT):
+    """Train multiple AIs simultaneously (resume=True continues the last saved session)"""
+    # A detached viewer draws the training in its own process; this one runs headless
+    viewer_link = None
+    if viewer:
+        from game.viewer import ViewerLink
+        from game.environment import enable_headless
+        viewer_link = ViewerLink('multi')
+        viewer_link.start()
+        enable_headless()
+    
     pygame.init()
     
     print("Starting Multi-AI Training for Flappy Bird...")
     print("Training 4 AIs simultaneously for faster strategy discovery!")
     print("Press 'Q' to quit, 'S' to save, 'R' to reset, 'D' for debug info, 'K' for manual knowledge sharing.")
     
-    trainer = MultiAITrainer(num_ais=4)
+    trainer = MultiAITrainer(num_ais=4, param_server=param_server, viewer_link=viewer_link)
+    if resume:
+        trainer.resume_session()
+    from ai.metrics import serve_training_metrics
+    trainer.metrics, metrics_server = serve_training_metrics('multi', metrics_port)
     
     try:
         while True:
@@ -319,6 +595,9 @@ def multi_ai_train():
             # Save progress every 100 generations
             if trainer.generation % 100 == 0:
                 trainer.save_all_ais()
+                trainer.save_session()
+                if trainer.metrics is not None:
+                    trainer.metrics.lap('checkpoint')
                 print(f"✅ Saved progress! Generation {trainer.generation}, High score: {trainer.high_score}")
     
     except Exception as e:
@@ -330,8 +609,26 @@ def multi_ai_train():
         print(f"High score achieved: {trainer.high_score}")
         print(f"Best AI: {trainer.best_ai_index + 1}")
         trainer.save_all_ais()
+        trainer.save_session()
+        if trainer.transition_log is not None:
+            trainer.transition_log.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if viewer_link is not None:
+            viewer_link.stop()
         pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
-    multi_ai_train() 
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Train multiple Flappy Bird AIs simultaneously")
+    parser.add_argument('--param-server', default=None, metavar='HOST:PORT',
+                        help="Share knowledge through a parameter server (python -m ai.param_server)")
+    parser.add_argument('--viewer', action='store_true', default=DETACHED_VIEWER,
+                        help="Draw training in a separate viewer process so rendering never slows training")
+    parser.add_argument('--resume', action='store_true', help="Continue the last saved training session")
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT,
+                        help=f"Serve live training metrics at http://{METRICS_HOST}:PORT/metrics (and /metrics.json)")
+    args = parser.parse_args()
+    multi_ai_train(param_server=args.param_server, viewer=args.viewer, resume=args.resume,
+                   metrics_port=args.metrics_port) 
\ No newline at end of file
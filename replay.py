@@ -0,0 +1,115 @@
+import argparse
+import sys
+import pygame
+from config.config import *
+from game.recording import read_episodes
+
+
+def select_episode(episodes, args):
+    if args.best:
+        best = [episode for episode in episodes if episode.is_new_best]
+        return best[-1] if best else max(episodes, key=lambda episode: episode.score)
+    if args.generation is not None:
+        for episode in reversed(episodes):
+            if episode.generation == args.generation:
+                return episode
+        return None
+    if 0 <= args.index < len(episodes) or -len(episodes) <= args.index < 0:
+        return episodes[args.index]
+    return None
+
+
+def list_episodes(episodes):
+    print(f"{'#':>6} {'generation':>10} {'score':>6} {'frames':>7}  flags")
+    for episode in episodes:
+        flags = []
+        if episode.is_new_best:
+            flags.append('best')
+        if episode.truncated:
+            flags.append('truncated')
+        print(f"{episode.index:>6} {episode.generation:>10} {episode.score:>6} {len(episode.actions):>7}  {','.join(flags)}")
+
+
+def replay(episode, fps=60):
+    """Re-simulate a recorded episode and draw it, returns the replayed score (None if stopped early)"""
+    from game.environment import FlappyEnv
+    from game.main import clock
+    from game.renderer import FrameRenderer
+    env = FlappyEnv()
+    env.reset(episode.seed)
+    renderer = FrameRenderer()
+    paused = False
+    frame = 0
+    while frame < len(episode.actions):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return None
+            elif event.type == pygame.KEYDOWN:
+                if event.key in (pygame.K_q, pygame.K_ESCAPE):
+                    return None
+                elif event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_UP:
+                    fps = min(fps * 2, 960)
+                elif event.key == pygame.K_DOWN:
+                    fps = max(fps // 2, 15)
+        if paused:
+            clock.tick(30)
+            continue
+        action = episode.actions[frame]
+        env.step(action)
+        frame += 1
+        renderer.begin_frame()
+        for pipe in env.pipes:
+            renderer.draw_pipe(pipe)
+        renderer.draw_bird(env.bird)
+        renderer.text(f"Score: {env.score}/{episode.score}", (10, 10))
+        renderer.text(f"Generation: {episode.generation}", (10, 35))
+        renderer.text(f"Frame: {frame}/{len(episode.actions)}", (10, 60))
+        renderer.text(f"Action: {'FLAP' if action == 1 else 'WAIT'}", (SCREEN_WIDTH - 150, 10), 24,
+                      (255, 0, 0) if action == 1 else (0, 0, 255))
+        renderer.text("SPACE: Pause | UP/DOWN: Speed | Q: Quit", (10, SCREEN_HEIGHT - 40))
+        renderer.end_frame()
+        clock.tick(fps)
+    return env.score
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay episodes recorded during continuous training")
+    parser.add_argument('log', nargs='?', default=EPISODE_LOG_FILE)
+    parser.add_argument('--list', action='store_true', help="List the recorded episodes and exit")
+    parser.add_argument('--index', type=int, default=-1, help="Episode number in the log (default: the last one)")
+    parser.add_argument('--generation', type=int, default=None, help="Replay the episode of this generation")
+    parser.add_argument('--best', action='store_true', help="Replay the most recent new-best episode")
+    parser.add_argument('--fps', type=int, default=60)
+    args = parser.parse_args()
+
+    try:
+        episodes = list(read_episodes(args.log))
+    except FileNotFoundError:
+        print(f"No episode log at {args.log} (set RECORD_EPISODES = True and run continuous_train.py)")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Cannot replay {args.log}: {e}")
+        sys.exit(1)
+    if not episodes:
+        print(f"{args.log} holds no episodes")
+        sys.exit(1)
+    if args.list:
+        list_episodes(episodes)
+        return
+
+    episode = select_episode(episodes, args)
+    if episode is None:
+        print("No matching episode")
+        sys.exit(1)
+    pygame.init()
+    print(f"Replaying episode {episode.index}: generation {episode.generation}, score {episode.score}, {len(episode.actions)} frames")
+    score = replay(episode, args.fps)
+    if score is not None and score != episode.score:
+        print(f"Warning: replay ended with score {score}, the log recorded {episode.score}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
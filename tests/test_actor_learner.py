@@ -0,0 +1,59 @@
+from config.config import *
+
+def check_policy_snapshot():
+    """A reader attached by name sees the learner's table and epsilon, at the learner's capacity"""
+    from ai.actor_learner import PolicySnapshot
+    learner = PolicySnapshot(max_states=4)
+    actor = PolicySnapshot(name=learner.name)
+    try:
+        assert actor.max_states == 4
+        assert actor.read(0) is None  # Nothing published yet
+        q_table = {5: [0.25, -1.5], 3: [1e-9, 2.0], 9: [-3.0, 3.0]}
+        sequence = learner.publish(q_table, 0.125)
+        assert sequence == 2
+        assert actor.read(0) == (sequence, q_table, 0.125)
+        assert actor.read(sequence) is None
+        # A table past the capacity is cut to its first max_states states
+        q_table.update({1: [1.0, 1.0], 2: [2.0, 2.0]})
+        sequence = learner.publish(q_table, 0.0625)
+        read_sequence, read_table, epsilon = actor.read(2)
+        assert (read_sequence, epsilon) == (sequence, 0.0625) and learner.overflowed
+        assert read_table == dict(list(q_table.items())[:4])
+    finally:
+        actor.close()
+        learner.close()
+
+def check_transition_ring():
+    """Rows come out in order across the wrap-around, and a full ring refuses to overwrite"""
+    import threading
+    from ai.actor_learner import TransitionRing
+    ring = TransitionRing(capacity=3)
+    reader = TransitionRing(name=ring.name, capacity=3)
+    try:
+        written = []
+        for i in range(5):
+            written.append((i, i % 2, i * 0.5, i + 1, i == 4))
+            assert ring.write(*written[-1])
+            if i == 1:
+                assert [tuple(row) for row in reader.read()] == written[:2]
+        assert [tuple(row) for row in reader.read(max_rows=2)] == written[2:4]
+        stop = threading.Event()
+        stop.set()
+        assert ring.write(5, 0, 0.0, 6, False, stop)  # Two free rows
+        assert ring.write(6, 0, 0.0, 7, False, stop)
+        assert not ring.write(7, 0, 0.0, 8, False, stop)  # Full: gives up once stop is set
+        assert [row['state'] for row in reader.read()] == [4, 5, 6]
+    finally:
+        reader.close()
+        ring.close()
+
+def test_policy_snapshot():
+    check_policy_snapshot()
+
+def test_transition_ring():
+    check_transition_ring()
+
+if __name__ == "__main__":
+    test_policy_snapshot()
+    test_transition_ring()
+    print("Policy snapshot and transition ring OK")
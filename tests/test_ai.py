@@ -1,15 +1,143 @@
-import pygame
-import sys
-from ai.ai_agent import FlappyBirdAI
-from game.reward_system import RewardSystem
-from game.main import Bird, Pipe, screen, clock, draw_ground
+import os
+import random
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
 from config.config import *
 
-def test_trained_ai():
-    """Test the trained AI playing the game"""
-    ai = FlappyBirdAI(epsilon=0.0)  # No exploration, only exploitation
+@contextmanager
+def fixed_game_state(seed=SCENARIO_SEED):
+    """Empty pipe heatmap, no adaptive gap offset and a seeded `random` for the duration.
+
+    Both game globals are loaded from data/ and change as the trainers run, and
+    they steer get_smart_action and the rewards; the previous values are put back.
+    """
+    from game.environment import enable_headless
+    enable_headless()
+    import game.main as main
+    saved = main.GLOBAL_PIPE_HEATMAP, main.ADAPTIVE_GAP_OFFSET, random.getstate()
+    main.GLOBAL_PIPE_HEATMAP = {'top': [0] * SCREEN_HEIGHT, 'bottom': [0] * SCREEN_HEIGHT}
+    main.ADAPTIVE_GAP_OFFSET = 0
+    random.seed(seed)
+    try:
+        yield
+    finally:
+        main.GLOBAL_PIPE_HEATMAP, main.ADAPTIVE_GAP_OFFSET, state = saved
+        random.setstate(state)
+
+def train_scenario_table(filename, episodes=SCENARIO_TRAIN_EPISODES, seed=SCENARIO_SEED, max_steps=SCENARIO_MAX_STEPS):
+    """Train a Q-table on seeded episodes the way continuous training does (smart actions, one
+    update per frame) and save it to `filename`. Returns the number of states."""
+    from game.environment import enable_headless
+    enable_headless()
+    from ai.ai_agent import FlappyBirdAI
+    from game.environment import FlappyEnv
+    from game.reward_system import RewardSystem
+    ai = FlappyBirdAI(max_states=None, track_coverage=False, neighbor_backoff=False)
+    reward_system = RewardSystem()
+    env = FlappyEnv(record_collisions=False)
+    for episode in range(episodes):
+        env.reset(seed + 1 + episode)  # Never the scenario's own pipes
+        reward_system.reset()
+        state = ai.get_state(env.bird, env.pipes)
+        game_over = False
+        while not game_over and env.steps < max_steps:
+            action = ai.get_smart_action(state, env.bird, env.pipes)
+            game_over = env.step(action)
+            next_state = ai.get_state(env.bird, env.pipes)
+            reward = reward_system.calculate_reward(env.bird, env.pipes, env.score, game_over, action)
+            ai.update_q_table(state, action, reward, next_state, game_over)
+            state = next_state
+        ai.end_episode()
+    ai.save_q_table(filename)
+    return len(ai.q_table)
+
+def run_trained_ai(seed=SCENARIO_SEED, max_steps=SCENARIO_MAX_STEPS, policy='smart', q_table_file=Q_TABLE_FILE):
+    """Play one seeded episode with the trained AI as fast as possible, without a window.
+    
+    policy is 'smart' (get_smart_action, as the trainers play), 'greedy'
+    (get_action on the Q-table alone) or 'planner' (ai/planner.py). Returns the outcome ('crash' or 'step limit'), score, steps, total reward,
+    steps per second and a checksum of the actions taken.
+    """
+    from game.environment import enable_headless
+    enable_headless()
+    from ai.ai_agent import create_agent
+    from game.environment import FlappyEnv
+    from game.reward_system import RewardSystem
+    ai = create_agent(epsilon=0.0)  # No exploration, only exploitation
+    ai.load_q_table(q_table_file)
+    reward_system = RewardSystem()
+    if policy == 'planner':
+        from ai.planner import LookaheadPlanner
+        choose = LookaheadPlanner(ai).get_action
+    elif policy == 'greedy':
+        choose = lambda state, bird, pipes: ai.get_action(state)
+    else:
+        choose = ai.get_smart_action
+    env = FlappyEnv(record_collisions=False)  # Leaves the pipe heatmap alone, so reruns see the same rewards
+    env.reset(seed)
+    actions = bytearray()
+    total_reward = 0.0
+    game_over = False
+    start = time.perf_counter()
+    while not game_over and env.steps < max_steps:
+        state = ai.get_state(env.bird, env.pipes)
+        action = choose(state, env.bird, env.pipes)
+        game_over = env.step(action)
+        total_reward += reward_system.calculate_reward(env.bird, env.pipes, env.score, game_over, action)
+        actions.append(int(action))
+    elapsed = time.perf_counter() - start
+    return {
+        'outcome': 'crash' if game_over else 'step limit',
+        'score': env.score,
+        'steps': env.steps,
+        'total_reward': total_reward,
+        'steps_per_second': env.steps / elapsed if elapsed > 0 else float('inf'),
+        'actions_crc': zlib.crc32(actions),
+    }
+
+def check_trained_ai(seed=SCENARIO_SEED, max_steps=SCENARIO_MAX_STEPS, policy='smart', min_score=0,
+                     q_table_file=Q_TABLE_FILE):
+    """Trained-AI playthrough scenario: the same seed must replay the same episode"""
+    first = run_trained_ai(seed, max_steps, policy, q_table_file)
+    second = run_trained_ai(seed, max_steps, policy, q_table_file)
+    for key in ('outcome', 'score', 'steps', 'total_reward', 'actions_crc'):
+        assert first[key] == second[key], f"Seed {seed} is not reproducible: {key} {first[key]} != {second[key]}"
+    assert first['steps'] <= max_steps
+    assert (first['outcome'] == 'step limit') == (first['steps'] == max_steps)
+    assert first['score'] >= min_score, f"Score {first['score']} is below the expected {min_score}"
+    return first
+
+def test_trained_ai_scenario():
+    # Outcome, score and steps of each policy over the scenario's pipes with the seeded table; any
+    # change to the physics, the state encoding, the learning rule or a policy shows up here
+    expected = {
+        'smart': ('crash', 3, 506),
+        'greedy': ('crash', 0, 27),
+        'planner': ('step limit', 22, 3000),
+    }
+    with tempfile.TemporaryDirectory() as directory, fixed_game_state():
+        filename = os.path.join(directory, 'q_table.json')
+        assert train_scenario_table(filename) == 16110
+        for policy, (outcome, score, steps) in expected.items():
+            result = check_trained_ai(max_steps=3000, policy=policy, min_score=score, q_table_file=filename)
+            assert (result['outcome'], result['score'], result['steps']) == (outcome, score, steps), (policy, result)
+
+def watch_trained_ai(use_planner=USE_LOOKAHEAD_PLANNER):
+    """Watch the trained AI play in a window (the --interactive mode)"""
+    import pygame
+    import sys
+    from ai.ai_agent import create_agent
+    from game.reward_system import RewardSystem
+    from game.main import Bird, Pipe, screen, clock, draw_ground
+    ai = create_agent(epsilon=0.0)  # No exploration, only exploitation
     ai.load_q_table()
     reward_system = RewardSystem()
+    planner = None
+    if use_planner:
+        from ai.planner import LookaheadPlanner
+        planner = LookaheadPlanner(ai)
     
     print("Testing trained AI...")
     print("Press SPACE to start, ESC to quit")
@@ -47,7 +175,10 @@ def test_trained_ai():
         
         # Get AI action
         state = ai.get_state(bird, pipes)
-        action = ai.get_action(state)
+        if planner is not None:
+            action = planner.get_action(state, bird, pipes)
+        else:
+            action = ai.get_action(state)
         
         # Apply action
         if action == 1:  # Flap
@@ -101,5 +232,22 @@ def test_trained_ai():
     sys.exit()
 
 if __name__ == "__main__":
-    pygame.init()
-    test_trained_ai() 
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Trained-AI playthrough: a seeded headless check, or watch it play")
+    parser.add_argument('--planner', action='store_true', default=USE_LOOKAHEAD_PLANNER,
+                        help="Act with the lookahead planner")
+    parser.add_argument('--greedy', action='store_true',
+                        help="Headless: act on the Q-table alone instead of get_smart_action (the interactive default)")
+    parser.add_argument('--interactive', action='store_true', help="Watch the AI play in a window at 60 FPS")
+    parser.add_argument('--seed', type=int, default=SCENARIO_SEED)
+    parser.add_argument('--max-steps', type=int, default=SCENARIO_MAX_STEPS)
+    parser.add_argument('--min-score', type=int, default=0, help="Fail if the AI scores less than this")
+    args = parser.parse_args()
+    if args.interactive:
+        import pygame
+        pygame.init()
+        watch_trained_ai(use_planner=args.planner)
+    policy = 'planner' if args.planner else 'greedy' if args.greedy else 'smart'
+    result = check_trained_ai(args.seed, args.max_steps, policy, args.min_score)
+    print(f"trained AI, {policy} policy (seed {args.seed}): {result['outcome']} after {result['steps']} steps, "
+          f"score {result['score']}, reward {result['total_reward']:.1f}, {result['steps_per_second']:.0f} steps/s")
@@ -0,0 +1,85 @@
+import numpy as np
+from config.config import *
+
+def make_ai(q_table=None):
+    from ai.ai_agent import FlappyBirdAI
+    ai = FlappyBirdAI(learning_rate=0.5, discount_factor=0.9, epsilon=0.0, max_states=None,
+                      track_coverage=False, neighbor_backoff=False)
+    ai.q_table = ai.new_q_table({state: list(q_values) for state, q_values in (q_table or {}).items()})
+    return ai
+
+def check_distinct_pairs():
+    """One transition per (state, action): the batch is the sequential updates, terminal ones included"""
+    table = {1: [1.0, 2.0], 2: [-1.0, 0.5], 10: [3.0, 4.0], 11: [0.0, -2.0]}
+    batch = [(1, 0, 1.0, 10, False), (1, 1, -1.0, 11, False), (2, 1, 0.5, 10, True), (3, 0, 2.0, 12, False)]
+    sequential = make_ai(table)
+    for transition in batch:
+        sequential.update_q_table(*transition)
+    batched = make_ai(table)
+    batched.update_batch(*zip(*batch))
+    assert batched.q_table.keys() == sequential.q_table.keys()
+    for state, q_values in sequential.q_table.items():
+        assert np.allclose(batched.q_table[state], q_values), (state, batched.q_table[state], q_values)
+    # 1 -> 10 bootstraps 0.9 * 4, the crash from 2 only gets its reward, unseen 3 and 12 start at 0
+    assert np.allclose(batched.q_table[1], [1.0 + 0.5 * (1.0 + 0.9 * 4.0 - 1.0), 2.0 + 0.5 * (-1.0 + 0.0 - 2.0)])
+    assert np.allclose(batched.q_table[2], [-1.0, 0.5 + 0.5 * (0.5 - 0.5)])
+    assert np.allclose(batched.q_table[3], [0.5 * 2.0, 0.0])
+    assert batched.total_updates == sequential.total_updates == len(batch)
+    assert batched.max_q_value == sequential.max_q_value and batched.min_q_value == sequential.min_q_value
+
+def check_duplicates():
+    """n transitions of one pair move it 1 - (1 - lr)**n of the way to their mean target"""
+    table = {1: [2.0, 0.0], 10: [4.0, 6.0]}
+    batch = [(1, 0, 1.0, 10, False)] * 3
+    sequential = make_ai(table)
+    for transition in batch:
+        sequential.update_q_table(*transition)
+    batched = make_ai(table)
+    batched.update_batch(*zip(*batch))
+    target = 1.0 + 0.9 * 6.0
+    assert np.allclose(batched.q_table[1], sequential.q_table[1])
+    assert np.allclose(batched.q_table[1], [2.0 + (1 - 0.5 ** 3) * (target - 2.0), 0.0])
+
+    # Different targets: the mean target, not the sum of three steps
+    batch = [(1, 1, 1.0, 10, False), (1, 1, 3.0, 10, True), (1, 1, -1.0, 11, False)]
+    batched = make_ai(table)
+    batched.update_batch(*zip(*batch))
+    mean_target = ((1.0 + 0.9 * 6.0) + 3.0 + (-1.0 + 0.0)) / 3
+    assert np.allclose(batched.q_table[1], [2.0, (1 - 0.5 ** 3) * mean_target])
+
+def check_pre_batch_targets():
+    """Targets read the table as it was before the batch, even for states the batch updates"""
+    table = {1: [0.0, 0.0], 2: [1.0, 0.0]}
+    batched = make_ai(table)
+    batched.update_batch([2, 1], [0, 0], [3.0, 0.0], [5, 2], [False, False])
+    # 2 moves to 1 + 0.5 * (3 - 1) = 2 first, but 1 still bootstraps from its old max of 1
+    assert np.allclose(batched.q_table[2], [2.0, 0.0])
+    assert np.allclose(batched.q_table[1], [0.5 * 0.9 * 1.0, 0.0])
+    sequential = make_ai(table)
+    sequential.update_q_table(2, 0, 3.0, 5)
+    sequential.update_q_table(1, 0, 0.0, 2)
+    assert np.allclose(sequential.q_table[1], [0.5 * 0.9 * 2.0, 0.0])
+
+def check_batch_reads():
+    """q_values_batch and the tie rule of get_actions"""
+    ai = make_ai({1: [1.0, 1.0], 2: [0.0, 2.0], 3: [5.0, -5.0]})
+    states = np.array([3, 1, 4, 2, 1])
+    assert np.array_equal(ai.q_values_batch(states),
+                          [[5.0, -5.0], [1.0, 1.0], [0.0, 0.0], [0.0, 2.0], [1.0, 1.0]])
+    actions = ai.get_actions(states)
+    assert actions.tolist() == [0, 0, 0, 1, 0]  # Ties (the seen 1 and the unseen 4) wait
+    assert actions.tolist() == [ai.get_action(state) for state in states.tolist()]
+    assert ai.exploration_count == 0 and ai.exploitation_count == 2 * len(states)
+
+def test_batch_matches_sequential():
+    check_distinct_pairs()
+    check_duplicates()
+    check_pre_batch_targets()
+
+def test_batch_reads():
+    check_batch_reads()
+
+if __name__ == "__main__":
+    test_batch_matches_sequential()
+    test_batch_reads()
+    print("Batch updates match the sequential ones")
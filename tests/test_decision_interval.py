@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+from config.config import *
+
+def make_ai():
+    """Tabular agent with learning rate 1 (a Q-value becomes its target) reading states off the bird"""
+    from ai.ai_agent import FlappyBirdAI
+
+    class StateOnBird(FlappyBirdAI):
+        def get_state(self, bird, pipes):
+            return bird.state
+
+    ai = StateOnBird(learning_rate=1.0, discount_factor=0.5, epsilon=0.0, max_states=None,
+                     track_coverage=False, neighbor_backoff=False)
+    ai.q_table = ai.new_q_table({10: [0.0, 0.0], 11: [8.0, 16.0], 12: [2.0, 0.0]})
+    return ai
+
+def play(decisions, states, rewards, crash_on=None):
+    """Feed one frame per reward; the bird is in states[i] after frame i. Returns the actions and step results."""
+    actions, ended = [], []
+    for frame, (state, reward) in enumerate(zip(states, rewards)):
+        actions.append(decisions.act(None, [], lambda state, bird, pipes: 1))
+        ended.append(decisions.step(SimpleNamespace(state=state), [], reward, frame == crash_on))
+    return actions, ended
+
+def check_decision_interval():
+    from ai.decision_interval import DecisionInterval
+    ai = make_ai()
+    decisions = DecisionInterval(ai, interval=3, adaptive=False)
+
+    # Three frames make one transition: 1 + 0.5 * 2 + 0.25 * 4, bootstrapping 0.5**3 * max Q(11)
+    decisions.start(10)
+    assert play(decisions, [99, 98, 11], [1.0, 2.0, 4.0]) == ([1, 0, 0], [False, False, True])
+    assert ai.q_table[10] == [0.0, 3.0 + 0.125 * 16.0]
+    assert ai.total_updates == 1 and decisions.state == 11
+
+    # Cut short by the episode budget after two frames: still bootstraps, with 0.5**2
+    assert play(decisions, [97, 12], [1.0, 2.0]) == ([1, 0], [False, False])
+    decisions.flush(SimpleNamespace(state=12), [])
+    assert ai.q_table[11] == [8.0, 1.0 + 0.5 * 2.0 + 0.25 * 2.0]
+    assert ai.total_updates == 2 and decisions.state == 12 and decisions.frames == 0
+    decisions.flush(SimpleNamespace(state=12), [])  # Nothing pending: no update
+    assert ai.total_updates == 2
+
+    # A crash ends the decision early and does not bootstrap
+    assert play(decisions, [96, 11], [1.0, -10.0], crash_on=1) == ([1, 0], [False, True])
+    assert ai.q_table[12] == [2.0, 1.0 + 0.5 * -10.0]
+
+    # Adaptive decisions also end on the first frame the state changes
+    decisions = DecisionInterval(ai, interval=3, adaptive=True)
+    decisions.start(10)
+    assert play(decisions, [10, 11], [1.0, 1.0]) == ([1, 0], [False, True])
+    assert ai.q_table[10][1] == 1.0 + 0.5 * 1.0 + 0.25 * 8.0  # Q(11) is [8, 2.5] by now
+
+def test_decision_interval():
+    check_decision_interval()
+
+if __name__ == "__main__":
+    test_decision_interval()
+    print("Multi-frame decisions OK")
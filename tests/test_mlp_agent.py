@@ -0,0 +1,77 @@
+import os
+import tempfile
+import numpy as np
+from config.config import *
+
+def make_agent(hidden_sizes=(8, 8), **kwargs):
+    from ai.mlp_agent import MLPQAgent
+    ai = MLPQAgent(epsilon=0.0, hidden_sizes=hidden_sizes, **kwargs)
+    ai.rng = np.random.default_rng(3)
+    ai.reset_parameters()
+    ai.target_params = [p.copy() for p in ai.params]
+    return ai
+
+def some_states(ai, count=6):
+    rng = np.random.default_rng(0)
+    return [ai.encoder.pack([int(rng.integers(field.min_value, field.max_value + 1)) for field in ai.encoder.fields])
+            for _ in range(count)]
+
+def check_values_and_parameters(directory):
+    """q_values agrees with q_values_batch, parameters survive a checkpoint, wrong shapes are refused"""
+    ai = make_agent()
+    states = some_states(ai)
+    batch = ai.q_values_batch(np.array(states))
+    assert np.allclose([ai.q_values(state) for state in states], batch)
+    assert ai.q_table.get(states[0]) == ai.q_values(states[0])
+    assert ai.get_learning_stats()['parameter_count'] == 5 * 8 + 8 + 8 * 8 + 8 + 8 * 2 + 2
+
+    filename = os.path.join(directory, 'q_table.json')
+    ai.save_q_table(filename)
+    assert os.path.exists(os.path.join(directory, 'q_table.mlp.npz'))
+    restored = make_agent()
+    restored.rng = np.random.default_rng(4)
+    restored.reset_parameters()
+    restored.load_q_table(filename)
+    assert np.array_equal(restored.q_values_batch(np.array(states)), batch)
+    try:
+        make_agent(hidden_sizes=(4, 8)).set_parameters(ai.get_parameters())
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Parameters of another network shape were accepted")
+
+def check_training():
+    """Replaying one crash transition drives its Q-value to the reward; the batch schedule matches"""
+    ai = make_agent(batch_size=4, warmup=4, train_every=1, target_sync_every=10)
+    state = some_states(ai, 1)[0]
+    for _ in range(4):
+        ai.update_q_table(state, 1, 2.0, state, done=True)
+    before = abs(ai.q_values(state)[1] - 2.0)
+    for _ in range(300):
+        ai.update_q_table(state, 1, 2.0, state, done=True)
+    assert ai.train_steps == 301
+    assert abs(ai.q_values(state)[1] - 2.0) < 0.05 < before
+    assert ai.total_updates == 304
+
+    # update_batch takes the gradient steps the same transitions one by one would have
+    states = some_states(ai, 10)
+    sequential = make_agent(batch_size=4, warmup=6, train_every=3)
+    batched = make_agent(batch_size=4, warmup=6, train_every=3)
+    for i, state in enumerate(states):
+        sequential.update_q_table(state, i % 2, 1.0, states[(i + 1) % 10], i == 9)
+    batched.update_batch(states[:4], [0, 1, 0, 1], [1.0] * 4, states[1:5], [False] * 4)
+    batched.update_batch(states[4:], [0, 1, 0, 1, 0, 1], [1.0] * 6, states[5:] + states[:1], [False] * 5 + [True])
+    assert batched.train_steps == sequential.train_steps == 2  # At write positions 6 and 9
+    assert batched.replay.size == sequential.replay.size == 10
+    assert np.array_equal(batched.replay.states, sequential.replay.states)
+    assert np.array_equal(batched.replay.dones, sequential.replay.dones)
+    assert batched.total_updates == sequential.total_updates == 10
+
+def test_mlp_agent():
+    with tempfile.TemporaryDirectory() as directory:
+        check_values_and_parameters(directory)
+    check_training()
+
+if __name__ == "__main__":
+    test_mlp_agent()
+    print("MLP agent OK")
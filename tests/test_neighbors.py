@@ -0,0 +1,63 @@
+from config.config import *
+
+class CountingCells(dict):
+    """Cell dict that counts the lookups estimate() makes"""
+    lookups = 0
+
+    def get(self, *args):
+        self.lookups += 1
+        return super().get(*args)
+
+def check_estimate():
+    from ai.neighbors import NeighborIndex
+    from ai.state_encoder import STATE_ENCODER
+    fields = STATE_ENCODER.fields
+    # A state on the low edge of its cell along every field (cells are 2 buckets wide)
+    base = [field.min_value + 2 * (field.radix // 4) for field in fields]
+
+    def state(*deltas):
+        return STATE_ENCODER.pack([value + delta for value, delta in zip(base, deltas)])
+
+    def index_of(q_table):
+        index = NeighborIndex(STATE_ENCODER, k=2, cell_size=2)
+        index.rebuild(q_table)
+        index.cells = CountingCells(index.cells)
+        return index
+
+    # Two states at distance 1 in the state's own cell: no further cell can hold a nearer one, so the
+    # scan stops after that cell and the equally near state one cell below is left out
+    q_table = {state(1, 0, 0, 0, 0): [1.0, 3.0], state(0, 1, 0, 0, 0): [3.0, 5.0], state(0, 0, -1, 0, 0): [90.0, 90.0]}
+    index = index_of(q_table)
+    assert index.estimate(state(0, 0, 0, 0, 0), q_table) == [2.0, 4.0]
+    assert index.cells.lookups == 1
+
+    # Fewer than k states around: all 3**5 cells are scanned, weights are 1 / squared distance
+    q_table = {state(1, 0, 0, 0, 0): [2.0, 0.0], state(0, 0, 0, 2, 0): [0.0, 4.0]}
+    index = index_of(q_table)
+    assert index.estimate(state(0, 0, 0, 0, 0), q_table) == [2.0 / 1.25, 1.0 / 1.25]
+    del q_table[state(1, 0, 0, 0, 0)]
+    index = index_of(q_table)
+    assert index.estimate(state(0, 0, 0, 0, 0), q_table) == [0.0, 4.0]
+    assert index.cells.lookups == 3 ** len(fields)
+
+    # Nothing within the neighbouring cells, or only states evicted since: None, and the agent falls back to [0, 0]
+    q_table = {state(4, 0, 0, 0, 0): [5.0, 5.0]}
+    index = index_of(q_table)
+    assert index.estimate(state(0, 0, 0, 0, 0), q_table) is None
+    assert index.estimate(state(3, 0, 0, 0, 0), q_table) == [5.0, 5.0]
+    q_table.clear()
+    assert index.estimate(state(3, 0, 0, 0, 0), q_table) is None
+    assert len(index) == 0  # The evicted state was dropped from its cell
+
+    from ai.ai_agent import FlappyBirdAI
+    ai = FlappyBirdAI(max_states=None, track_coverage=False, neighbor_backoff=True)
+    assert ai.unseen_q_values(state(0, 0, 0, 0, 0)) == [0, 0]
+    ai.update_q_table(state(1, 0, 0, 0, 0), 1, 1.0, state(9, 0, 0, 0, 0), done=True)
+    assert ai.unseen_q_values(state(0, 0, 0, 0, 0)) == ai.q_table[state(1, 0, 0, 0, 0)]
+
+def test_neighbor_estimate():
+    check_estimate()
+
+if __name__ == "__main__":
+    test_neighbor_estimate()
+    print("NeighborIndex estimate OK")
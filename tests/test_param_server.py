@@ -0,0 +1,57 @@
+from config.config import *
+
+def check_two_clients(port):
+    """Pushed states come back with the server value, other pulled states are blended in"""
+    from ai.param_server import ParameterClient, RemoteTableSync
+    from ai.q_table import BoundedQTable
+    first = RemoteTableSync(ParameterClient(port=port), blend_strength=0.5)
+    second = RemoteTableSync(ParameterClient(port=port), blend_strength=0.5)
+
+    table_a = {1: [1.0, 2.0], 2: [0.0, 0.0]}
+    assert first.sync(table_a) == (2, 2)
+    assert table_a == {1: [1.0, 2.0], 2: [0.0, 0.0]}
+
+    # State 1 is new to the second client, so the server blends it: 0.5 * [1, 2] + 0.5 * [3, 4]. The
+    # second client takes that value instead of blending it into its own [3, 4] once more
+    table_b = {1: [3.0, 4.0], 3: [5.0, 5.0]}
+    assert second.sync(table_b) == (2, 3)
+    assert table_b == {1: [2.0, 3.0], 2: [0.0, 0.0], 3: [5.0, 5.0]}
+
+    # Deltas add up on the server: the first client's [+1, 0] on top of the blended [2, 3]
+    table_a[1] = [2.0, 2.0]
+    assert first.sync(table_a) == (1, 2)
+    assert table_a == {1: [3.0, 3.0], 2: [0.0, 0.0], 3: [5.0, 5.0]}
+    assert first.sync(table_a) == (0, 0)
+    table_a[3] = [7.0, 5.0]
+    assert first.sync(table_a) == (1, 1)
+
+    # The second client pushed nothing this time, so both changes are blended into its values
+    assert second.sync(table_b) == (0, 2)
+    assert table_b == {1: [2.5, 3.0], 2: [0.0, 0.0], 3: [6.0, 5.0]}
+    assert second.baseline == {state: tuple(q_values) for state, q_values in table_b.items()}
+    assert second.sync(table_b) == (0, 0)
+
+    # A bounded table evicts while the pull inserts states; its own pushed state keeps the server value
+    bounded = BoundedQTable(2, 'score', evict_fraction=0.5)
+    bounded[10] = [1.0, 1.0]
+    bounded.touch(10)
+    third = RemoteTableSync(ParameterClient(port=port), blend_strength=0.5)
+    assert third.sync(bounded) == (1, 4)
+    assert bounded.evictions > 0 and len(bounded) <= 2
+    assert bounded[10] == [1.0, 1.0]
+    assert third.sync(bounded) == (0, 0)
+    assert set(third.baseline) == set(bounded)
+
+def test_two_clients():
+    from ai.param_server import ParameterServer, SharedQTable
+    server = ParameterServer('127.0.0.1', 0, table=SharedQTable(blend_strength=0.5))
+    server.start()
+    try:
+        check_two_clients(server.server_address[1])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    test_two_clients()
+    print("Parameter server push/pull OK")
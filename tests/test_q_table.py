@@ -0,0 +1,54 @@
+import copy
+import pickle
+from config.config import *
+
+def make_bounded_table(max_states=8, policy='lru'):
+    """Small BoundedQTable past its first eviction, with visits on some states"""
+    from ai.q_table import BoundedQTable
+    table = BoundedQTable(max_states, policy, evict_fraction=0.25)
+    for state in range(12):
+        table[state] = [state * 0.5, -state * 0.25]
+        for _ in range(state % 3):
+            table.touch(state)
+    return table
+
+def check_same_table(table, restored):
+    assert type(restored) is type(table)
+    assert dict(restored) == dict(table)
+    assert restored.meta == table.meta
+    assert (restored.max_states, restored.policy, restored.evict_fraction) == \
+        (table.max_states, table.policy, table.evict_fraction)
+    assert restored.get_memory_stats()['evictions'] == table.get_memory_stats()['evictions']
+    assert restored.tick == table.tick
+
+def test_bounded_table_pickle_round_trip():
+    for policy in ('lru', 'score'):
+        table = make_bounded_table(policy=policy)
+        assert table.evictions > 0
+        for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+            check_same_table(table, pickle.loads(pickle.dumps(table, protocol=protocol)))
+        check_same_table(table, copy.deepcopy(table))
+        # The restored table keeps working: same bound, same eviction order
+        restored = pickle.loads(pickle.dumps(table))
+        table[100] = [1.0, 1.0]
+        restored[100] = [1.0, 1.0]
+        check_same_table(table, restored)
+        assert len(restored) <= restored.max_states
+
+def test_coverage_follows_evictions():
+    from ai.ai_agent import FlappyBirdAI
+    ai = FlappyBirdAI(max_states=8, track_coverage=True)
+    for state in range(40):
+        ai.update_q_table(state, state % 2, 1.0, state + 1)
+    assert ai.q_table.evictions > 0
+    assert set(ai.coverage.states) <= set(ai.q_table)
+    assert ai.coverage.total_visits == 40
+    restored = pickle.loads(pickle.dumps(ai.session_state()))
+    ai.restore_session_state(restored)
+    ai.update_q_table(100, 0, 1.0, 101)
+    assert set(ai.coverage.states) <= set(ai.q_table)
+
+if __name__ == "__main__":
+    test_bounded_table_pickle_round_trip()
+    test_coverage_follows_evictions()
+    print("BoundedQTable pickle round trip and coverage pruning OK")
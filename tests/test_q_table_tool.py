@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+from config.config import *
+
+TABLE_A = '{"1": [1.0, 2.0, 3], "2": [4.0, 0.0, 0], "3": [0.0, 1.0, 1]}'
+TABLE_B = '{"1": [3.0, 0.0, 1], "2": [0.0, 2.0, 0], "4": [5.0, 5.0, 2]}'
+
+def write(directory, name, text):
+    filename = os.path.join(directory, name)
+    with open(filename, 'w') as f:
+        f.write(text)
+    return filename
+
+def read(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+def check_merge(directory):
+    """Per-table weights, visit weights, and the plain mean where every visit count is 0"""
+    from ai.q_table_tool import merge_tables
+    tables = [write(directory, 'a.json', TABLE_A), write(directory, 'b.json', TABLE_B)]
+    output = os.path.join(directory, 'merged.json')
+    for partition_states in (1, 1000):  # Several partitions or a single one
+        assert merge_tables(tables, output, weights=[1.0, 3.0], partition_states=partition_states) == 4
+        assert read(output) == {'1': [2.5, 0.5, 4], '2': [1.0, 1.5, 0], '3': [0.0, 1.0, 1], '4': [5.0, 5.0, 2]}
+        assert merge_tables(tables, output, visit_weighted=True, partition_states=partition_states) == 4
+        assert read(output) == {'1': [1.5, 1.5, 4], '2': [2.0, 1.0, 0], '3': [0.0, 1.0, 1], '4': [5.0, 5.0, 2]}
+
+def check_diff(directory):
+    """A state saved twice (legacy tuple key and packed int) counts once, with the value loaded last"""
+    from ai.q_table_tool import diff_tables
+    from ai.state_encoder import STATE_ENCODER
+    legacy = str(STATE_ENCODER.decode(7))
+    old = write(directory, 'old.json', f'{{"{legacy}": [9.0, 9.0], "7": [1.0, 2.0], "5": [1.0, 0.0]}}')
+    new = write(directory, 'new.json', '{"7": [1.0, 3.0], "5": [0.0, 1.0], "6": [0.0, 0.0]}')
+    report = diff_tables(old, new, partition_states=1)
+    assert (report['only_old'], report['only_new'], report['common']) == (0, 1, 2)
+    assert (report['changed'], report['policy_flips']) == (2, 1)
+    assert report['mean_abs_change'] == 1.0
+    assert report['largest_changes'] == [(1.0, 7, [1.0, 2.0], [1.0, 3.0]), (1.0, 5, [1.0, 0.0], [0.0, 1.0])]
+
+def check_prune(directory):
+    from ai.q_table_tool import prune_table
+    table = write(directory, 'a.json', TABLE_A)
+    output = os.path.join(directory, 'pruned.json')
+    assert prune_table(table, output, min_visits=1) == (2, 1)
+    assert read(output) == {'1': [1.0, 2.0, 3], '3': [0.0, 1.0, 1]}
+    assert prune_table(table, output, min_visits=2, min_margin=1.0) == (1, 2)
+    assert read(output) == {'1': [1.0, 2.0, 3]}
+    # Without saved counts every state has 0 visits
+    table = write(directory, 'no_visits.json', '{"1": [1.0, 2.0], "2": [4.0, 0.0]}')
+    assert prune_table(table, output, min_visits=1) == (0, 2)
+    assert read(output) == {}
+
+def test_q_table_tool():
+    with tempfile.TemporaryDirectory() as directory:
+        check_merge(directory)
+        check_diff(directory)
+        check_prune(directory)
+
+if __name__ == "__main__":
+    test_q_table_tool()
+    print("Q-table merge, diff and prune OK")
@@ -0,0 +1,45 @@
+import os
+import tempfile
+from config.config import *
+
+def check_episode_log(directory):
+    """Episodes written by EpisodeRecorder read back unchanged; logs of another format are refused"""
+    from game.recording import (EpisodeRecorder, read_episodes, FILE_HEADER, FILE_MAGIC, FORMAT_VERSION,
+                                FLAG_NEW_BEST)
+    filename = os.path.join(directory, 'episodes.bin')
+    recorder = EpisodeRecorder(filename)
+    episodes = [(11, [0, 1, 1, 0, 0, 0, 0, 0, 1], 2, FLAG_NEW_BEST), (12, [1] * 17, 0, 0)]
+    for generation, (seed, actions, score, flags) in enumerate(episodes):
+        recorder.start(seed)
+        for action in actions:
+            recorder.record(action)
+        recorder.finish(score, generation, flags)
+    read = list(read_episodes(filename))
+    assert [(e.seed, e.actions, e.score, e.flags, e.generation) for e in read] == \
+        [(seed, actions, score, flags, i) for i, (seed, actions, score, flags) in enumerate(episodes)]
+
+    # Another format version (and an unversioned log) is rejected by the reader...
+    for header in (FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION + 1), b'\x0b\x00\x00\x00\x00\x00'):
+        with open(filename, 'r+b') as f:
+            f.write(header)
+        try:
+            list(read_episodes(filename))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"Header {header!r} was read as format {FORMAT_VERSION}")
+    # ...and moved aside by a new recorder instead of being appended to
+    recorder = EpisodeRecorder(filename)
+    assert os.path.exists(filename + '.old') and not os.path.exists(filename)
+    recorder.start(13)
+    recorder.record(1)
+    recorder.finish(0)
+    assert [e.seed for e in read_episodes(filename)] == [13]
+
+def test_episode_log():
+    with tempfile.TemporaryDirectory() as directory:
+        check_episode_log(directory)
+
+if __name__ == "__main__":
+    test_episode_log()
+    print("Episode log round trip OK")
@@ -0,0 +1,50 @@
+import os
+import tempfile
+from config.config import *
+
+def train_bounded_agent(max_states=50, episodes=5, seed=SCENARIO_SEED):
+    """FlappyBirdAI on a BoundedQTable small enough to evict, trained headless for a few episodes"""
+    from game.environment import enable_headless
+    enable_headless()
+    from ai.ai_agent import FlappyBirdAI
+    from game.environment import FlappyEnv
+    ai = FlappyBirdAI(max_states=max_states)
+    env = FlappyEnv(record_collisions=False)
+    for episode in range(episodes):
+        bird, pipes = env.reset(seed + episode)
+        state = ai.get_state(bird, pipes)
+        game_over = False
+        while not game_over and env.steps < 500:
+            action = ai.get_action(state)
+            game_over = env.step(action)
+            next_state = ai.get_state(env.bird, env.pipes)
+            ai.update_q_table(state, action, -100 if game_over else 1, next_state, game_over)
+            state = next_state
+        ai.end_episode()
+    return ai
+
+def check_bounded_session_round_trip(filename):
+    """save_session/load_session must bring back a bounded Q-table with its visits and counters"""
+    from ai.ai_agent import FlappyBirdAI
+    from ai.q_table import BoundedQTable
+    from ai.session import save_session, load_session
+    ai = train_bounded_agent()
+    assert ai.q_table.evictions > 0
+    save_session(filename, [ai], {'episode': 5, 'best_score': 3})
+    restored = FlappyBirdAI(max_states=ai.max_states)
+    trainer_state = load_session(filename, [restored])
+    assert trainer_state == {'episode': 5, 'best_score': 3}
+    assert isinstance(restored.q_table, BoundedQTable)
+    assert dict(restored.q_table) == dict(ai.q_table)
+    assert restored.q_table.meta == ai.q_table.meta
+    assert restored.q_table.evictions == ai.q_table.evictions
+    for name in ('epsilon', 'episode_count', 'total_updates'):
+        assert getattr(restored, name) == getattr(ai, name), name
+
+def test_bounded_session_round_trip():
+    with tempfile.TemporaryDirectory() as directory:
+        check_bounded_session_round_trip(os.path.join(directory, 'session_test.pkl'))
+
+if __name__ == "__main__":
+    test_bounded_session_round_trip()
+    print("Bounded Q-table session round trip OK")
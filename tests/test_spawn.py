@@ -1,10 +1,77 @@
-import pygame
-import sys
-from game.main import Bird, Pipe, screen, clock, draw_ground
+import time
 from config.config import *
 
-def test_spawn_position():
-    """Test to verify bird spawn position and show visual improvements"""
+GAP_RANGE = (50, SCREEN_HEIGHT - PIPE_GAP - GROUND_HEIGHT - 50)  # Pipe.reset's bounds on the top pipe height
+
+def run_spawn_check(seed=SCENARIO_SEED, max_steps=SCENARIO_MAX_STEPS):
+    """Check where the bird and every pipe spawn, headless and uncapped.
+    
+    The bird free-falls from its spawn point onto the ground, then a second
+    seeded episode flaps whenever the bird sinks 30 px below the gap center
+    (a flap lifts it ~100 px), which clears every gap Pipe.reset can roll,
+    so it meets new pipes until the step limit; every pipe is checked as it
+    appears. Returns the free-fall frames, the gaps spawned, the score,
+    steps and steps per second.
+    """
+    from game.environment import enable_headless
+    enable_headless()
+    from game.environment import FlappyEnv
+    env = FlappyEnv(record_collisions=False)
+    bird, pipes = env.reset(seed)
+    assert (bird.x, bird.y, bird.velocity) == (50, SCREEN_HEIGHT // 2, 0), "Bird spawned off its start point"
+    check_new_pipe(pipes[0])
+    
+    # Without flapping the bird falls straight onto the ground, long before the first pipe arrives
+    while not env.step(0):
+        assert env.steps < max_steps
+    fall_frames = env.steps
+    assert bird.get_rect().bottom > SCREEN_HEIGHT - GROUND_HEIGHT, "Free fall ended somewhere other than the ground"
+    assert env.score == 0
+    
+    bird, pipes = env.reset(seed)
+    gaps = [pipes[0].top_height]
+    start = time.perf_counter()
+    game_over = False
+    while not game_over and env.steps < max_steps:
+        score = env.score
+        game_over = env.step(1 if bird.y > pipes[0].top_height + PIPE_GAP // 2 + 30 else 0)
+        if env.score != score:  # A pipe left the screen and a new one spawned (pooled pipes are reused objects)
+            check_new_pipe(pipes[-1])
+            gaps.append(pipes[-1].top_height)
+    elapsed = time.perf_counter() - start
+    assert not game_over, f"The scripted flyer crashed after {env.steps} steps"
+    assert env.score == len(gaps) - 1, "Score doesn't match the pipes passed"
+    return {
+        'fall_frames': fall_frames,
+        'gaps': gaps,
+        'score': env.score,
+        'steps': env.steps,
+        'steps_per_second': env.steps / elapsed if elapsed > 0 else float('inf'),
+    }
+
+def check_new_pipe(pipe):
+    # Pipes spawned during a step only move from the next step on
+    assert pipe.x == SCREEN_WIDTH + 200, f"Pipe spawned at x={pipe.x}"
+    assert GAP_RANGE[0] <= pipe.top_height <= GAP_RANGE[1], f"Gap top {pipe.top_height} is outside {GAP_RANGE}"
+    assert pipe.top_height + PIPE_GAP + pipe.bottom_height + GROUND_HEIGHT == SCREEN_HEIGHT
+
+def check_spawn(seed=SCENARIO_SEED, max_steps=SCENARIO_MAX_STEPS):
+    """Spawn-position scenario: checks every spawn and that the same seed replays the same pipes"""
+    first = run_spawn_check(seed, max_steps)
+    second = run_spawn_check(seed, max_steps)
+    for key in ('fall_frames', 'gaps', 'score', 'steps'):
+        assert first[key] == second[key], f"Seed {seed} is not reproducible: {key} differs"
+    assert first['gaps'] != run_spawn_check(seed + 1, max_steps)['gaps'], "Different seeds spawned the same pipes"
+    return first
+
+def test_spawn_scenario():
+    check_spawn(max_steps=5000)
+
+def play_spawn_position():
+    """Fly the bird by hand to inspect spawn positions and the debug overlays (the --interactive mode)"""
+    import pygame
+    import sys
+    from game.main import Bird, Pipe, screen, clock, draw_ground
     pygame.init()    
     print("Testing bird spawn position and visual improvements...")
     print("Press SPACE to flap, ESC to quit")
@@ -85,4 +152,14 @@ def test_spawn_position():
     sys.exit()
 
 if __name__ == "__main__":
-    test_spawn_position() 
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Spawn-position check: seeded and headless, or fly the bird by hand")
+    parser.add_argument('--interactive', action='store_true', help="Open the window and flap with SPACE")
+    parser.add_argument('--seed', type=int, default=SCENARIO_SEED)
+    parser.add_argument('--max-steps', type=int, default=SCENARIO_MAX_STEPS)
+    args = parser.parse_args()
+    if args.interactive:
+        play_spawn_position()
+    result = check_spawn(args.seed, args.max_steps)
+    print(f"spawn (seed {args.seed}): bird fell for {result['fall_frames']} frames, {len(result['gaps'])} pipes spawned, "
+          f"score {result['score']} in {result['steps']} steps, {result['steps_per_second']:.0f} steps/s") 
\ No newline at end of file
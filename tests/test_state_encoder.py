@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+import numpy as np
+from config.config import *
+
+def random_pixels(encoder, rng, count):
+    """Raw bird y, velocity, pipe x and gap centre values, some of them past every field's range"""
+    bird_y, velocity, pipe_x, gap_y, _ = encoder.fields
+    spread = lambda field: rng.uniform(field.low - 60, field.high + 60, count)
+    gap_centers = np.floor(spread(gap_y))  # Integer pipe heights plus PIPE_GAP // 2
+    return spread(bird_y), spread(velocity), spread(pipe_x), gap_centers
+
+def check_round_trip(encoder, rng):
+    """decode inverts pack on in-range fields, and pack inverts decode on every key"""
+    for _ in range(500):
+        values = tuple(int(rng.integers(field.min_value, field.max_value + 1)) for field in encoder.fields)
+        key = encoder.pack(values)
+        assert 0 <= key < encoder.num_keys
+        assert encoder.decode(key) == values
+        assert encoder.parse_key(str(key)) == key
+    keys = rng.integers(0, encoder.num_keys, 500)
+    for key in keys.tolist():
+        assert encoder.pack(encoder.decode(key)) == key
+    assert np.array_equal(encoder.decode_batch(keys), [encoder.decode(key) for key in keys.tolist()])
+
+def check_batch_agreement(encoder, rng):
+    """encode_batch gives the keys encode gives frame by frame"""
+    bird_ys, velocities, pipe_xs, gap_centers = random_pixels(encoder, rng, 500)
+    keys = encoder.encode_batch(bird_ys, velocities, pipe_xs, gap_centers)
+    for key, bird_y, velocity, pipe_x, gap_center in zip(keys.tolist(), bird_ys, velocities, pipe_xs, gap_centers):
+        bird = SimpleNamespace(y=bird_y, velocity=velocity)
+        pipe = SimpleNamespace(x=pipe_x, top_height=int(gap_center) - PIPE_GAP // 2)
+        assert encoder.encode(bird, [pipe]) == key
+    assert encoder.encode(SimpleNamespace(y=100.0, velocity=0.0), []) == encoder.empty_key
+
+def check_clamping(encoder):
+    """Pixels past a field's range take its edge bucket, in the lookups and in pack"""
+    from ai.state_encoder import FIELD_NAMES
+    for name, field in zip(FIELD_NAMES, encoder.fields):
+        edges = {field.low - 1000: field.min_value, field.low - 1: field.min_value, field.low: field.min_value,
+                 field.high - 1: field.max_value, field.high: field.max_value, field.high + 1000: field.max_value}
+        for pixel, value in edges.items():
+            expected = (value - field.min_value) * field.stride
+            assert field.lookup(pixel) == expected, (name, pixel)
+            assert field.lookup_batch(np.array([pixel], dtype=np.float64))[0] == expected, (name, pixel)
+            assert field.pack(value) == expected
+        assert field.pack(field.min_value - 5) == 0
+        assert field.pack(field.max_value + 5) == (field.radix - 1) * field.stride
+        assert field.min_value == int(field.low / field.divisor)
+        assert field.max_value == int((field.high - 1) / field.divisor)
+
+def check_legacy_keys(encoder, rng):
+    """Old "(a, b, c, d, e)" keys parse to the packed key of the same fields, without collisions"""
+    tuples = {tuple(int(rng.integers(field.min_value, field.max_value + 1)) for field in encoder.fields)
+              for _ in range(2000)}
+    keys = {}
+    for values in tuples:
+        key = encoder.parse_key(str(values))
+        assert key == encoder.pack(values) and encoder.decode(key) == values
+        assert keys.setdefault(key, values) == values, f"{values} and {keys[key]} share key {key}"
+    assert encoder.parse_key(' (0, 0, 0, 0, 0) ') == encoder.empty_key
+
+def test_state_encoder():
+    from ai.state_encoder import STATE_ENCODER, PIXEL_STATE_ENCODER
+    rng = np.random.default_rng(5)
+    for encoder in (STATE_ENCODER, PIXEL_STATE_ENCODER):
+        check_round_trip(encoder, rng)
+        check_batch_agreement(encoder, rng)
+        check_clamping(encoder)
+        check_legacy_keys(encoder, rng)
+
+if __name__ == "__main__":
+    test_state_encoder()
+    print("State encoder round trip, batch agreement, clamping and legacy keys OK")
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import numpy as np
+from config.config import *
+
+def check_log_round_trip(directory):
+    """Appends and extends read back in order across buffer flushes, chunks and writers"""
+    from ai.transition_log import TransitionLog, list_chunks, iter_chunks
+    log = TransitionLog(directory, chunk_rows=4, buffer_rows=3)
+    rows = [(i, i % 2, i * 0.25, i + 1, i % 5 == 4) for i in range(7)]
+    for row in rows[:2]:
+        log.append(*row)
+    log.extend(*[np.array(column) for column in zip(*rows[2:])])
+    log.close()
+    assert log.rows == 7 and len(list_chunks(directory)) == 2
+    # A second writer starts its own chunk
+    log = TransitionLog(directory, chunk_rows=4, buffer_rows=3)
+    log.append(7, 1, -1.0, 8, True)
+    log.close()
+    rows.append((7, 1, -1.0, 8, True))
+    chunks = list(iter_chunks(directory))
+    assert [len(columns['state']) for columns in chunks] == [4, 3, 1]
+    read = [row for columns in chunks
+            for row in zip(columns['state'].tolist(), columns['action'].tolist(), columns['reward'].tolist(),
+                           columns['next_state'].tolist(), columns['done'].astype(bool).tolist())]
+    assert read == rows
+
+def check_fitted_q(directory):
+    """Fitted-Q on a logged chain converges to its Bellman values"""
+    from ai.transition_log import TransitionLog, fitted_q_iteration
+    log = TransitionLog(directory, chunk_rows=2, buffer_rows=2)
+    log.append(1, 0, 1.0, 2, False)
+    log.append(2, 1, 2.0, 3, False)
+    log.append(2, 1, 4.0, 3, True)  # Same (state, action): the mean target
+    log.append(1, 1, -1.0, 1, True)
+    log.close()
+    q_table, sweeps = fitted_q_iteration(directory, {3: [10.0, 6.0], 8: [1.0, 1.0]}, discount_factor=0.5,
+                                         sweeps=50, tolerance=1e-12)
+    assert sweeps < 50
+    # Q(2, flap) = (2 + 0.5 * 10 + 4) / 2, Q(1, wait) = 1 + 0.5 * Q(2, flap); states not in the log keep their values
+    assert q_table[3] == [10.0, 6.0] and q_table[8] == [1.0, 1.0]
+    assert np.allclose(q_table[2], [0.0, 5.5])
+    assert np.allclose(q_table[1], [1.0 + 0.5 * 5.5, -1.0])
+
+def test_transition_log():
+    with tempfile.TemporaryDirectory() as directory:
+        check_log_round_trip(os.path.join(directory, 'log'))
+        check_fitted_q(os.path.join(directory, 'fit'))
+
+if __name__ == "__main__":
+    test_transition_log()
+    print("Transition log and fitted-Q OK")
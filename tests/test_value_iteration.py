@@ -0,0 +1,29 @@
+import numpy as np
+from config.config import *
+
+def check_solved_model():
+    """A hand-built model: Bellman values, a leaf valued from the table, and the untried-action rule"""
+    from ai.value_iteration import TransitionModel, value_iteration, to_q_table
+    model = TransitionModel()
+    model.add(1, 0, 1.0, 2, False)
+    model.add(1, 1, 0.0, 5, True)  # Crash: the next state is ignored
+    model.add(2, 1, 2.0, 3, False)  # 3 is never acted from, a leaf
+    model.add(2, 1, 4.0, 3, True)
+    states, q_values, seen, sweeps = value_iteration(model, discount_factor=0.5, tolerance=1e-12,
+                                                     max_sweeps=100, leaf_q_table={3: [4.0, 10.0]})
+    assert states.tolist() == [1, 2] and sweeps < 100
+    assert seen.tolist() == [[True, True], [False, True]]
+    # Q(2, flap) = mean reward 3 + 0.5 * (half to the leaf worth 10, half crashing); Q(1, wait) = 1 + 0.5 * V(2)
+    assert np.allclose(q_values, [[1.0 + 0.5 * 5.5, 0.0], [0.0, 5.5]])
+
+    # Waiting was never tried in state 2, so it gets flap's value - 1
+    assert to_q_table(states, q_values, seen) == {1: [3.75, 0.0], 2: [4.5, 5.5]}
+    flap_untried = to_q_table(np.array([7]), np.array([[2.0, 9.0]]), np.array([[True, False]]))
+    assert flap_untried == {7: [2.0, 1.0]}
+
+def test_value_iteration():
+    check_solved_model()
+
+if __name__ == "__main__":
+    test_value_iteration()
+    print("Value iteration on a hand-built model OK")
@@ -1,9 +1,16 @@
+import argparse
 import pygame
 import sys
 from ai.training_loop import train_ai
-from config import DEFAULT_EPISODES, RENDER_EVERY
+from config.config import DEFAULT_EPISODES, RENDER_EVERY, METRICS_HOST, METRICS_PORT
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the Flappy Bird AI for a fixed number of episodes")
+    parser.add_argument('--resume', action='store_true', help="Continue the last saved training session")
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT,
+                        help=f"Serve live training metrics at http://{METRICS_HOST}:PORT/metrics (and /metrics.json)")
+    args = parser.parse_args()
+    
     # Initialize pygame
     pygame.init()
     
@@ -14,7 +21,8 @@ if __name__ == "__main__":
     
     try:
         # Start training with default episodes, render every RENDER_EVERY episode
-        ai = train_ai(episodes=DEFAULT_EPISODES, render_every=RENDER_EVERY)
+        ai = train_ai(episodes=DEFAULT_EPISODES, render_every=RENDER_EVERY, resume=args.resume,
+                      metrics_port=args.metrics_port)
         print("Training completed successfully!")
         print("The AI has learned and saved its knowledge to q_table.json")
         